@@ -1,9 +1,68 @@
 import logging
+import importlib
+from typing import TYPE_CHECKING
 
 lib_logger = logging.getLogger(__name__)
 
-from .client import TrackClient
-from .http import TrackHTTPClient
-from .state import TrackState
-from .models import *
-from .errors import *
+# Public names, mapped to the submodule they are loaded from on first access.
+# Submodules are imported lazily so that short lived processes only pay for what they use.
+_lazy_attrs = {
+    'TrackClient': 'client',
+    'TrackHTTPClient': 'http',
+    'TrackState': 'state',
+
+    'TrackModel': 'models',
+    'Tag': 'models',
+    'ProjectUser': 'models',
+    'Project': 'models',
+    'TimeEntry': 'models',
+    'Workspace': 'models',
+    'Profile': 'models',
+    'Client': 'models',
+
+    'TogglException': 'errors',
+    'HTTPException': 'errors',
+    'NotFound': 'errors',
+    'LoginFailure': 'errors',
+    'PaymentRequired': 'errors',
+    'TooManyRequests': 'errors',
+    'DaemonError': 'errors',
+    'CircuitOpen': 'errors',
+    'DeadlineExceeded': 'errors',
+    'SnapshotError': 'errors',
+
+    'deadline': 'lib',
+}
+
+_submodules = {
+    'bulk', 'changes', 'client', 'daemon', 'errors', 'events', 'export', 'hook', 'http', 'lib', 'metrics', 'models', 'offload', 'priority', 'query', 'resilience', 'running', 'search', 'server', 'snapshot', 'state', 'stream',
+}
+
+__all__ = list(_lazy_attrs)
+
+
+def __getattr__(name):
+    if name in _lazy_attrs:
+        module = importlib.import_module(f'.{_lazy_attrs[name]}', __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    if name in _submodules:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attrs) | _submodules)
+
+
+if TYPE_CHECKING:
+    from .client import TrackClient
+    from .http import TrackHTTPClient
+    from .state import TrackState
+    from .models import TrackModel, Tag, ProjectUser, Project, TimeEntry, Workspace, Profile, Client
+    from .errors import (
+        TogglException, HTTPException, NotFound, LoginFailure, PaymentRequired, TooManyRequests, DaemonError,
+        CircuitOpen, DeadlineExceeded, SnapshotError,
+    )
+    from .lib import deadline
@@ -0,0 +1,332 @@
+"""
+Resumable bulk import of time entries.
+
+Records are read from any iterable of dicts, or from a CSV file with `read_csv`,
+and created by a pool of workers through `TrackHTTPClient.create_time_entry`.
+Requests still pass through the client's rate limit lock,
+so `concurrency` only needs to be large enough to keep the lock busy while records are prepared and logged.
+
+Progress is appended to an `ImportCheckpoint` file.
+Each record is logged as pending before its request is sent and as done once the entry exists,
+so a restarted import skips finished records and looks up records whose outcome is unknown,
+rather than creating them twice.
+"""
+import asyncio
+import csv
+import datetime as dt
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, Iterable, NamedTuple, Optional
+
+from .errors import HTTPException
+
+if TYPE_CHECKING:
+    from .http import TrackHTTPClient
+    from .state import TrackState
+
+logger = logging.getLogger(__name__)
+
+
+def _timestamp(value) -> Optional[str]:
+    if value in (None, ''):
+        return None
+    if isinstance(value, str):
+        value = dt.datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt.timezone.utc)
+    return value.isoformat()
+
+
+def _optional_int(value) -> Optional[int]:
+    return None if value in (None, '') else int(value)
+
+
+def _bool(value) -> Optional[bool]:
+    if value in (None, ''):
+        return None
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y')
+    return bool(value)
+
+
+def entry_payload(record: dict) -> dict:
+    """
+    Normalise an import record into a `create_time_entry` payload.
+
+    Values may be strings, as read from a CSV file, with `tag_ids` given comma separated.
+    Either `stop` or `duration` is required, since imported entries must not be running.
+    """
+    start = _timestamp(record.get('start'))
+    if start is None:
+        raise ValueError("Import record has no start time.")
+    stop = _timestamp(record.get('stop'))
+    duration = _optional_int(record.get('duration'))
+    if duration is None:
+        if stop is None:
+            raise ValueError("Import record needs a stop time or a duration.")
+        duration = int((dt.datetime.fromisoformat(stop) - dt.datetime.fromisoformat(start)).total_seconds())
+
+    tag_ids = record.get('tag_ids') or []
+    if isinstance(tag_ids, str):
+        tag_ids = [int(tid) for tid in tag_ids.split(',') if tid.strip()]
+
+    payload = {
+        'workspace_id': int(record['workspace_id']),
+        'description': record.get('description') or None,
+        'start': start,
+        'duration': duration,
+    }
+    if stop is not None:
+        payload['stop'] = stop
+    project_id = _optional_int(record.get('project_id'))
+    if project_id is not None:
+        payload['project_id'] = project_id
+    if tag_ids:
+        payload['tag_ids'] = [int(tid) for tid in tag_ids]
+    billable = _bool(record.get('billable'))
+    if billable is not None:
+        payload['billable'] = billable
+    return payload
+
+
+def record_key(record: dict, payload: dict) -> str:
+    """
+    Idempotency key of a record, its own `key` field if given, otherwise a digest of its payload.
+    """
+    key = record.get('key')
+    if key:
+        return str(key)
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def read_csv(path) -> Iterable[dict]:
+    """
+    Lazily read import records from a CSV file with a header row naming the record fields.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+
+class ImportCheckpoint:
+    """
+    Append-only JSON lines log of import progress.
+
+    Each line is either `{"key", "status": "pending", "payload"}`, `{"key", "status": "done", "id"}`
+    or `{"key", "status": "failed", "error"}`. Later lines for a key supersede earlier ones.
+    """
+
+    def __init__(self, path, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+
+        # Map of record key -> created entry id
+        self.done: dict[str, int] = {}
+
+        # Map of record key -> payload, for records sent without a known outcome
+        self.pending: dict[str, dict] = {}
+
+        if os.path.exists(path):
+            self._read()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def _read(self):
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted write
+                    continue
+                key = item['key']
+                status = item['status']
+                if status == 'pending':
+                    self.pending[key] = item['payload']
+                elif status == 'done':
+                    self.pending.pop(key, None)
+                    self.done[key] = item['id']
+                else:
+                    self.pending.pop(key, None)
+
+    def _write(self, item: dict):
+        self._file.write(json.dumps(item) + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def mark_pending(self, key: str, payload: dict):
+        self.pending[key] = payload
+        self._write({'key': key, 'status': 'pending', 'payload': payload})
+
+    def mark_done(self, key: str, entry_id: int):
+        self.pending.pop(key, None)
+        self.done[key] = entry_id
+        self._write({'key': key, 'status': 'done', 'id': entry_id})
+
+    def mark_failed(self, key: str, error: str):
+        self.pending.pop(key, None)
+        self._write({'key': key, 'status': 'failed', 'error': error})
+
+    def close(self):
+        self._file.close()
+
+
+class ImportStats(NamedTuple):
+    # Entries created by this run
+    created: int
+
+    # Records skipped since the checkpoint already had them
+    skipped: int
+
+    # Records of unknown outcome found to exist on the server
+    reconciled: int
+
+    # Records which could not be imported
+    failed: int
+
+    # Wall clock time of the import in seconds
+    elapsed: float
+
+    # List of (record key, error message) for failed records
+    errors: list[tuple[str, str]]
+
+    @property
+    def rate(self) -> float:
+        """
+        Entries created per second.
+        """
+        return self.created / self.elapsed if self.elapsed else 0.0
+
+
+def _same_entry(payload: dict, entry: dict) -> bool:
+    return (
+        entry.get('workspace_id') == payload['workspace_id']
+        and dt.datetime.fromisoformat(entry['start']) == dt.datetime.fromisoformat(payload['start'])
+        and entry.get('description') == payload.get('description')
+        and entry.get('project_id') == payload.get('project_id')
+    )
+
+
+async def reconcile(http: 'TrackHTTPClient', checkpoint: ImportCheckpoint) -> int:
+    """
+    Resolve the pending records of a checkpoint by looking for matching entries on the server.
+
+    Matches are marked done, the rest are left pending to be sent again.
+    Returns the number of matched records.
+    """
+    matched = 0
+    for key, payload in list(checkpoint.pending.items()):
+        start = dt.datetime.fromisoformat(payload['start'])
+        entries = await http.get_my_time_entries(
+            start_date=start.isoformat(), end_date=(start + dt.timedelta(seconds=1)).isoformat()
+        )
+        entry = next((entry for entry in entries or () if _same_entry(payload, entry)), None)
+        if entry is not None:
+            checkpoint.mark_done(key, entry['id'])
+            matched += 1
+    return matched
+
+
+async def import_time_entries(http: 'TrackHTTPClient', records: Iterable[dict],
+                              checkpoint=None, concurrency: int = 4,
+                              state: Optional['TrackState'] = None,
+                              progress_interval: int = 500) -> ImportStats:
+    """
+    Create a time entry for every record, see `entry_payload` for the record format.
+
+    `checkpoint` is an `ImportCheckpoint` or a path to one.
+    Records already done in it are skipped, and pending ones are first reconciled with the server.
+    Created entries are also loaded into `state`, if given.
+    Records which the API rejects are logged as failed and do not stop the import.
+    Records answered with a server error are counted as failed but left pending in the checkpoint,
+    so the next run reconciles them before sending them again.
+    """
+    owns_checkpoint = checkpoint is not None and not isinstance(checkpoint, ImportCheckpoint)
+    if owns_checkpoint:
+        checkpoint = ImportCheckpoint(checkpoint)
+
+    began = time.perf_counter()
+    counts = {'created': 0, 'skipped': 0, 'failed': 0}
+    errors: list[tuple[str, str]] = []
+    reconciled = await reconcile(http, checkpoint) if checkpoint is not None else 0
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    # Keys queued or in flight, so duplicate records in one run are only sent once
+    in_flight: set[str] = set()
+
+    def fail(key, error, unknown=False):
+        counts['failed'] += 1
+        errors.append((key, error))
+        if unknown:
+            # The entry may still have been created, leave it pending for `reconcile` on the next run
+            logger.warning("Failed to import time entry %s, outcome unknown: %s", key, error)
+            return
+        if checkpoint is not None:
+            checkpoint.mark_failed(key, error)
+        logger.warning("Failed to import time entry %s: %s", key, error)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            key, payload = item
+            try:
+                if checkpoint is not None:
+                    checkpoint.mark_pending(key, payload)
+                data = await http.create_time_entry(**dict(payload))
+            except HTTPException as e:
+                # A client error means the entry was rejected, but a server error does not prove it was not created
+                fail(key, str(e), unknown=e.response.status >= 500)
+                continue
+            finally:
+                in_flight.discard(key)
+            if checkpoint is not None:
+                checkpoint.mark_done(key, data['id'])
+            if state is not None:
+                state.add_entry_data(data)
+            counts['created'] += 1
+            if progress_interval and counts['created'] % progress_interval == 0:
+                elapsed = time.perf_counter() - began
+                logger.info(
+                    "Imported %d time entries, %.1f per second.", counts['created'], counts['created'] / elapsed
+                )
+
+    async def produce():
+        for record in records:
+            try:
+                payload = entry_payload(record)
+            except (KeyError, ValueError, TypeError) as e:
+                fail(str(record.get('key') or record), f"Invalid record: {e}")
+                continue
+            key = record_key(record, payload)
+            if key in in_flight or (checkpoint is not None and key in checkpoint.done):
+                counts['skipped'] += 1
+                continue
+            in_flight.add(key)
+            await queue.put((key, payload))
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    # Any failure stops the whole import, leaving in flight records pending in the checkpoint
+    tasks = [asyncio.create_task(produce())]
+    tasks.extend(asyncio.create_task(worker()) for _ in range(concurrency))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        if owns_checkpoint:
+            checkpoint.close()
+
+    stats = ImportStats(
+        counts['created'], counts['skipped'], reconciled, counts['failed'],
+        time.perf_counter() - began, errors
+    )
+    logger.info(
+        "Imported %d time entries in %.2fs (%.1f per second), %d skipped, %d failed.",
+        stats.created, stats.elapsed, stats.rate, stats.skipped, stats.failed
+    )
+    return stats
@@ -0,0 +1,129 @@
+"""
+Change sets describing what moved in a `TrackState` between two points in time.
+
+Models are compared by their `at` modification timestamps and deletion tombstones,
+so computing a change set never needs to compare model fields.
+"""
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from .state import TrackState
+
+
+# State collections which are tracked, in load order
+COLLECTIONS = ('workspaces', 'clients', 'tags', 'projects', 'time_entries')
+
+# Map of collection -> model attribute marking the model as deleted on the server
+TOMBSTONES = {
+    'tags': 'deleted_at',
+    'projects': 'server_deleted_at',
+    'time_entries': 'server_deleted_at',
+}
+
+
+class ModelChanges(NamedTuple):
+    created: set[int]
+    updated: set[int]
+    deleted: set[int]
+
+
+class ChangeSet:
+    """
+    Created, updated and deleted model ids for each state collection.
+
+    Index by collection name, e.g. `changes['projects'].updated`.
+    """
+
+    def __init__(self):
+        self.changes: dict[str, ModelChanges] = {
+            key: ModelChanges(set(), set(), set()) for key in COLLECTIONS
+        }
+
+    def __getitem__(self, key) -> ModelChanges:
+        return self.changes[key]
+
+    def __iter__(self):
+        return iter(self.changes.items())
+
+    def __bool__(self):
+        return any(any(group) for group in self.changes.values())
+
+    def __repr__(self):
+        counts = ', '.join(
+            f"{key}=+{len(group.created)}~{len(group.updated)}-{len(group.deleted)}"
+            for key, group in self.changes.items() if any(group)
+        )
+        return f"<ChangeSet {counts or 'empty'}>"
+
+    def merge(self, other: 'ChangeSet'):
+        """
+        Fold a later change set into this one.
+        """
+        for key, group in other:
+            mine = self.changes[key]
+            for mid in group.created:
+                mine.deleted.discard(mid)
+                mine.created.add(mid)
+            for mid in group.updated:
+                if mid not in mine.created:
+                    mine.updated.add(mid)
+            for mid in group.deleted:
+                if mid in mine.created:
+                    mine.created.discard(mid)
+                else:
+                    mine.deleted.add(mid)
+                mine.updated.discard(mid)
+        return self
+
+
+def state_signature(state: 'TrackState') -> dict[str, dict[int, tuple]]:
+    """
+    Record the `at` timestamp and tombstone of every model in the state, for later diffing.
+    """
+    signature = {}
+    for key in COLLECTIONS:
+        tomb = TOMBSTONES.get(key, None)
+        models = getattr(state, key)
+        if tomb is None:
+            signature[key] = {mid: (model.at, False) for mid, model in models.items()}
+        else:
+            signature[key] = {
+                mid: (model.at, getattr(model, tomb) is not None) for mid, model in models.items()
+            }
+    return signature
+
+
+def diff_signatures(old: dict[str, dict[int, tuple]], new: dict[str, dict[int, tuple]]) -> ChangeSet:
+    """
+    Compute the change set between two state signatures.
+
+    Models which gain a tombstone are reported as deleted rather than updated.
+    """
+    changes = ChangeSet()
+    for key in COLLECTIONS:
+        before = old.get(key, {})
+        after = new.get(key, {})
+        group = changes[key]
+
+        for mid, (at, dead) in after.items():
+            previous = before.get(mid, None)
+            if previous is None:
+                if not dead:
+                    group.created.add(mid)
+            elif dead:
+                if not previous[1]:
+                    group.deleted.add(mid)
+            elif previous[1]:
+                # Restored from a tombstone
+                group.created.add(mid)
+            elif previous[0] != at:
+                group.updated.add(mid)
+
+        for mid, (at, dead) in before.items():
+            if mid not in after and not dead:
+                group.deleted.add(mid)
+    return changes
+
+
+def diff_states(old: 'TrackState', new: 'TrackState') -> ChangeSet:
+    return diff_signatures(state_signature(old), state_signature(new))
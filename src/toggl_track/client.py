@@ -1,12 +1,97 @@
-from typing import Optional
+import asyncio
+from contextlib import aclosing
+from typing import TYPE_CHECKING, NamedTuple, Optional
 
 from toggl_track.errors import NotFound
 from .http import TrackHTTPClient
+from .lib import INTERACTIVE
 from .state import TrackState
+from .changes import ChangeSet, diff_signatures, state_signature
+from .events import EventBus
 from . import models
 
 from .models import TimeEntry
 
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+
+class ProjectSyncCursor(NamedTuple):
+    # Project id to resume the paginated sync from
+    start_project_id: Optional[int]
+
+    # Modification timestamp filter the sync was started with
+    since: Optional[int]
+
+
+class OrganizationUserSyncCursor(NamedTuple):
+    # Page to resume the paginated sync from
+    page: int
+
+    # Page size the sync was started with, which the page numbers depend on
+    per_page: int
+
+    # Filters the sync was started with, see `TrackHTTPClient.get_organization_users`
+    filters: dict
+
+
+class LoginResult(NamedTuple):
+    # Profile of the logged in user
+    profile: models.Profile
+
+    # Changes loaded by the login sync, if one was requested
+    changes: Optional[ChangeSet]
+
+    # User preferences payload, if requested
+    preferences: Optional[dict]
+
+    # Running time entry, if requested and one is running
+    current_entry: Optional[TimeEntry]
+
+
+class WorkspaceBootstrap:
+    """
+    Handle on a running per-workspace bootstrap, see `TrackClient.bootstrap`.
+
+    Awaiting the handle waits for every workspace to finish loading.
+    """
+
+    def __init__(self, state: TrackState, default_workspace_id: int, tasks: dict[int, asyncio.Task],
+                 entries_task: Optional[asyncio.Task] = None):
+        self.state = state
+        self.default_workspace_id = default_workspace_id
+        self.tasks = tasks
+        self.entries_task = entries_task
+
+    def done(self, workspace_id: int) -> bool:
+        return self.tasks[workspace_id].done()
+
+    async def wait(self, workspace_id: int) -> models.Workspace:
+        """
+        Wait for the given workspace to finish loading.
+        """
+        await asyncio.shield(self.tasks[workspace_id])
+        return self.state.get_workspace(workspace_id)
+
+    async def wait_default(self) -> models.Workspace:
+        return await self.wait(self.default_workspace_id)
+
+    async def wait_entries(self):
+        if self.entries_task is not None:
+            await asyncio.shield(self.entries_task)
+
+    async def wait_all(self):
+        await asyncio.gather(*self.tasks.values(), self.wait_entries())
+
+    def cancel(self):
+        for task in self.tasks.values():
+            task.cancel()
+        if self.entries_task is not None:
+            self.entries_task.cancel()
+
+    def __await__(self):
+        return self.wait_all().__await__()
+
 
 class TrackClient:
     """
@@ -14,12 +99,27 @@ class TrackClient:
     on behalf of a single user.
     """
 
-    def __init__(self):
-        self.http: TrackHTTPClient = TrackHTTPClient()
-        self.state: TrackState = TrackState(self.http)
+    def __init__(self, http: Optional[TrackHTTPClient] = None, executor: Optional['Executor'] = None):
+        self.http: TrackHTTPClient = http or TrackHTTPClient(executor=executor)
+
+        # Thread or process pool to decode and build synced payloads in, see `offload`
+        self.executor: Optional['Executor'] = executor
+
+        # Change notifications, shared by every state this client creates
+        self.events: EventBus = EventBus()
+        self.state: TrackState = TrackState(self.http, events=self.events)
 
         self.profile: Optional[models.Profile] = None
 
+        # Position of an incomplete paginated project sync, see `sync_projects`
+        self.project_cursor: Optional[ProjectSyncCursor] = None
+
+        # Map of organization_id -> position of an incomplete user sync, see `sync_organization_users`
+        self.organization_user_cursors: dict[int, OrganizationUserSyncCursor] = {}
+
+        # Changes made to the state by the most recent sync
+        self.last_changes: Optional[ChangeSet] = None
+
     @property
     def default_workspace(self):
         if self.profile is None:
@@ -29,22 +129,211 @@ class TrackClient:
     async def close(self):
         await self.http.close()
         del self.state
-        self.state = TrackState(self.http)
+        self.state = TrackState(self.http, events=self.events)
         self.profile = None
 
-    async def login(self, *args, **kwargs):
-        profile_data = await self.http.login(*args, **kwargs)
-        self.profile = models.Profile.from_data(profile_data, state=self.state)
+    async def login(self, *args, sync=False, stream=False, preferences=False, current=False, **kwargs) -> LoginResult:
+        """
+        Log in with the given credentials, see `TrackHTTPClient.login`.
+
+        With `sync`, the profile is loaded with all related data as by `sync(stream=stream)`,
+        so logging in and loading the state takes a single request rather than two.
+        The user's preferences and the running entry are also fetched with `preferences` and `current`,
+        queued on the rate limiter behind the profile rather than waiting for it to be loaded.
+        """
+        await self.http.authenticate(*args, **kwargs)
+
+        async def fetch_profile():
+            if sync:
+                return await self.sync(stream=stream)
+            self.profile = models.Profile.from_data(await self.http.get_my_profile(), state=self.state)
+
+        async def fetch_current():
+            try:
+                return await self.http.get_current_entry()
+            except NotFound:
+                return None
+
+        # Tasks are created in the order their requests should be sent
+        tasks = [asyncio.create_task(fetch_profile())]
+        if current:
+            tasks.append(asyncio.create_task(fetch_current()))
+        if preferences:
+            tasks.append(asyncio.create_task(self.http.get_my_preferences()))
+        try:
+            changes, *extra = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        entry = None
+        if current:
+            entry_data = extra.pop(0)
+            if entry_data:
+                # Loaded into the state the profile request installed
+                entry = self.state.add_entry_data(entry_data)
+        prefs = extra.pop(0) if preferences else None
+        assert self.profile is not None
+        return LoginResult(self.profile, changes, prefs, entry)
+
+    async def sync(self, flush=True, stream=False) -> ChangeSet:
+        """
+        Load the profile and all related data into the client state.
+
+        With `stream`, the response is parsed and loaded incrementally as it is received,
+        which keeps memory use flat for very large accounts.
+        Otherwise, if the client has an `executor`, the response is decoded and its models built in the executor,
+        and only storing them runs on the event loop.
+
+        Returns a `ChangeSet` of the models created, updated and deleted since the previous state,
+        which is also kept as `last_changes`.
+        Models are only reported as deleted without `flush` if the server marked them deleted.
+        The change set is published to state subscribers once the new state is in place.
+        To bound the whole sync, call it within a `lib.deadline` block,
+        if it raises `DeadlineExceeded` or is cancelled before the data arrives the state is left unchanged.
+        """
+        previous_state = self.state
+        previous = state_signature(previous_state)
+        state = TrackState(self.http, events=self.events) if flush else self.state
+
+        # Everything is fetched before the client state is touched,
+        # so a sync which fails or runs out of time part way leaves it unchanged
+        data = built = None
+        if stream:
+            # Without a flush, stream into a separate state to be adopted once complete
+            staging = state if flush else TrackState(self.http)
+            with staging.muted():
+                async with aclosing(self.http.stream_my_profile(with_related_data=True)) as events:
+                    values = await staging.load_stream(events)
+            if not flush:
+                built = {key: list(getattr(staging, key).values()) for key in staging.collection_stores}
+        elif self.executor is not None:
+            from .offload import build_in_executor
+
+            body = await self.http.get_my_profile(with_related_data=True, raw=True)
+            payload = await build_in_executor(self.executor, body)
+            values, built = payload.values, payload.models
+        else:
+            data = values = await self.http.get_my_profile(with_related_data=True)
+
+        async def apply():
+            with state.muted():
+                self.profile = models.Profile.from_data(values, state=state)
+                if built is not None:
+                    await state.adopt_models(built)
+                elif data is not None:
+                    state.recursive_load_data(data)
+
+            # Organization users are not part of the profile payload, so keep those already synced
+            state.organization_users = previous_state.organization_users
+            self.state = state
+            self.last_changes = diff_signatures(previous, state_signature(state))
+            self.events.publish_changes(self.last_changes, state, previous_state)
+            return self.last_changes
+
+        # Once started, the update runs to completion even if the caller is cancelled
+        return await asyncio.shield(apply())
 
-    async def sync(self, flush=True):
-        state = TrackState(self.http) if flush else self.state
+    async def bootstrap(self, flush=True, entries=True, per_page=200) -> WorkspaceBootstrap:
+        """
+        Load workspace data using the workspace scoped endpoints, one workspace at a time.
 
-        data = await self.http.get_my_profile(with_related_data=True)
-        self.profile = models.Profile.from_data(data, state=state)
-        state.recursive_load_data(data)
+        The workspace list is fetched first, then the clients, tags and projects of every workspace
+        are requested concurrently, queueing on the rate limiter with the default workspace first.
+        Each collection is loaded into the state as soon as it arrives.
+        With `entries`, the user's recent time entries are fetched after the workspace data.
 
+        Returns a `WorkspaceBootstrap` handle once the workspaces themselves are loaded,
+        which may be used to wait for the default or any other workspace to complete.
+        Note that the new state is installed immediately, and fills in as the workspaces load.
+        """
+        if self.profile is None:
+            raise ValueError("Cannot bootstrap before login.")
+
+        state = TrackState(self.http, events=self.events) if flush else self.state
+        state.load_collection('workspaces', await self.http.get_my_workspaces())
+        state.organization_users = self.state.organization_users
+        self.profile.state = state
         self.state = state
 
+        default_id = self.profile.default_workspace_id
+        wids = sorted(state.workspaces, key=lambda wid: wid != default_id)
+        tasks = {
+            wid: asyncio.create_task(self._bootstrap_workspace(state, wid, per_page))
+            for wid in wids
+        }
+        entries_task = None
+        if entries:
+            entries_task = asyncio.create_task(self._bootstrap_entries(state))
+        return WorkspaceBootstrap(state, default_id, tasks, entries_task)
+
+    async def _bootstrap_entries(self, state: TrackState):
+        state.load_collection('time_entries', await self.http.get_my_time_entries())
+
+    async def _bootstrap_workspace(self, state: TrackState, workspace_id: int, per_page: int):
+        async def load(key, fetch):
+            state.load_collection(key, await fetch)
+
+        await asyncio.gather(
+            load('clients', self.http.get_workspace_clients(workspace_id)),
+            load('tags', self.http.get_workspace_tags(workspace_id)),
+            self._load_workspace_projects(state, workspace_id, per_page),
+        )
+
+    async def _load_workspace_projects(self, state: TrackState, workspace_id: int, per_page: int):
+        async for projects in self.http.iter_workspace_projects(workspace_id, per_page=per_page):
+            state.load_collection('projects', projects)
+
+    async def sync_projects(self, since: Optional[int] = None, per_page=200, restart=False) -> int:
+        """
+        Load the user's projects into the state page by page, using the paginated projects endpoint.
+
+        Each page is loaded as soon as it arrives, and progress is recorded in `project_cursor`.
+        If a page request fails, calling `sync_projects` again resumes after the last loaded page
+        (with the original `since`), unless `restart` is given.
+        Returns the number of projects loaded by this call.
+        """
+        cursor = self.project_cursor
+        if restart or cursor is None:
+            cursor = ProjectSyncCursor(None, since)
+        self.project_cursor = cursor
+
+        count = 0
+        async with aclosing(self.http.iter_my_projects(*cursor, per_page=per_page)) as pages:
+            async for page in pages:
+                self.state.load_collection('projects', page)
+                count += len(page)
+                self.project_cursor = cursor = cursor._replace(start_project_id=page[-1]['id'] + 1)
+
+        self.project_cursor = None
+        return count
+
+    async def sync_organization_users(self, organization_id: int, per_page=200, restart=False, **filters) -> int:
+        """
+        Load the users of an organization into `state.organization_users` page by page.
+
+        Progress is recorded in `organization_user_cursors`, and as with `sync_projects`
+        calling it again after a failed page resumes after the last loaded page
+        (with the original page size and filters), unless `restart` is given.
+        Returns the number of users loaded by this call.
+        """
+        cursor = self.organization_user_cursors.get(organization_id, None)
+        if restart or cursor is None:
+            cursor = OrganizationUserSyncCursor(1, per_page, filters)
+        self.organization_user_cursors[organization_id] = cursor
+
+        count = 0
+        pages = self.http.iter_organization_users(organization_id, cursor.page, cursor.per_page, **cursor.filters)
+        async with aclosing(pages) as pages:
+            async for page in pages:
+                self.state.load_organization_users(organization_id, page)
+                count += len(page)
+                self.organization_user_cursors[organization_id] = cursor = cursor._replace(page=cursor.page + 1)
+
+        del self.organization_user_cursors[organization_id]
+        return count
+
     async def fetch_current_entry(self) -> Optional[TimeEntry]:
         try:
             data = await self.http.get_current_entry()
@@ -64,5 +353,5 @@ class TrackClient:
             create_args['project_id'] = project_id
         if tag_ids:
             create_args['tag_ids'] = tag_ids
-        data = await self.http.create_time_entry(workspace_id, **create_args)
+        data = await self.http.create_time_entry(workspace_id, priority=INTERACTIVE, **create_args)
         return self.state.add_entry_data(data)
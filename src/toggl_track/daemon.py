@@ -0,0 +1,185 @@
+"""
+Long-lived local daemon serving a warm `TrackClient` over a Unix socket.
+
+The daemon logs in and syncs once, then answers queries and timer commands
+from its in-memory `TrackState`, so short lived scripts and editor integrations
+do not each pay for a login and a full sync.
+
+The protocol is one JSON object per line in each direction.
+Requests have the form `{"op": <name>, ...arguments}`,
+and responses are either `{"ok": true, "data": ...}` or `{"ok": false, "error": ..., "type": ...}`.
+
+Usage:
+    TOGGL_API_KEY=... python -m toggl_track.daemon serve
+    python -m toggl_track.daemon current
+    python -m toggl_track.daemon start "Writing docs" --project 123
+    python -m toggl_track.daemon stop
+"""
+import importlib
+import json
+import logging
+import os
+import socket
+import sys
+from typing import Optional, TYPE_CHECKING
+
+from .errors import DaemonError
+
+if TYPE_CHECKING:
+    from .server import MAX_BACKOFF, TrackDaemon, backoff
+
+# Server names, loaded from `server` on first access.
+# The server needs asyncio, which client commands would otherwise pay for on every call.
+_lazy_attrs = {'TrackDaemon', 'backoff', 'MAX_BACKOFF'}
+
+
+def __getattr__(name):
+    if name in _lazy_attrs:
+        value = getattr(importlib.import_module('.server', __package__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def default_socket_path() -> str:
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime:
+        return os.path.join(runtime, 'toggl_track.sock')
+    return f"/tmp/toggl_track-{os.getuid()}.sock"
+
+
+class DaemonClient:
+    """
+    Thin blocking client for a running `TrackDaemon`.
+
+    Deliberately avoids asyncio and the rest of the library,
+    so that a query costs little more than a socket round trip.
+    """
+
+    def __init__(self, path: Optional[str] = None, timeout: float = 30):
+        self.path = path or default_socket_path()
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._buffer = b''
+
+    def connect(self):
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError as e:
+                sock.close()
+                raise DaemonError(f"Could not connect to the track daemon at {self.path}: {e}") from None
+            self._sock = sock
+        return self._sock
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def request(self, op: str, **arguments):
+        sock = self.connect()
+        arguments['op'] = op
+        sock.sendall(json.dumps(arguments, separators=(',', ':')).encode() + b'\n')
+
+        while b'\n' not in self._buffer:
+            chunk = sock.recv(65536)
+            if not chunk:
+                self.close()
+                raise DaemonError("Track daemon closed the connection.")
+            self._buffer += chunk
+        line, _, self._buffer = self._buffer.partition(b'\n')
+
+        response = json.loads(line)
+        if not response['ok']:
+            raise DaemonError(response['error'], error_type=response.get('type'))
+        return response['data']
+
+    def ping(self):
+        return self.request('ping')
+
+    def current(self, refresh=False):
+        return self.request('current', refresh=refresh)
+
+    def start(self, description, **kwargs):
+        return self.request('start', description=description, **kwargs)
+
+    def stop(self):
+        return self.request('stop')
+
+    def suggest(self, text='', **kwargs):
+        return self.request('suggest', text=text, **kwargs)
+
+    def sync(self):
+        return self.request('sync')
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python -m toggl_track.daemon')
+    parser.add_argument('--socket', default=None, help="Path of the daemon socket.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help="Run the daemon in the foreground.")
+    serve.add_argument('--refresh-interval', type=float, default=60)
+    serve.add_argument('--sync-interval', type=float, default=None)
+    serve.add_argument('--snapshot', default=None, help="Path to publish state snapshots to after each sync.")
+
+    commands.add_parser('ping')
+    current = commands.add_parser('current')
+    current.add_argument('--refresh', action='store_true')
+    start = commands.add_parser('start')
+    start.add_argument('description')
+    start.add_argument('--workspace', type=int, default=None)
+    start.add_argument('--project', type=int, default=None)
+    start.add_argument('--tag', type=int, action='append', dest='tags')
+    commands.add_parser('stop')
+    suggest = commands.add_parser('suggest')
+    suggest.add_argument('text', nargs='?', default='')
+    suggest.add_argument('--workspace', type=int, default=None)
+    suggest.add_argument('--limit', type=int, default=10)
+    commands.add_parser('sync')
+
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        import asyncio
+        from .server import serve
+
+        logging.basicConfig(level=logging.INFO)
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    try:
+        with DaemonClient(args.socket) as client:
+            if args.command == 'current':
+                result = client.current(refresh=args.refresh)
+            elif args.command == 'start':
+                result = client.start(
+                    args.description,
+                    workspace_id=args.workspace, project_id=args.project, tag_ids=args.tags
+                )
+            elif args.command == 'suggest':
+                result = client.suggest(args.text, workspace_id=args.workspace, limit=args.limit)
+            else:
+                result = client.request(args.command)
+    except DaemonError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        raise SystemExit(1)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
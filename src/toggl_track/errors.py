@@ -30,3 +30,48 @@ class PaymentRequired(HTTPException):
     Thrown in the case of a 402 error.
     """
     pass
+
+
+class TooManyRequests(HTTPException):
+    """
+    Thrown in the case of a 429 error, once retries are exhausted.
+    """
+    def __init__(self, response, message, retry_after=None):
+        self.retry_after = retry_after
+        super().__init__(response, message)
+
+
+class CircuitOpen(TogglException):
+    """
+    Thrown without sending a request while the circuit breaker for its route is open.
+    """
+    def __init__(self, route, retry_in):
+        self.route = route
+        self.retry_in = retry_in
+        super().__init__(f"Circuit open for {route}, retrying in {retry_in:.1f}s.")
+
+
+class DeadlineExceeded(TogglException, TimeoutError):
+    """
+    Thrown when a request could not complete before its deadline, see `lib.deadline`.
+    """
+    def __init__(self, route, stage):
+        self.route = route
+        self.stage = stage
+        super().__init__(f"Deadline exceeded for {route} while {stage}.")
+
+
+class SnapshotError(TogglException):
+    """
+    Thrown when a state snapshot file is missing sections or has an unsupported format.
+    """
+    pass
+
+
+class DaemonError(TogglException):
+    """
+    Thrown by the daemon client when the daemon is unreachable or reports an error.
+    """
+    def __init__(self, message, error_type=None):
+        self.error_type = error_type
+        super().__init__(message)
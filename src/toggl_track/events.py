@@ -0,0 +1,243 @@
+"""
+Change notifications for `TrackState`.
+
+The `EventBus` of a state collects a `StateEvent` for every model created, updated or deleted,
+whether through the `add_*_data` loaders, a sync, or a webhook.
+Events are coalesced per model, then delivered asynchronously in batches to each matching subscription.
+Each subscription has its own delivery task, so slow listeners never block loading or each other.
+"""
+import asyncio
+import inspect
+import logging
+from typing import Any, Callable, Iterable, NamedTuple, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .changes import ChangeSet
+    from .state import TrackState
+
+logger = logging.getLogger(__name__)
+
+
+# Event kinds
+CREATED = 'created'
+UPDATED = 'updated'
+DELETED = 'deleted'
+
+
+class StateEvent(NamedTuple):
+    # One of CREATED, UPDATED or DELETED
+    kind: str
+
+    # State collection the model belongs to, e.g. 'time_entries'
+    collection: str
+
+    # Model id
+    id: int
+
+    # The model after the change, or the last known model for deletions
+    model: Any
+
+    # Workspace the model belongs to, if known
+    workspace_id: Optional[int]
+
+
+def _coalesce(earlier: Optional[StateEvent], later: StateEvent) -> Optional[StateEvent]:
+    """
+    Combine two events for the same model into one, or None if they cancel out.
+    """
+    if earlier is None:
+        return later
+    if earlier.kind == CREATED:
+        if later.kind == DELETED:
+            return None
+        return later._replace(kind=CREATED)
+    if earlier.kind == DELETED and later.kind == CREATED:
+        return later._replace(kind=UPDATED)
+    return later
+
+
+def _workspace_of(model) -> Optional[int]:
+    if model is None:
+        return None
+    if model.__class__.__name__ == 'Workspace':
+        return model.id
+    return getattr(model, 'workspace_id', None)
+
+
+class Subscription:
+    """
+    A filtered listener on an `EventBus`.
+
+    The callback receives a list of coalesced `StateEvent`s, and may be a coroutine function.
+    Each filter is optional, and an event must match all given filters.
+    """
+
+    def __init__(self, bus: 'EventBus', callback: Callable,
+                 collections: Optional[Iterable[str]] = None,
+                 workspace_id: Optional[int] = None,
+                 project_id: Optional[int] = None,
+                 tag_id: Optional[int] = None):
+        self.bus = bus
+        self.callback = callback
+        self.collections = frozenset(collections) if collections is not None else None
+        self.workspace_id = workspace_id
+        self.project_id = project_id
+        self.tag_id = tag_id
+
+        self._pending: dict[tuple[str, int], StateEvent] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def matches(self, event: StateEvent) -> bool:
+        if self.collections is not None and event.collection not in self.collections:
+            return False
+        if self.workspace_id is not None and event.workspace_id != self.workspace_id:
+            return False
+        if self.project_id is not None:
+            if event.collection == 'projects':
+                if event.id != self.project_id:
+                    return False
+            elif getattr(event.model, 'project_id', None) != self.project_id:
+                return False
+        if self.tag_id is not None:
+            if event.collection == 'tags':
+                if event.id != self.tag_id:
+                    return False
+            elif self.tag_id not in (getattr(event.model, 'tag_ids', None) or ()):
+                return False
+        return True
+
+    def cancel(self):
+        self.bus.unsubscribe(self)
+
+    def _push(self, events: list[StateEvent]):
+        pending = self._pending
+        for event in events:
+            key = (event.collection, event.id)
+            combined = _coalesce(pending.pop(key, None), event)
+            if combined is not None:
+                pending[key] = combined
+
+        if not pending:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to deliver on, so deliver synchronously
+            self._deliver_now()
+            return
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+        self._wakeup.set()
+
+    def _take(self) -> list[StateEvent]:
+        batch = list(self._pending.values())
+        self._pending.clear()
+        return batch
+
+    def _deliver_now(self):
+        result = self.callback(self._take())
+        if inspect.isawaitable(result):
+            asyncio.run(result)
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            batch = self._take()
+            if not batch:
+                continue
+            try:
+                result = self.callback(batch)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                logger.exception("State event listener %r failed.", self.callback)
+
+    def _stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._pending.clear()
+
+
+class EventBus:
+    """
+    Collects state events and dispatches them to subscriptions.
+
+    Events published within one event loop iteration are coalesced and dispatched together.
+    """
+
+    def __init__(self):
+        self.subscriptions: list[Subscription] = []
+        self._pending: dict[tuple[str, int], StateEvent] = {}
+        self._scheduled = False
+
+    @property
+    def active(self) -> bool:
+        return bool(self.subscriptions)
+
+    def subscribe(self, callback: Callable, **filters) -> Subscription:
+        subscription = Subscription(self, callback, **filters)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+        subscription._stop()
+
+    def publish(self, kind: str, collection: str, model, model_id: Optional[int] = None):
+        if not self.active:
+            return
+        event = StateEvent(
+            kind, collection,
+            model_id if model_id is not None else model.id,
+            model, _workspace_of(model)
+        )
+        key = (collection, event.id)
+        combined = _coalesce(self._pending.pop(key, None), event)
+        if combined is not None:
+            self._pending[key] = combined
+
+        if not self._scheduled:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                # Outside an event loop, events wait for an explicit flush
+                return
+            self._scheduled = True
+            loop.call_soon(self.flush)
+
+    def publish_changes(self, changes: 'ChangeSet', state: 'TrackState', previous: Optional['TrackState'] = None):
+        """
+        Publish the events described by a `ChangeSet` between two states.
+
+        Deleted models are looked up in `previous` if they are no longer in `state`.
+        """
+        if not self.active:
+            return
+        for collection, group in changes:
+            models = getattr(state, collection)
+            old_models = getattr(previous, collection) if previous is not None else {}
+            for mid in group.created:
+                self.publish(CREATED, collection, models.get(mid), mid)
+            for mid in group.updated:
+                self.publish(UPDATED, collection, models.get(mid), mid)
+            for mid in group.deleted:
+                self.publish(DELETED, collection, models.get(mid) or old_models.get(mid), mid)
+
+    def flush(self):
+        """
+        Dispatch all pending events to the matching subscriptions.
+        """
+        self._scheduled = False
+        if not self._pending:
+            return
+        events = list(self._pending.values())
+        self._pending.clear()
+        for subscription in list(self.subscriptions):
+            matched = [event for event in events if subscription.matches(event)]
+            if matched:
+                subscription._push(matched)
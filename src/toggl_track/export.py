@@ -0,0 +1,357 @@
+"""
+Bounded memory export of time entry history.
+
+Entries are streamed from `/me/time_entries` one date window at a time,
+converted to flat rows with project, client and tag names resolved through a `NameLookup`,
+and written in chunks of `chunk_size` rows, so memory use does not depend on the size of the range.
+No `TimeEntry` models are built and nothing is loaded into a `TrackState`.
+Files are opened, written and closed in a thread, see `offload.run_in_thread`,
+so each chunk is written while the entries of the next one are streamed.
+
+Example:
+    stats = await export_time_entries(client.http, 'history.csv', start, end)
+
+Parquet output requires the optional `pyarrow` dependency.
+"""
+import asyncio
+import csv
+import datetime as dt
+import json
+import logging
+import time
+from contextlib import aclosing
+from typing import TYPE_CHECKING, AsyncIterator, NamedTuple, Optional
+
+from .stream import ITEM
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    from .http import TrackHTTPClient
+    from .state import TrackState
+
+logger = logging.getLogger(__name__)
+
+
+# Exported columns, in order
+FIELDS = (
+    'id', 'workspace_id', 'user_id', 'project_id', 'project', 'client',
+    'description', 'tag_ids', 'tags', 'billable', 'start', 'stop', 'duration',
+)
+
+
+class ExportStats(NamedTuple):
+    # Number of rows written
+    rows: int
+
+    # Number of chunks written
+    chunks: int
+
+    # Number of date windows fetched
+    windows: int
+
+    # Wall clock time of the export in seconds
+    elapsed: float
+
+
+class NameLookup:
+    """
+    Cached resolution of project, client and tag ids to names.
+
+    Names are taken from a `TrackState` if one is given,
+    otherwise the projects, clients and tags of each workspace are fetched once by `load`.
+    Lookups themselves never make requests, since they happen while an entry stream holds the rate limit lock.
+    """
+
+    def __init__(self, http: Optional['TrackHTTPClient'] = None, state: Optional['TrackState'] = None):
+        self.http = http
+        self.state = state
+
+        # Map of project_id -> (name, client_id)
+        self.projects: dict[int, tuple[str, Optional[int]]] = {}
+
+        # Map of client_id -> name
+        self.clients: dict[int, str] = {}
+
+        # Map of tag_id -> name
+        self.tags: dict[int, str] = {}
+
+        # Workspaces whose names have been loaded
+        self.workspaces: set[int] = set()
+
+    async def load(self, workspace_ids=None):
+        """
+        Load the names for the given workspaces, by default every workspace of the user.
+        """
+        if workspace_ids is None:
+            if self.state is not None and self.state.workspaces:
+                workspace_ids = list(self.state.workspaces)
+            elif self.http is not None:
+                workspace_ids = [workspace['id'] for workspace in await self.http.get_my_workspaces()]
+            else:
+                workspace_ids = []
+        for workspace_id in workspace_ids:
+            await self.load_workspace(workspace_id)
+
+    async def load_workspace(self, workspace_id: int):
+        if workspace_id in self.workspaces:
+            return
+        self.workspaces.add(workspace_id)
+        state = self.state
+        if state is not None and workspace_id in state.workspaces:
+            for project in state.get_workspace_projects(workspace_id):
+                self.projects[project.id] = (project.name, project.client_id)
+            for client in state.get_workspace_clients(workspace_id):
+                self.clients[client.id] = client.name
+            for tag in state.get_workspace_tags(workspace_id):
+                self.tags[tag.id] = tag.name
+            return
+        if self.http is None:
+            return
+
+        async for page in self.http.iter_workspace_projects(workspace_id):
+            for project in page:
+                self.projects[project['id']] = (project['name'], project.get('client_id'))
+        for client in await self.http.get_workspace_clients(workspace_id) or ():
+            self.clients[client['id']] = client['name']
+        for tag in await self.http.get_workspace_tags(workspace_id) or ():
+            self.tags[tag['id']] = tag['name']
+
+    def project(self, project_id: Optional[int]) -> Optional[str]:
+        if project_id is None:
+            return None
+        return self.projects.get(project_id, (None, None))[0]
+
+    def client(self, project_id: Optional[int]) -> Optional[str]:
+        if project_id is None:
+            return None
+        client_id = self.projects.get(project_id, (None, None))[1]
+        return self.clients.get(client_id) if client_id is not None else None
+
+    def tag_names(self, entry: dict) -> list[str]:
+        # Entries carry their tag names too, used for tags we cannot resolve
+        given = entry.get('tags') or []
+        tag_ids = entry.get('tag_ids') or []
+        if len(given) == len(tag_ids):
+            return [self.tags.get(tid, name) for tid, name in zip(tag_ids, given)]
+        return [self.tags[tid] for tid in tag_ids if tid in self.tags]
+
+
+def entry_row(entry: dict, names: NameLookup) -> dict:
+    """
+    Flatten a time entry payload into an export row.
+    """
+    project_id = entry.get('project_id')
+    return {
+        'id': entry['id'],
+        'workspace_id': entry['workspace_id'],
+        'user_id': entry.get('user_id'),
+        'project_id': project_id,
+        'project': names.project(project_id),
+        'client': names.client(project_id),
+        'description': entry.get('description'),
+        'tag_ids': entry.get('tag_ids') or [],
+        'tags': names.tag_names(entry),
+        'billable': entry.get('billable'),
+        'start': entry['start'],
+        'stop': entry.get('stop'),
+        'duration': entry['duration'],
+    }
+
+
+# Writers
+
+class ExportWriter:
+    """
+    ABC for chunked row writers.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, rows: list[dict]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class CSVWriter(ExportWriter):
+    """
+    Lists are joined with ', ' so each row stays one line.
+    """
+    def __init__(self, path):
+        super().__init__(path)
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDS)
+        self._writer.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            row['tag_ids'] = ', '.join(map(str, row['tag_ids']))
+            row['tags'] = ', '.join(row['tags'])
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class JSONLWriter(ExportWriter):
+    def __init__(self, path):
+        super().__init__(path)
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        self._file.write(''.join(json.dumps(row) + '\n' for row in rows))
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter(ExportWriter):
+    """
+    Writes each chunk as a Parquet row group. Requires `pyarrow`.
+    """
+    def __init__(self, path):
+        super().__init__(path)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow, install it with `pip install pyarrow`.") from None
+        self._pa = pa
+        self.schema = pa.schema([
+            ('id', pa.int64()),
+            ('workspace_id', pa.int64()),
+            ('user_id', pa.int64()),
+            ('project_id', pa.int64()),
+            ('project', pa.string()),
+            ('client', pa.string()),
+            ('description', pa.string()),
+            ('tag_ids', pa.list_(pa.int64())),
+            ('tags', pa.list_(pa.string())),
+            ('billable', pa.bool_()),
+            ('start', pa.string()),
+            ('stop', pa.string()),
+            ('duration', pa.int64()),
+        ])
+        self._writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        self._writer.write_table(self._pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+# Map of format name -> writer class
+WRITERS = {
+    'csv': CSVWriter,
+    'jsonl': JSONLWriter,
+    'parquet': ParquetWriter,
+}
+
+
+# Export pipeline
+
+def date_windows(start: dt.datetime, end: dt.datetime, window: dt.timedelta):
+    """
+    Split [start, end) into consecutive windows of at most `window`.
+    """
+    while start < end:
+        stop = min(start + window, end)
+        yield start, stop
+        start = stop
+
+
+async def iter_time_entries(http: 'TrackHTTPClient', start: dt.datetime, end: dt.datetime,
+                            window: dt.timedelta = dt.timedelta(days=7)) -> AsyncIterator[dict]:
+    """
+    Asynchronously yield the raw time entry payloads starting in [start, end), one window at a time.
+
+    Windows are fetched in increasing order, while entries within a window come in API order.
+    Only one entry is decoded at a time.
+    """
+    for window_start, window_end in date_windows(start, end, window):
+        stream = http.stream_my_time_entries(
+            start_date=window_start.isoformat(), end_date=window_end.isoformat()
+        )
+        async with aclosing(stream) as events:
+            async for event in events:
+                if event.kind == ITEM:
+                    yield event.value
+
+
+async def export_time_entries(http: 'TrackHTTPClient', path, start: dt.datetime, end: dt.datetime,
+                              format: Optional[str] = None, chunk_size: int = 1000,
+                              window: dt.timedelta = dt.timedelta(days=7),
+                              names: Optional[NameLookup] = None,
+                              state: Optional['TrackState'] = None,
+                              executor: Optional['Executor'] = None) -> ExportStats:
+    """
+    Export the time entries starting in [start, end) to `path`.
+
+    The format is one of `WRITERS`, guessed from the path suffix if not given.
+    At most `chunk_size` rows are held in memory at once, besides the chunk being written.
+    Writes run in `executor`, or the client's, falling back to the default thread pool.
+    """
+    from .offload import run_in_thread
+
+    if format is None:
+        format = str(path).rsplit('.', 1)[-1].lower()
+    if format not in WRITERS:
+        raise ValueError(f"Unknown export format {format!r}, expected one of {', '.join(WRITERS)}.")
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=dt.timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=dt.timezone.utc)
+    if names is None:
+        names = NameLookup(http, state)
+        await names.load()
+    if executor is None:
+        executor = http.executor
+
+    began = time.perf_counter()
+    rows = chunks = 0
+    chunk = []
+    # Write of the previous chunk, which runs while the next one is streamed
+    writing: Optional[asyncio.Future] = None
+
+    async def write(chunk):
+        nonlocal writing
+        if writing is not None:
+            await writing
+        writing = asyncio.ensure_future(run_in_thread(executor, writer.write, chunk))
+
+    writer = await run_in_thread(executor, WRITERS[format], path)
+    try:
+        async for entry in iter_time_entries(http, start, end, window):
+            if entry.get('server_deleted_at') is not None:
+                continue
+            chunk.append(entry_row(entry, names))
+            if len(chunk) >= chunk_size:
+                await write(chunk)
+                rows += len(chunk)
+                chunks += 1
+                chunk = []
+        if chunk:
+            await write(chunk)
+            rows += len(chunk)
+            chunks += 1
+        if writing is not None:
+            await writing
+    finally:
+        # The file may only be closed once the thread writing to it finished
+        if writing is not None and not writing.done():
+            await asyncio.wait([writing])
+        await run_in_thread(executor, writer.close)
+
+    windows = sum(1 for _ in date_windows(start, end, window))
+    stats = ExportStats(rows, chunks, windows, time.perf_counter() - began)
+    logger.info("Exported %d time entries to %s in %.2fs.", rows, path, stats.elapsed)
+    return stats
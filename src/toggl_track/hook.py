@@ -0,0 +1,44 @@
+"""
+Applying Toggl Track webhook events to a `TrackState`.
+"""
+import logging
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .state import TrackState
+
+logger = logging.getLogger(__name__)
+
+
+# Map of webhook model name -> state collection
+WEBHOOK_MODELS = {
+    'workspace': 'workspaces',
+    'client': 'clients',
+    'tag': 'tags',
+    'project': 'projects',
+    'time_entry': 'time_entries',
+}
+
+
+def apply_webhook_event(state: 'TrackState', event: dict):
+    """
+    Apply a decoded webhook event body to the state.
+
+    Created and updated models are loaded through the usual `add_*_data` paths,
+    and deleted models are removed, so state subscribers are notified either way.
+    Returns the affected model, or None if the event was ignored.
+    """
+    metadata = event.get('metadata', None) or {}
+    payload = event.get('payload', None)
+    collection = WEBHOOK_MODELS.get(metadata.get('model', None), None)
+
+    if collection is None or not isinstance(payload, dict):
+        # Pings, validation requests and models we do not track
+        logger.debug("Ignoring webhook event %s.", event.get('event_id', None))
+        return None
+
+    if metadata.get('action', None) == 'deleted':
+        return state.remove_model(collection, payload['id'])
+
+    loader = getattr(state, state.collection_loaders[collection])
+    return loader(payload)
@@ -1,13 +1,24 @@
 import json
 import logging
 import asyncio
-import aiohttp
-from typing import Optional
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Iterable, Optional, TYPE_CHECKING, Union
 
 from base64 import b64encode
 
-from .errors import HTTPException, LoginFailure, NotFound, PaymentRequired
-from .lib import slow_lock
+from .errors import CircuitOpen, DeadlineExceeded, HTTPException, LoginFailure, NotFound, PaymentRequired, TooManyRequests
+from .lib import BACKGROUND, INTERACTIVE, expiry, slow_lock
+from .metrics import RequestRecord, TrackMetrics
+from .priority import PriorityLock
+from .resilience import CircuitBreaker, LatencyWindow, hedged
+from .stream import JSONStreamDecoder
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    import aiohttp
 
 logger = logging.getLogger(__name__)
 
@@ -19,9 +30,8 @@ class Route:
         self.path = path
         self.method = method
 
-        url = self.BASE + self.path
-
-        self.url = url.format(**parameters) if parameters else url
+        self.endpoint = path.format(**parameters) if parameters else path
+        self.url = self.BASE + self.endpoint
 
 
 class AccountsRoute(Route):
@@ -34,67 +44,316 @@ class TrackHTTPClient:
     """
     user_agent = "Toggl.py v2 written by Interitio (cona@thewisewolf.dev)"
 
-    def __init__(self, user_agent=None, loop=None):
+    def __init__(self, user_agent=None, loop=None, base_url=None, request_interval=1, max_retries=3,
+                 metrics: Optional[TrackMetrics] = None,
+                 executor: Optional['Executor'] = None, offload_threshold: int = 2**20,
+                 hedge: Union[bool, Iterable[str]] = False, hedge_quantile: float = 0.95,
+                 breaker_threshold: Optional[int] = None, breaker_reset: float = 30.0,
+                 timeout: Optional[float] = None):
         if user_agent is not None:
             self.user_agent = user_agent
 
         self.loop = loop or asyncio.get_event_loop()
-        self._lock = asyncio.Lock()
+        # Rate limit lock, which interactive requests jump the queue for
+        self._lock = PriorityLock()
+
+        # Alternative API root to send Track requests to, e.g. a local test server
+        self.base_url: None | str = base_url
+
+        # Seconds to hold the request lock after each request, for rate limiting
+        self.request_interval = request_interval
+
+        # Number of times to retry a request rejected with 429 Too Many Requests
+        self.max_retries = max_retries
+
+        # Default seconds each request may take including its wait on the rate limiter, or None for no limit.
+        # Requests made within a `lib.deadline` block are also bound by it
+        self.timeout = timeout
+
+        # Instrumentation hooks, shared with any TrackState using this client
+        self.metrics: TrackMetrics = metrics or TrackMetrics()
+
+        # Thread or process pool to decode response bodies of at least `offload_threshold` bytes in,
+        # so large responses do not block the event loop
+        self.executor: Optional['Executor'] = executor
+        self.offload_threshold = offload_threshold
+
+        # GET requests to hedge, on every route if True or on the given route paths,
+        # once the first attempt takes longer than the `hedge_quantile` of the route's recent latencies
+        self.hedge = hedge if isinstance(hedge, bool) else frozenset(hedge)
+        self.hedge_quantile = hedge_quantile
+
+        # Map of (method, path) -> LatencyWindow of successful requests
+        self.latencies: defaultdict[tuple[str, str], LatencyWindow] = defaultdict(LatencyWindow)
+
+        # Consecutive failures opening the circuit breaker of a route, or None for no circuit breakers
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+
+        # Map of (method, path) -> CircuitBreaker
+        self.breakers: dict[tuple[str, str], CircuitBreaker] = {}
 
         self.authHeader: None | str = None  # Set upon login
 
-        self.session: None | aiohttp.ClientSession = None
+        self.session: Optional['aiohttp.ClientSession'] = None
 
     async def close(self):
         if self.session:
             await self.session.close()
 
-    async def request(self, route, static=True, data=None, **kwargs):
+    def _breaker(self, route) -> Optional[CircuitBreaker]:
+        if self.breaker_threshold is None:
+            return None
+        key = (route.method, route.path)
+        breaker = self.breakers.get(key, None)
+        if breaker is None:
+            breaker = self.breakers[key] = CircuitBreaker(
+                self.breaker_threshold, self.breaker_reset,
+                on_change=lambda state: self.metrics.on_circuit(route.method, route.path, state)
+            )
+        return breaker
+
+    def _hedge_delay(self, route) -> Optional[float]:
+        """
+        Seconds after which to hedge a request, or None if it should not be hedged.
+        """
+        if route.method != 'GET' or not self.hedge:
+            return None
+        if self.hedge is not True and route.path not in self.hedge:
+            return None
+        return self.latencies[(route.method, route.path)].quantile(self.hedge_quantile)
+
+    @staticmethod
+    def _is_failure(error) -> bool:
+        """
+        Whether an error suggests the API is degraded, rather than the request being refused.
+        """
+        if isinstance(error, HTTPException):
+            return error.response.status >= 500
+        # aiohttp is always imported once a session exists
+        import aiohttp
+        return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, OSError))
+
+    @asynccontextmanager
+    async def _send(self, route, static=True, data=None, priority=BACKGROUND, **kwargs):
+        """
+        Send a request under the rate limit lock, retrying on 429 responses.
+
+        Yields the successful response along with a dict of request statistics,
+        which the caller may update while reading the body.
+        Error responses are raised as the appropriate `HTTPException`,
+        and requests on a route with an open circuit breaker raise `CircuitOpen` without waiting on the lock.
+        Waiting requests are sent in `priority` order, see `PriorityLock`.
+        Requests which outlive the client `timeout` or the current `lib.deadline` raise `DeadlineExceeded`,
+        in which case the lock is still held for the request interval if a request was sent.
+        """
         if self.session is None or self.session.closed:
             raise ValueError("Session is closed or not started.")
         if not self.authHeader:
             raise ValueError("Cannot request before login.")
 
         if 'params' in kwargs:
-            kwargs['params'] = {key: json.dumps(obj) for key, obj in kwargs['params'].items()}
-
-        await self._lock.acquire()
-        with slow_lock(self._lock, self.loop, 1):
-            headers = {
-                "Content-Type": "application/json",
-                "Accept": "*/*",
-                "User-Agent": self.user_agent,
+            kwargs['params'] = {
+                key: obj if isinstance(obj, str) else json.dumps(obj)
+                for key, obj in kwargs['params'].items()
             }
-            if static:
-                headers["Authorization"] = self.authHeader
-            if data is not None:
-                kwargs['data'] = json.dumps(data)
 
-            logger.debug(
-                f"Sending {route.method} request to {route.url}."
-            )
+        url = route.url
+        if self.base_url is not None and not isinstance(route, AccountsRoute):
+            url = self.base_url + route.endpoint
 
-            async with self.session.request(route.method, route.url, headers=headers, **kwargs) as resp:
-                text = await resp.text(encoding='utf-8')
-
-                logger.debug(
-                    f"{route.url} response {resp.status}: {text}"
-                )
-                if 300 > resp.status >= 200:
-                    # Okay response, parse and return
-                    return json.loads(text)
-                elif resp.status == 402:
-                    raise PaymentRequired(resp, text)
-                elif resp.status == 403:
-                    raise LoginFailure
-                elif resp.status == 404:
-                    raise NotFound(resp, text)
-                else:
-                    raise HTTPException(resp, text)
+        breaker = self._breaker(route)
+        if breaker is not None and not breaker.allow():
+            self.metrics.on_request(RequestRecord(
+                route.method, route.path, None, 0.0, 0.0, 0, 0.0, 0, CircuitOpen.__name__, priority
+            ))
+            raise CircuitOpen(f"{route.method} {route.path}", breaker.retry_in())
 
-    async def login(self, APIKey=None, username=None, password=None):
+        expires = expiry(self.timeout)
+        wait_start = time.perf_counter()
+        try:
+            if expires is None:
+                await self._lock.acquire(priority)
+            else:
+                await asyncio.wait_for(self._lock.acquire(priority), expires - time.monotonic())
+        except BaseException as e:
+            if breaker is not None:
+                breaker.release()
+            if isinstance(e, asyncio.TimeoutError):
+                self.metrics.on_request(RequestRecord(
+                    route.method, route.path, None, time.perf_counter() - wait_start, 0.0, 0, 0.0, 0,
+                    DeadlineExceeded.__name__, priority
+                ))
+                raise DeadlineExceeded(f"{route.method} {route.path}", "waiting on the rate limiter") from None
+            raise
+        wait = time.perf_counter() - wait_start
+
+        stats = {'status': None, 'latency': 0.0, 'size': 0, 'parse_time': 0.0, 'retries': 0}
+        error = None
+        with slow_lock(self._lock, self.loop, self.request_interval):
+            try:
+                headers = {
+                    "Content-Type": "application/json",
+                    "Accept": "*/*",
+                    "User-Agent": self.user_agent,
+                }
+                if static:
+                    headers["Authorization"] = self.authHeader
+                if data is not None:
+                    kwargs['data'] = json.dumps(data)
+
+                logger.debug("Sending %s request to %s.", route.method, url)
+
+                # aiohttp is always imported once a session exists
+                import aiohttp
+
+                def send():
+                    if expires is not None:
+                        # Bounds connecting and reading the whole response, including the caller's reading of the body
+                        kwargs['timeout'] = aiohttp.ClientTimeout(total=max(expires - time.monotonic(), 0.001))
+                    return self.session.request(route.method, url, headers=headers, **kwargs)
+
+                for attempt in range(self.max_retries + 1):
+                    start = time.perf_counter()
+                    delay = self._hedge_delay(route)
+                    if delay is None:
+                        resp = await send()
+                    else:
+                        resp, was_hedged, hedge_won = await hedged(send, delay, release=lambda resp: resp.release())
+                        if was_hedged:
+                            self.metrics.on_hedge(route.method, route.path, delay, hedge_won)
+                    try:
+                        elapsed = time.perf_counter() - start
+                        stats['latency'] += elapsed
+                        stats['status'] = status = resp.status
+                        if 300 > status >= 200:
+                            self.latencies[(route.method, route.path)].add(elapsed)
+                            if breaker is not None:
+                                breaker.record_success()
+                            yield resp, stats
+                            return
+
+                        body = await resp.read()
+                        stats['size'] = len(body)
+                        text = body.decode('utf-8', 'replace')
+                        logger.debug("%s response %s: %s", url, status, text)
+
+                        if status == 402:
+                            raise PaymentRequired(resp, text)
+                        elif status == 403:
+                            raise LoginFailure
+                        elif status == 404:
+                            raise NotFound(resp, text)
+                        elif status == 429:
+                            retry_after = self._retry_after(resp, attempt)
+                            if attempt >= self.max_retries:
+                                raise TooManyRequests(resp, text, retry_after=retry_after)
+                        else:
+                            raise HTTPException(resp, text)
+                    finally:
+                        resp.release()
+
+                    if expires is not None and time.monotonic() + retry_after >= expires:
+                        raise DeadlineExceeded(f"{route.method} {route.path}", "rate limited")
+
+                    # Rate limited, back off while still holding the lock so other requests wait too
+                    logger.debug("Rate limited on %s, retrying in %s seconds.", url, retry_after)
+                    stats['retries'] += 1
+                    self.metrics.on_retry(route.method, route.path, status, retry_after)
+                    await asyncio.sleep(retry_after)
+            except BaseException as e:
+                exc = e
+                if expires is not None and isinstance(e, asyncio.TimeoutError) and not isinstance(e, DeadlineExceeded):
+                    exc = DeadlineExceeded(f"{route.method} {route.path}", "waiting on the response")
+                error = type(exc).__name__
+                if breaker is not None:
+                    if isinstance(exc, DeadlineExceeded):
+                        # The deadline is ours, so says nothing about the API
+                        breaker.release()
+                    elif self._is_failure(exc):
+                        breaker.record_failure()
+                    elif isinstance(exc, HTTPException):
+                        # The API answered, so it is up
+                        breaker.record_success()
+                    else:
+                        breaker.release()
+                if exc is not e:
+                    raise exc from e
+                raise
+            finally:
+                self.metrics.on_request(RequestRecord(
+                    route.method, route.path, stats['status'],
+                    wait, stats['latency'], stats['size'], stats['parse_time'], stats['retries'], error, priority
+                ))
+
+    async def request(self, route, static=True, data=None, raw=False, priority=BACKGROUND, **kwargs):
+        """
+        Send a request and return the decoded JSON response, or the undecoded body with `raw`.
+        """
+        async with self._send(route, static=static, data=data, priority=priority, **kwargs) as (resp, stats):
+            start = time.perf_counter()
+            body = await resp.read()
+            stats['latency'] += time.perf_counter() - start
+            stats['size'] = len(body)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%s response %s: %s", resp.url, resp.status, body.decode('utf-8', 'replace'))
+
+            if raw:
+                return body
+
+            # Okay response, parse and return
+            start = time.perf_counter()
+            if self.executor is not None and len(body) >= self.offload_threshold:
+                result = await asyncio.get_running_loop().run_in_executor(self.executor, json.loads, body)
+            else:
+                result = json.loads(body)
+            stats['parse_time'] = time.perf_counter() - start
+            return result
+
+    async def stream(self, route, static=True, data=None, chunk_size=2**16, priority=BACKGROUND, **kwargs):
+        """
+        Stream the response to a request as it is received.
+
+        Asynchronously yields a `StreamEvent` for each top level value of the response object,
+        and for each item of its top level arrays, see `JSONStreamDecoder`.
+        The rate limit lock is held until the generator is exhausted or closed,
+        so callers which may stop early should wrap it in `contextlib.aclosing`.
+        """
+        async with self._send(route, static=static, data=data, priority=priority, **kwargs) as (resp, stats):
+            decoder = JSONStreamDecoder()
+            async for chunk in resp.content.iter_chunked(chunk_size):
+                stats['size'] += len(chunk)
+                start = time.perf_counter()
+                events = decoder.feed(chunk)
+                stats['parse_time'] += time.perf_counter() - start
+                for event in events:
+                    yield event
+            for event in decoder.close():
+                yield event
+
+    @staticmethod
+    def _retry_after(resp, attempt):
+        """
+        Seconds to wait before retrying a rate limited response.
+
+        Uses the `Retry-After` header if present, otherwise backs off exponentially.
+        """
+        header = resp.headers.get('Retry-After')
+        try:
+            return max(float(header), 0)
+        except (TypeError, ValueError):
+            return 2 ** attempt
+
+    async def authenticate(self, APIKey=None, username=None, password=None):
+        """
+        Open a session with the given credentials, without checking them.
+        They are checked by the first request made, which raises `LoginFailure` if they are refused.
+        """
         if self.session and not self.session.closed:
             await self.session.close()
+        # aiohttp is slow to import, so defer it until a session is actually needed
+        import aiohttp
         self.session = aiohttp.ClientSession()
 
         if APIKey:
@@ -106,6 +365,9 @@ class TrackHTTPClient:
 
         self.authHeader = "Basic " + b64encode(auth.encode()).decode("ascii").rstrip()
 
+    async def login(self, APIKey=None, username=None, password=None):
+        await self.authenticate(APIKey=APIKey, username=username, password=password)
+
         # 'Log in' by getting the user profile
         return await self.get_my_profile()
 
@@ -131,12 +393,22 @@ class TrackHTTPClient:
     # --------------------
     # Me Chapter
     # --------------------
-    async def get_my_profile(self, with_related_data=False):
+    async def get_my_profile(self, with_related_data=False, raw=False):
+        params = {
+            'with_related_data': with_related_data
+        }
+
+        return await self.request(Route('GET', 'me'), params=params, raw=raw)
+
+    def stream_my_profile(self, with_related_data=False):
+        """
+        Streaming version of `get_my_profile`, see `stream`.
+        """
         params = {
             'with_related_data': with_related_data
         }
 
-        return await self.request(Route('GET', 'me'), params=params)
+        return self.stream(Route('GET', 'me'), params=params)
 
     async def get_my_projects(self, include_archived: Optional[str] = None, since: Optional[int] = None):
         params = {}
@@ -148,6 +420,36 @@ class TrackHTTPClient:
         return await self.request(Route('GET', 'me/projects'), params=params)
 
     # Get ProjectsPaginated
+    async def get_my_projects_paginated(self, start_project_id: Optional[int] = None,
+                                        since: Optional[int] = None, per_page: Optional[int] = None):
+        params = {}
+        if start_project_id is not None:
+            params['start_project_id'] = start_project_id
+        if since is not None:
+            params['since'] = since
+        if per_page is not None:
+            params['per_page'] = per_page
+
+        return await self.request(Route('GET', 'me/projects/paginated'), params=params)
+
+    async def iter_my_projects(self, start_project_id: Optional[int] = None,
+                               since: Optional[int] = None, per_page: int = 200):
+        """
+        Asynchronously iterate over pages of the user's projects, in increasing id order.
+
+        Each page is fetched only once the previous one has been consumed.
+        The cursor to resume after a given page is `page[-1]['id'] + 1`.
+        """
+        while True:
+            page = await self.get_my_projects_paginated(
+                start_project_id=start_project_id, since=since, per_page=per_page
+            )
+            if not page:
+                break
+            yield page
+            if len(page) < per_page:
+                break
+            start_project_id = page[-1]['id'] + 1
 
     async def get_my_tags(self, since: Optional[int] = None):
         params = {}
@@ -192,6 +494,35 @@ class TrackHTTPClient:
     # --------------------
 
     # Get my time entries
+    async def get_my_time_entries(self, since: Optional[int] = None, before: Optional[str] = None,
+                                  start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                  meta: Optional[bool] = None):
+        params = {}
+        if since is not None:
+            params['since'] = since
+        if before is not None:
+            params['before'] = before
+        if start_date is not None:
+            params['start_date'] = start_date
+        if end_date is not None:
+            params['end_date'] = end_date
+        if meta is not None:
+            params['meta'] = meta
+
+        return await self.request(Route('GET', 'me/time_entries'), params=params)
+
+    def stream_my_time_entries(self, start_date: Optional[str] = None, end_date: Optional[str] = None):
+        """
+        Streaming version of `get_my_time_entries`, see `stream`.
+        The response is a single array, so each entry is yielded as an item with key None.
+        """
+        params = {}
+        if start_date is not None:
+            params['start_date'] = start_date
+        if end_date is not None:
+            params['end_date'] = end_date
+
+        return self.stream(Route('GET', 'me/time_entries'), params=params)
 
     # Get current time entry
     async def get_current_entry(self):
@@ -200,14 +531,14 @@ class TrackHTTPClient:
     # Get my time entry by id
 
     # Create a new workspace time entry
-    async def create_time_entry(self, workspace_id, meta=None, **kwargs):
+    async def create_time_entry(self, workspace_id, meta=None, priority=BACKGROUND, **kwargs):
         payload = kwargs
         payload.setdefault("created_with", self.user_agent)
         payload['workspace_id'] = workspace_id
         params = {'workspace_id': workspace_id}
         route = Route('POST', 'workspaces/{workspace_id}/time_entries', **params)
         query = {'meta': meta} if meta is not None else {}
-        return await self.request(route, data=payload, params=query)
+        return await self.request(route, data=payload, params=query, priority=priority)
 
 
     # Bulk edit workspace time entries 
@@ -217,13 +548,14 @@ class TrackHTTPClient:
     # Delete a workspace time entry 
 
     # Stop a ws time entry 
-    async def stop_entry(self, workspace_id, time_entry_id):
+    async def stop_entry(self, workspace_id, time_entry_id, priority=INTERACTIVE):
         params = {
             'workspace_id': workspace_id,
             'time_entry_id': time_entry_id,
         }
         return await self.request(
-            Route('PATCH', 'workspaces/{workspace_id}/time_entries/{time_entry_id}/stop', **params)
+            Route('PATCH', 'workspaces/{workspace_id}/time_entries/{time_entry_id}/stop', **params),
+            priority=priority
         )
 
 
@@ -231,6 +563,46 @@ class TrackHTTPClient:
     # Organizations Chapter
     # --------------------
 
+    async def get_my_organizations(self):
+        return await self.request(Route('GET', 'me/organizations'))
+
+    async def get_organization(self, organization_id: int):
+        return await self.request(Route('GET', 'organizations/{organization_id}', organization_id=organization_id))
+
+    # Get users in an organization
+    async def get_organization_users(self, organization_id: int,
+                                     page: Optional[int] = None, per_page: Optional[int] = None,
+                                     name: Optional[str] = None, active_status: Optional[str] = None):
+        params = {}
+        if page is not None:
+            params['page'] = page
+        if per_page is not None:
+            params['per_page'] = per_page
+        if name is not None:
+            params['filter'] = name
+        if active_status is not None:
+            params['active_status'] = active_status
+
+        route = Route('GET', 'organizations/{organization_id}/users', organization_id=organization_id)
+        return await self.request(route, params=params)
+
+    async def iter_organization_users(self, organization_id: int, page: int = 1, per_page: int = 200, **kwargs):
+        """
+        Asynchronously iterate over pages of the users in an organization, starting from `page`.
+        """
+        while True:
+            users = await self.get_organization_users(organization_id, page=page, per_page=per_page, **kwargs)
+            if not users:
+                break
+            yield users
+            if len(users) < per_page:
+                break
+            page += 1
+
+    async def get_organization_workspaces(self, organization_id: int):
+        route = Route('GET', 'organizations/{organization_id}/workspaces', organization_id=organization_id)
+        return await self.request(route)
+
     # --------------------
     # Workspace Chapter
     # --------------------
@@ -244,6 +616,8 @@ class TrackHTTPClient:
     # Edit a workspace (Post, but without a workspace id?)
 
     # Get a workspace by id
+    async def get_workspace(self, workspace_id: int):
+        return await self.request(Route('GET', 'workspaces/{workspace_id}', workspace_id=workspace_id))
 
     # Update a workspace by id
 
@@ -277,7 +651,16 @@ class TrackHTTPClient:
     # Clients Chapter
     # --------------------
 
-    # Get clients in a workspace 
+    # Get clients in a workspace
+    async def get_workspace_clients(self, workspace_id: int, status: Optional[str] = None, name: Optional[str] = None):
+        params = {}
+        if status is not None:
+            params['status'] = status
+        if name is not None:
+            params['name'] = name
+
+        route = Route('GET', 'workspaces/{workspace_id}/clients', workspace_id=workspace_id)
+        return await self.request(route, params=params)
 
     # Create client in a workspace
 
@@ -307,6 +690,44 @@ class TrackHTTPClient:
     # Delete a wspace project user
 
     # Get workspace projects
+    async def get_workspace_projects(self, workspace_id: int,
+                                     active: Optional[bool] = None, since: Optional[int] = None,
+                                     billable: Optional[bool] = None, name: Optional[str] = None,
+                                     page: Optional[int] = None, per_page: Optional[int] = None,
+                                     sort_field: Optional[str] = None, sort_order: Optional[str] = None):
+        params = {}
+        if active is not None:
+            params['active'] = active
+        if since is not None:
+            params['since'] = since
+        if billable is not None:
+            params['billable'] = billable
+        if name is not None:
+            params['name'] = name
+        if page is not None:
+            params['page'] = page
+        if per_page is not None:
+            params['per_page'] = per_page
+        if sort_field is not None:
+            params['sort_field'] = sort_field
+        if sort_order is not None:
+            params['sort_order'] = sort_order
+
+        route = Route('GET', 'workspaces/{workspace_id}/projects', workspace_id=workspace_id)
+        return await self.request(route, params=params)
+
+    async def iter_workspace_projects(self, workspace_id: int, page: int = 1, per_page: int = 200, **kwargs):
+        """
+        Asynchronously iterate over pages of the projects in a workspace, starting from `page`.
+        """
+        while True:
+            projects = await self.get_workspace_projects(workspace_id, page=page, per_page=per_page, **kwargs)
+            if not projects:
+                break
+            yield projects
+            if len(projects) < per_page:
+                break
+            page += 1
 
     # Create a workspace project
 
@@ -327,6 +748,16 @@ class TrackHTTPClient:
     # --------------------
     
     # Get workspace tags
+    async def get_workspace_tags(self, workspace_id: int,
+                                 page: Optional[int] = None, per_page: Optional[int] = None):
+        params = {}
+        if page is not None:
+            params['page'] = page
+        if per_page is not None:
+            params['per_page'] = per_page
+
+        route = Route('GET', 'workspaces/{workspace_id}/tags', workspace_id=workspace_id)
+        return await self.request(route, params=params)
 
     # Create workspace tag
 
@@ -1,5 +1,13 @@
 import datetime as dt
+import time
 from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+
+# Request priorities, lower values are served first, see `priority.PriorityLock`
+INTERACTIVE = 0
+BACKGROUND = 1
 
 
 @contextmanager
@@ -14,6 +22,42 @@ def slow_lock(lock, loop, delta):
         loop.call_later(delta, lock.release)
 
 
+# Monotonic time by which the current operation must finish, or None
+_deadline: ContextVar[Optional[float]] = ContextVar('toggl_track_deadline', default=None)
+
+
+@contextmanager
+def deadline(timeout: Optional[float]):
+    """
+    Bound every request made within the block, including from tasks it creates, to finish within `timeout` seconds.
+
+    Covers waiting on the rate limiter, connecting and reading, and raises `DeadlineExceeded` once spent.
+    Nested deadlines can only shorten the enclosing one. A None timeout leaves the enclosing deadline as is.
+    """
+    current = _deadline.get()
+    expires = current
+    if timeout is not None:
+        expires = time.monotonic() + timeout
+        if current is not None:
+            expires = min(expires, current)
+    token = _deadline.set(expires)
+    try:
+        yield expires
+    finally:
+        _deadline.reset(token)
+
+
+def expiry(timeout: Optional[float] = None) -> Optional[float]:
+    """
+    Monotonic time by which a request must finish, given the current deadline and a further `timeout`.
+    """
+    expires = _deadline.get()
+    if timeout is not None:
+        limit = time.monotonic() + timeout
+        expires = limit if expires is None else min(expires, limit)
+    return expires
+
+
 def utc_now():
     """
     Return the current datetime localised to utc.
@@ -0,0 +1,263 @@
+"""
+Instrumentation hooks for the HTTP client and session state.
+
+A `TrackMetrics` instance is passed to `TrackHTTPClient(metrics=...)`,
+and is shared with any `TrackState` built on that client.
+The base class ignores everything, subclasses override the hooks they care about.
+"""
+import logging
+from collections import defaultdict
+from typing import NamedTuple, Optional
+
+from .lib import BACKGROUND
+
+
+class RequestRecord(NamedTuple):
+    # HTTP method of the request
+    method: str
+
+    # Unformatted route path, e.g. 'workspaces/{workspace_id}/time_entries'
+    route: str
+
+    # Final response status, or None if no response was received
+    status: Optional[int]
+
+    # Seconds spent waiting on the rate limiter before sending
+    wait: float
+
+    # Seconds spent on the network across all attempts
+    latency: float
+
+    # Size of the final response body in bytes
+    size: int
+
+    # Seconds spent decoding the response body
+    parse_time: float
+
+    # Number of rate limited attempts which were retried
+    retries: int
+
+    # Name of the exception raised, if the request failed
+    error: Optional[str] = None
+
+    # Priority the request waited on the rate limiter with, see `priority.PriorityLock`
+    priority: int = BACKGROUND
+
+
+class TrackMetrics:
+    """
+    No-op base interface for instrumentation hooks.
+    """
+
+    def on_request(self, record: RequestRecord):
+        """
+        Called once for every completed or failed request.
+        """
+        pass
+
+    def on_retry(self, method: str, route: str, status: int, delay: float):
+        """
+        Called when a request is about to be retried after `delay` seconds.
+        """
+        pass
+
+    def on_state_load(self, collection: str, count: int, seconds: float):
+        """
+        Called after a collection of models is loaded into a `TrackState`.
+        """
+        pass
+
+    def on_hedge(self, method: str, route: str, delay: float, hedge_won: bool):
+        """
+        Called when a hedged second attempt was sent after `delay` seconds, once either attempt answered.
+        """
+        pass
+
+    def on_circuit(self, method: str, route: str, state: str):
+        """
+        Called when the circuit breaker of a route changes state, see `resilience`.
+        """
+        pass
+
+
+class MultiMetrics(TrackMetrics):
+    """
+    Dispatches every hook to each of the given metrics instances.
+    """
+
+    def __init__(self, *hooks: TrackMetrics):
+        self.hooks = hooks
+
+    def on_request(self, record):
+        for hook in self.hooks:
+            hook.on_request(record)
+
+    def on_retry(self, method, route, status, delay):
+        for hook in self.hooks:
+            hook.on_retry(method, route, status, delay)
+
+    def on_state_load(self, collection, count, seconds):
+        for hook in self.hooks:
+            hook.on_state_load(collection, count, seconds)
+
+    def on_hedge(self, method, route, delay, hedge_won):
+        for hook in self.hooks:
+            hook.on_hedge(method, route, delay, hedge_won)
+
+    def on_circuit(self, method, route, state):
+        for hook in self.hooks:
+            hook.on_circuit(method, route, state)
+
+
+class LoggingMetrics(TrackMetrics):
+    """
+    Writes every hook to a logger.
+
+    Messages are only formatted when the logger is enabled for the given level.
+    """
+
+    def __init__(self, logger: Optional[logging.Logger] = None, level=logging.DEBUG):
+        self.logger = logger or logging.getLogger('toggl_track.metrics')
+        self.level = level
+
+    def on_request(self, record):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(
+                self.level,
+                "%s %s -> %s (%s) wait %.3fs, latency %.3fs, parse %.3fs, %d bytes, %d retries",
+                record.method, record.route, record.status, record.error or 'ok',
+                record.wait, record.latency, record.parse_time, record.size, record.retries,
+            )
+
+    def on_retry(self, method, route, status, delay):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(
+                self.level,
+                "%s %s returned %s, retrying in %.2fs",
+                method, route, status, delay,
+            )
+
+    def on_state_load(self, collection, count, seconds):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(
+                self.level,
+                "Loaded %d %s in %.3fs",
+                count, collection, seconds,
+            )
+
+    def on_hedge(self, method, route, delay, hedge_won):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(
+                self.level,
+                "%s %s hedged after %.3fs, %s attempt answered first",
+                method, route, delay, 'hedge' if hedge_won else 'first',
+            )
+
+    def on_circuit(self, method, route, state):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(
+                self.level,
+                "Circuit breaker for %s %s is now %s",
+                method, route, state,
+            )
+
+
+class PrometheusMetrics(TrackMetrics):
+    """
+    In-process Prometheus style counters, gauges and histograms.
+
+    Does not depend on a Prometheus client library,
+    `render` produces the text exposition format for a scrape endpoint.
+    """
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    # Gauge values of each circuit breaker state
+    CIRCUIT_STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+    def __init__(self, prefix='toggl_track', buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+
+        # Map of metric name -> {labels: value}
+        self.counters = defaultdict(lambda: defaultdict(float))
+
+        # Map of metric name -> {labels: [bucket counts..., sum, count]}
+        self.histograms = defaultdict(dict)
+
+        # Map of metric name -> {labels: value}
+        self.gauges = defaultdict(dict)
+
+    def inc(self, name: str, labels: tuple = (), value: float = 1):
+        self.counters[name][labels] += value
+
+    def set(self, name: str, labels: tuple, value: float):
+        self.gauges[name][labels] = value
+
+    def observe(self, name: str, labels: tuple, value: float):
+        series = self.histograms[name].get(labels)
+        if series is None:
+            series = self.histograms[name][labels] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def on_request(self, record):
+        labels = (('method', record.method), ('route', record.route), ('status', str(record.status)))
+        route_labels = labels[:2]
+        self.inc('requests_total', labels)
+        self.inc('response_bytes_total', route_labels, record.size)
+        self.inc('retries_total', route_labels, record.retries)
+        if record.error is not None:
+            self.inc('request_errors_total', route_labels + (('error', record.error),))
+        self.observe('request_latency_seconds', route_labels, record.latency)
+        self.observe('rate_limit_wait_seconds', route_labels + (('priority', str(record.priority)),), record.wait)
+        self.observe('parse_seconds', route_labels, record.parse_time)
+
+    def on_state_load(self, collection, count, seconds):
+        labels = (('collection', collection),)
+        self.inc('state_loaded_total', labels, count)
+        self.observe('state_load_seconds', labels, seconds)
+
+    def on_hedge(self, method, route, delay, hedge_won):
+        labels = (('method', method), ('route', route))
+        self.inc('hedges_total', labels + (('winner', 'hedge' if hedge_won else 'first'),))
+        self.observe('hedge_delay_seconds', labels, delay)
+
+    def on_circuit(self, method, route, state):
+        labels = (('method', method), ('route', route))
+        self.inc('circuit_transitions_total', labels + (('state', state),))
+        self.set('circuit_state', labels, self.CIRCUIT_STATES.get(state, -1))
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ''
+        inner = ','.join('{}="{}"'.format(key, str(value).replace('"', '\\"')) for key, value in labels)
+        return '{' + inner + '}'
+
+    def render(self) -> str:
+        lines = []
+        for name, series in sorted(self.counters.items()):
+            full = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {full} counter")
+            for labels, value in series.items():
+                lines.append(f"{full}{self._format_labels(labels)} {value:g}")
+        for name, series in sorted(self.gauges.items()):
+            full = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {full} gauge")
+            for labels, value in series.items():
+                lines.append(f"{full}{self._format_labels(labels)} {value:g}")
+        for name, series in sorted(self.histograms.items()):
+            full = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {full} histogram")
+            for labels, values in series.items():
+                for bound, count in zip(self.buckets, values):
+                    bucket_labels = labels + (('le', f"{bound:g}"),)
+                    lines.append(f"{full}_bucket{self._format_labels(bucket_labels)} {count}")
+                bucket_labels = labels + (('le', '+Inf'),)
+                lines.append(f"{full}_bucket{self._format_labels(bucket_labels)} {values[-1]}")
+                lines.append(f"{full}_sum{self._format_labels(labels)} {values[-2]:g}")
+                lines.append(f"{full}_count{self._format_labels(labels)} {values[-1]}")
+        return '\n'.join(lines) + '\n'
@@ -4,7 +4,7 @@ from typing import Any, Optional, TYPE_CHECKING
 from attrs import define, field, Factory, validators, converters, NOTHING
 
 from . import lib_logger
-from .lib import utc_now
+from .lib import INTERACTIVE, utc_now
 
 if TYPE_CHECKING:
     from .state import TrackState
@@ -73,6 +73,21 @@ class TrackModel:
             state=state
         )
 
+    def to_data(self) -> dict:
+        """
+        Serialise the model fields into a JSON compatible payload,
+        in the same format accepted by `from_data`.
+        """
+        data = {}
+        for attr in self.__attrs_attrs__:
+            if attr.name == 'state':
+                continue
+            value = getattr(self, attr.name)
+            if isinstance(value, dt.datetime):
+                value = value.isoformat()
+            data[attr.name] = value
+        return data
+
     def update_data(self, payload):
         raise NotImplementedError
 
@@ -299,6 +314,9 @@ class TimeEntry(TrackModel, _Workspaced):
     # Time Entry ID
     id: int = field(validator=validators.instance_of(int))
 
+    # Id of the user the entry belongs to
+    user_id: Optional[int] = None
+
     # Permissions?
     permissions: Optional[str] = None
 
@@ -329,7 +347,7 @@ class TimeEntry(TrackModel, _Workspaced):
         if self.stop is not None:
             raise ValueError("Cannot stop something which is not moving!")
 
-        lib_logger.debug(f"Stopping entry: {self!r}")
+        lib_logger.debug("Stopping entry: %r", self)
         entry_data = await self.state.http.stop_entry(self.workspace_id, self.id)
         return self.state.add_entry_data(entry_data)
 
@@ -349,8 +367,8 @@ class TimeEntry(TrackModel, _Workspaced):
             create_args['tag_ids'] = self.tag_ids
         create_args.update(override_kwargs)
 
-        lib_logger.debug(f"Continuing entry: {self!r}")
-        entry_data = await self.state.http.create_time_entry(self.workspace_id, **create_args)
+        lib_logger.debug("Continuing entry: %r", self)
+        entry_data = await self.state.http.create_time_entry(self.workspace_id, priority=INTERACTIVE, **create_args)
         return self.state.add_entry_data(entry_data)
 
     @property
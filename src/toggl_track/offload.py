@@ -0,0 +1,158 @@
+"""
+Decoding and model construction off the event loop.
+
+Parsing a large related data payload and running the model converters and validators
+can block the event loop for hundreds of milliseconds.
+`decode_and_build` does both in one call which may run in a thread or process pool,
+returning the built models without a state, which `TrackState.adopt_models` then stores on the loop in batches.
+
+Example:
+    client = TrackClient(executor=concurrent.futures.ProcessPoolExecutor(2))
+    await client.login(...)
+    await client.sync()
+
+With a process pool the built models are sent back as compact chunks of field values,
+which are only unpacked into models as they are adopted, so no single step on the loop handles the whole payload.
+A thread pool avoids the copy, but still contends with the loop for the GIL,
+and in particular `json.loads` holds it for the whole body.
+"""
+import asyncio
+import datetime as dt
+import json
+import operator
+import pickle
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Iterable, Iterator, NamedTuple, Optional, Union
+
+from .models import Client, Project, Tag, TimeEntry, Workspace
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+
+# Map of payload collection key -> model class, in load order
+MODEL_CLASSES = {
+    'workspaces': Workspace,
+    'clients': Client,
+    'tags': Tag,
+    'projects': Project,
+    'time_entries': TimeEntry,
+}
+
+
+class BuiltPayload(NamedTuple):
+    # Top level values of the payload other than model collections, e.g. the profile fields of `/me`
+    values: dict
+
+    # Map of collection key -> iterable of models built without a state
+    models: dict[str, Iterable]
+
+
+def build_models(payload: dict) -> dict[str, list]:
+    """
+    Build the models of a payload and of any payloads embedded in them, as `TrackState.recursive_load_data` would.
+    """
+    built = defaultdict(list)
+
+    def visit(data):
+        for key, cls in MODEL_CLASSES.items():
+            for item in data.get(key, None) or ():
+                # Tags may be given as plain names, which we cannot load
+                if isinstance(item, str):
+                    continue
+                built[key].append(cls.from_data(item))
+                if cls is not Tag:
+                    visit(item)
+
+    visit(payload)
+    return dict(built)
+
+
+def decode_and_build(body: Union[bytes, str]) -> BuiltPayload:
+    """
+    Decode a JSON object response body and build its models.
+    Defined at module level so it can be sent to a process pool.
+    """
+    payload = json.loads(body)
+    values = {key: value for key, value in payload.items() if key not in MODEL_CLASSES}
+    return BuiltPayload(values, build_models(payload))
+
+
+def _field_names(cls) -> tuple[str, ...]:
+    return tuple(attr.name for attr in cls.__attrs_attrs__ if attr.name != 'state')
+
+
+def _pack_value(value):
+    # Aware datetimes are slow to unpickle, their isoformat round trips exactly and parses quickly
+    return value.isoformat() if isinstance(value, dt.datetime) else value
+
+
+def decode_and_pack(body: Union[bytes, str], chunk_size: int) -> BuiltPayload:
+    """
+    As `decode_and_build`, for returning from a process pool.
+
+    Each collection is packed as pickled chunks of `chunk_size` field value tuples,
+    which are much cheaper to unpickle than the models themselves.
+    """
+    built = decode_and_build(body)
+    packed = {}
+    for key, models in built.models.items():
+        getter = operator.attrgetter(*_field_names(MODEL_CLASSES[key]))
+        rows = [tuple(map(_pack_value, getter(model))) for model in models]
+        packed[key] = [
+            pickle.dumps(rows[i:i + chunk_size], protocol=pickle.HIGHEST_PROTOCOL)
+            for i in range(0, len(rows), chunk_size)
+        ]
+    return built._replace(models=packed)
+
+
+def _unpack(cls, chunks: list[bytes]) -> Iterator:
+    """
+    Rebuild the models packed by `decode_and_pack`, one chunk at a time.
+
+    The values were already converted and validated in the worker, so the attrs initialiser is bypassed.
+    """
+    names = _field_names(cls)
+    dates = [
+        i for i, attr in enumerate(attr for attr in cls.__attrs_attrs__ if attr.name != 'state')
+        if attr.type in (dt.datetime, Optional[dt.datetime])
+    ]
+    parse = dt.datetime.fromisoformat
+    setattr = object.__setattr__
+    for chunk in chunks:
+        for values in pickle.loads(chunk):
+            values = list(values)
+            for i in dates:
+                if values[i] is not None:
+                    values[i] = parse(values[i])
+            model = object.__new__(cls)
+            setattr(model, 'state', None)
+            for name, value in zip(names, values):
+                setattr(model, name, value)
+            yield model
+
+
+async def build_in_executor(executor: 'Executor', body: Union[bytes, str], chunk_size: int = 1000) -> BuiltPayload:
+    """
+    Decode a response body and build its models in the executor.
+
+    For process pools, the returned model iterables unpickle each chunk lazily as they are consumed.
+    """
+    loop = asyncio.get_running_loop()
+    if isinstance(executor, ProcessPoolExecutor):
+        built = await loop.run_in_executor(executor, decode_and_pack, body, chunk_size)
+        return built._replace(models={key: _unpack(MODEL_CLASSES[key], chunks) for key, chunks in built.models.items()})
+    return await loop.run_in_executor(executor, decode_and_build, body)
+
+
+async def run_in_thread(executor: Optional['Executor'], func, *args):
+    """
+    Run a blocking call, e.g. a file write, off the event loop.
+
+    Calls on objects owning open files cannot be sent to another process,
+    so process pools are replaced by the loop's default thread pool, as is a missing executor.
+    """
+    if isinstance(executor, ProcessPoolExecutor):
+        executor = None
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
@@ -0,0 +1,83 @@
+"""
+Priority lock for the request rate limiter of `TrackHTTPClient`.
+
+Kept apart from `lib`, which models import, so that loading models does not import asyncio.
+"""
+import asyncio
+from collections import deque
+
+from .lib import BACKGROUND, INTERACTIVE
+
+
+class PriorityLock:
+    """
+    Async lock whose waiters are served by priority, then in arrival order.
+
+    Each priority has its own lane of waiters.
+    To stop a busy high priority lane starving the others,
+    after `starvation_limit` consecutive grants which skipped a waiting lower priority lane,
+    the lock goes to the oldest waiter of the lowest priority lane instead.
+    Like `asyncio.Lock`, the lock may be released by any task, e.g. by `slow_lock`.
+    """
+
+    def __init__(self, priorities=(INTERACTIVE, BACKGROUND), starvation_limit=4):
+        self.starvation_limit = starvation_limit
+        self._locked = False
+
+        # Map of priority -> deque of waiter futures, in priority order
+        self._lanes: dict[int, deque] = {priority: deque() for priority in sorted(priorities)}
+
+        # Consecutive grants which skipped a waiting lower priority lane
+        self._skipped = 0
+
+    def locked(self) -> bool:
+        return self._locked
+
+    def waiting(self, priority=None) -> int:
+        """
+        Number of tasks waiting for the lock, in total or at the given priority.
+        """
+        lanes = self._lanes.values() if priority is None else (self._lanes[priority],)
+        return sum(1 for lane in lanes for waiter in lane if not waiter.done())
+
+    async def acquire(self, priority=BACKGROUND) -> bool:
+        if not self._locked and not self.waiting():
+            self._locked = True
+            return True
+
+        waiter = asyncio.get_running_loop().create_future()
+        lane = self._lanes[priority]
+        lane.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # We were handed the lock as we were cancelled, pass it on
+                self.release()
+            raise
+        finally:
+            try:
+                lane.remove(waiter)
+            except ValueError:
+                pass
+        return True
+
+    def release(self):
+        if not self._locked:
+            raise RuntimeError("Lock is not acquired.")
+        waiters = [lane for lane in self._lanes.values() if any(not waiter.done() for waiter in lane)]
+        if not waiters:
+            self._locked = False
+            return
+        if len(waiters) > 1 and self._skipped >= self.starvation_limit:
+            lane = waiters[-1]
+            self._skipped = 0
+        else:
+            lane = waiters[0]
+            self._skipped = self._skipped + 1 if len(waiters) > 1 else 0
+        # Hand the lock straight to the waiter, so no new arrival can take it first
+        while lane:
+            waiter = lane.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
@@ -0,0 +1,322 @@
+"""
+Structured queries over a `TrackState`.
+
+Example:
+    state.query(TimeEntry).where(project_id=123, start__gte=since).order_by('-start').limit(50)
+
+Conditions are given as `field=value` or `field__op=value`, see `OPERATORS`.
+When iterated, the planner picks the most selective index the state maintains for the conditions
+(workspace children, project and tag entry sets, running entries, or the sorted start index),
+then checks every condition on the candidates. Results are produced lazily,
+and entries left unchanged are neither repeated nor skipped if the state is updated during iteration.
+"""
+import bisect
+import itertools
+import math
+import operator
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, NamedTuple, Optional
+
+from .models import Client, Project, Tag, TimeEntry, Workspace
+
+if TYPE_CHECKING:
+    from .state import TrackState
+
+
+def _contains(value, item):
+    return value is not None and item in value
+
+
+def _icontains(value, item):
+    return value is not None and item.lower() in value.lower()
+
+
+def _isnull(value, flag):
+    return (value is None) == flag
+
+
+def _none_safe(op):
+    def compare(value, other):
+        return value is not None and op(value, other)
+    return compare
+
+
+OPERATORS = {
+    'eq': operator.eq,
+    'ne': operator.ne,
+    'lt': _none_safe(operator.lt),
+    'lte': _none_safe(operator.le),
+    'gt': _none_safe(operator.gt),
+    'gte': _none_safe(operator.ge),
+    'in': lambda value, options: value in options,
+    'contains': _contains,
+    'icontains': _icontains,
+    'isnull': _isnull,
+}
+
+# Map of queryable model class -> state collection
+COLLECTIONS = {
+    Workspace: 'workspaces',
+    Client: 'clients',
+    Tag: 'tags',
+    Project: 'projects',
+    TimeEntry: 'time_entries',
+}
+
+# Map of state collection -> WorkspaceChildren field
+WORKSPACE_CHILDREN = {
+    'clients': 'clients',
+    'tags': 'tags',
+    'projects': 'projects',
+    'time_entries': 'entries',
+}
+
+
+def _sort_key(name):
+    # None values sort after everything else
+    def key(model):
+        value = getattr(model, name)
+        return (value is None, value)
+    return key
+
+
+class Condition(NamedTuple):
+    field: str
+    op: str
+    value: Any
+
+    @classmethod
+    def parse(cls, key: str, value) -> 'Condition':
+        field, _, op = key.partition('__')
+        op = op or 'eq'
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown query operator {op!r} in {key!r}.")
+        return cls(field, op, value)
+
+    def check(self, model) -> bool:
+        return OPERATORS[self.op](getattr(model, self.field), self.value)
+
+
+class Plan(NamedTuple):
+    # Human readable description of the access path
+    description: str
+
+    # Estimated number of candidates examined
+    cost: float
+
+    # Zero argument callable returning an iterator of candidate models
+    source: Callable[[], Iterator]
+
+    # Whether the candidates already come in the requested order
+    ordered: bool = False
+
+
+class Query:
+    """
+    Lazy, immutable query over one collection of a `TrackState`.
+
+    `where`, `order_by`, `limit` and `offset` return new queries,
+    and the query is only planned and run when iterated.
+    """
+
+    def __init__(self, state: 'TrackState', model):
+        self.state = state
+        self.collection = COLLECTIONS.get(model, model)
+        if self.collection not in WORKSPACE_CHILDREN and self.collection != 'workspaces':
+            raise ValueError(f"Cannot query {model!r}.")
+        self.conditions: tuple[Condition, ...] = ()
+        self.ordering: tuple[str, ...] = ()
+        self._limit: Optional[int] = None
+        self._offset = 0
+
+    def _copy(self, **changes) -> 'Query':
+        query = object.__new__(Query)
+        query.__dict__.update(self.__dict__)
+        query.__dict__.update(changes)
+        return query
+
+    def where(self, **conditions) -> 'Query':
+        parsed = tuple(Condition.parse(key, value) for key, value in conditions.items())
+        return self._copy(conditions=self.conditions + parsed)
+
+    def order_by(self, *fields: str) -> 'Query':
+        """
+        Order by the given fields, prefixed with '-' for descending order.
+        """
+        return self._copy(ordering=tuple(fields))
+
+    def limit(self, count: Optional[int]) -> 'Query':
+        return self._copy(_limit=count)
+
+    def offset(self, count: int) -> 'Query':
+        return self._copy(_offset=count)
+
+    # Execution
+
+    def __iter__(self) -> Iterator:
+        plan = self.plan()
+        conditions = self.conditions
+        results: Iterable = (
+            model for model in plan.source()
+            if all(condition.check(model) for condition in conditions)
+        )
+        if self.ordering and not plan.ordered:
+            results = self._sort(results)
+        stop = None if self._limit is None else self._offset + self._limit
+        return itertools.islice(results, self._offset, stop)
+
+    def all(self) -> list:
+        return list(self)
+
+    def first(self):
+        return next(iter(self.limit(1)), None)
+
+    def count(self) -> int:
+        if not self.conditions and self._limit is None and not self._offset:
+            return len(getattr(self.state, self.collection))
+        return sum(1 for _ in self)
+
+    def explain(self) -> str:
+        plan = self.plan()
+        sort = " then sort" if self.ordering and not plan.ordered else ""
+        return f"{plan.description} (cost ~{plan.cost:.0f}){sort}"
+
+    def _sort(self, results: Iterable) -> list:
+        results = list(results)
+        # Stable sorts from the least significant field, so each field may have its own direction
+        for field in reversed(self.ordering):
+            results.sort(key=_sort_key(field.lstrip('-')), reverse=field.startswith('-'))
+        return results
+
+    # Planning
+
+    def plan(self) -> Plan:
+        """
+        Choose the cheapest access path for the current conditions and ordering.
+        """
+        models = getattr(self.state, self.collection)
+        plans = [Plan("full scan", len(models), lambda: iter(list(models.values())))]
+
+        for condition in self.conditions:
+            plan = self._set_plan(condition, models)
+            if plan is not None:
+                plans.append(plan)
+
+        if self.collection == 'time_entries':
+            plan = self._start_plan(models, min(plan.cost for plan in plans))
+            if plan is not None:
+                plans.append(plan)
+
+        if self.ordering:
+            # Unordered plans have to materialise and sort every candidate
+            plans = [
+                plan if plan.ordered else plan._replace(cost=plan.cost + plan.cost * math.log2(plan.cost + 1))
+                for plan in plans
+            ]
+        return min(plans, key=lambda plan: plan.cost)
+
+    def _ids_plan(self, description, ids: set, models) -> Plan:
+        return Plan(
+            description, len(ids),
+            lambda: (models[mid] for mid in list(ids) if mid in models)
+        )
+
+    def _set_plan(self, condition: Condition, models) -> Optional[Plan]:
+        field, op, value = condition
+        if op not in ('eq', 'in', 'contains'):
+            return None
+        values = list(value) if op == 'in' else [value]
+        state = self.state
+
+        index = None
+        if field == 'id' and op in ('eq', 'in'):
+            return self._ids_plan(f"id lookup {field} {op}", set(values), models)
+        elif field in ('workspace_id', 'wid') and op in ('eq', 'in') and self.collection in WORKSPACE_CHILDREN:
+            child = WORKSPACE_CHILDREN[self.collection]
+            index = {
+                wid: getattr(state.workspace_children[wid], child)
+                for wid in values if wid in state.workspace_children
+            }
+        elif self.collection == 'time_entries':
+            if field == 'project_id' and op in ('eq', 'in'):
+                index = state.project_entries
+            elif field == 'tag_ids' and op == 'contains':
+                index = state.tag_entries
+            elif field == 'running' and op == 'eq' and value is True:
+                return self._ids_plan("running entries index", state.running_entries, models)
+        if index is None:
+            return None
+
+        sets = [index[v] for v in values if v in index]
+        if len(sets) == 1:
+            ids = sets[0]
+        else:
+            ids = set().union(*sets)
+        return self._ids_plan(f"{field} index {op} {value!r}", ids, models)
+
+    def _start_plan(self, models, estimate) -> Optional[Plan]:
+        lower = upper = None
+        lower_inclusive = upper_inclusive = True
+        for field, op, value in self.conditions:
+            if field != 'start':
+                continue
+            if op in ('gte', 'gt', 'eq') and (lower is None or value > lower):
+                lower, lower_inclusive = value, op != 'gt'
+            if op in ('lte', 'lt', 'eq') and (upper is None or value < upper):
+                upper, upper_inclusive = value, op != 'lt'
+
+        ordered = self.ordering in (('start',), ('-start',))
+        if lower is None and upper is None and not ordered:
+            return None
+
+        def bounds(index):
+            i = 0
+            j = len(index)
+            if lower is not None:
+                i = bisect.bisect_left(index, (lower,)) if lower_inclusive else bisect.bisect_right(index, (lower, math.inf))
+            if upper is not None:
+                j = bisect.bisect_right(index, (upper, math.inf)) if upper_inclusive else bisect.bisect_left(index, (upper,))
+            return i, max(i, j)
+
+        i, j = bounds(self.state.entries_by_start())
+        size = j - i
+
+        descending = self.ordering == ('-start',)
+
+        def source():
+            # The index is maintained as entries are loaded, possibly while the results are consumed,
+            # so each step resumes from the last key seen rather than from a fixed position
+            index = self.state.entries_by_start()
+            first, end = bounds(index)
+            if descending:
+                position = end - 1
+                while position >= 0:
+                    key = index[position]
+                    if lower is not None and (key[0] < lower or (key[0] == lower and not lower_inclusive)):
+                        return
+                    model = models.get(key[1], None)
+                    if model is not None:
+                        yield model
+                    if position < len(index) and index[position] == key:
+                        position -= 1
+                    else:
+                        position = bisect.bisect_left(index, key) - 1
+            else:
+                position = first
+                while position < len(index):
+                    key = index[position]
+                    if upper is not None and (key[0] > upper or (key[0] == upper and not upper_inclusive)):
+                        return
+                    model = models.get(key[1], None)
+                    if model is not None:
+                        yield model
+                    if position < len(index) and index[position] == key:
+                        position += 1
+                    else:
+                        position = bisect.bisect_right(index, key)
+
+        cost = size
+        if ordered and self._limit is not None and size:
+            # Scanning in order can stop once enough matches are found
+            matches = max(min(estimate, size), 1)
+            cost = min(size, (self._offset + self._limit) * size / matches)
+        return Plan(f"start index range [{i}:{j}]", cost, source, ordered=ordered)
@@ -0,0 +1,152 @@
+"""
+Latency tracking, request hedging and circuit breaking for `TrackHTTPClient`.
+
+Hedging sends a second copy of a slow idempotent request once the first has taken longer than
+a high quantile of the route's recent latencies, and uses whichever answers first.
+A circuit breaker counts consecutive server or transport failures on a route,
+and once open fails requests on that route immediately until a trial request succeeds.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+
+# Circuit breaker states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class LatencyWindow:
+    """
+    Rolling window of the most recent latencies of a route.
+    """
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.samples: deque[float] = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, latency: float):
+        self.samples.append(latency)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        The `q` quantile of the window, or None until it holds `min_samples` latencies.
+        """
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+class CircuitBreaker:
+    """
+    Consecutive failure circuit breaker for a single route.
+
+    Opens after `threshold` consecutive failures.
+    After `reset_timeout` seconds a single trial request is let through,
+    which closes the circuit on success or opens it again on failure.
+    """
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30.0,
+                 on_change: Optional[Callable[[str], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.on_change = on_change
+        self.clock = clock
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+        # Whether the half open trial request is in flight
+        self._trial = False
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            self.state = state
+            if self.on_change is not None:
+                self.on_change(state)
+
+    def retry_in(self) -> float:
+        """
+        Seconds until an open circuit lets a trial request through.
+        """
+        if self.state != OPEN:
+            return 0.0
+        return max(self.opened_at + self.reset_timeout - self.clock(), 0.0)
+
+    def allow(self) -> bool:
+        """
+        Whether a request may be sent now. A True result in the half open state claims the trial.
+        """
+        if self.state == OPEN:
+            if self.retry_in() > 0:
+                return False
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._trial:
+                return False
+            self._trial = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self._trial = False
+        self._set_state(CLOSED)
+
+    def record_failure(self):
+        self._trial = False
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            self.opened_at = self.clock()
+            self._set_state(OPEN)
+
+    def release(self):
+        """
+        Give up a claimed trial without an outcome, e.g. when the request was cancelled.
+        """
+        self._trial = False
+
+
+async def hedged(send: Callable[[], Awaitable], delay: float, release: Optional[Callable] = None):
+    """
+    Await `send()`, starting a second `send()` if the first takes longer than `delay` seconds.
+
+    Returns (result, hedged, hedge_won). The first successful result wins and the other attempt is cancelled,
+    or passed to `release` if it also completed. If both attempts fail the last error is raised.
+    """
+    primary = asyncio.ensure_future(send())
+    tasks = [primary]
+    winner = None
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            winner = primary
+            return primary.result(), False, False
+
+        hedge = asyncio.ensure_future(send())
+        tasks.append(hedge)
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in tasks:
+                if task not in done:
+                    continue
+                if task.exception() is None:
+                    winner = task
+                    return task.result(), True, task is hedge
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if task is winner:
+                continue
+            if not task.done():
+                task.cancel()
+            elif release is not None and not task.cancelled() and task.exception() is None:
+                release(task.result())
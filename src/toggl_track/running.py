@@ -0,0 +1,159 @@
+"""
+Live totals of running time entries.
+
+`TimeEntry.actual_duration` reads the clock and builds a datetime on every access.
+`RunningTotals` instead keeps the start of each running entry as integer epoch seconds,
+along with the number of running entries and the sum of their starts per user, project and workspace.
+The live total of a group at any `now` is then `count * now - start_sum`,
+so reporting every group costs one clock read and plain integer arithmetic, without touching the entries.
+
+A `TrackState` maintains its own instance, see `TrackState.running_totals`.
+Dashboards over many users may feed a single instance from each client's state events:
+    totals = RunningTotals()
+    for client in clients:
+        totals.update_all(client.state.time_entries.values())
+        client.state.subscribe(totals.apply_events, collections=['time_entries'])
+"""
+import time
+from typing import TYPE_CHECKING, Hashable, Iterable, NamedTuple, Optional
+
+from .events import DELETED
+
+if TYPE_CHECKING:
+    from .events import StateEvent
+    from .models import TimeEntry
+
+
+# Groups totals are kept for, keyed by the matching `RunningEntry` id field
+GROUPS = ('user', 'project', 'workspace')
+
+
+class RunningEntry(NamedTuple):
+    # Time entry id
+    id: int
+
+    # Start of the entry in unix epoch seconds
+    start: int
+
+    # Owning user, project and workspace ids, in the order of `GROUPS`
+    user_id: Optional[int]
+    project_id: Optional[int]
+    workspace_id: int
+
+
+def epoch_now() -> int:
+    return int(time.time())
+
+
+class RunningTotals:
+    """
+    Running entries with precomputed start epochs and per group aggregates.
+
+    Durations are in whole seconds for the given `now` epoch, by default the current time.
+    Entries starting after `now` count negatively, as their raw duration would.
+    """
+
+    def __init__(self, entries: Iterable['TimeEntry'] = ()):
+        # Map of entry id -> RunningEntry
+        self.entries: dict[int, RunningEntry] = {}
+
+        # Number of running entries and sum of their starts, overall and per group key
+        self.count = 0
+        self.start_sum = 0
+
+        # Map of group -> {key: [count, start_sum]}
+        self.groups: dict[str, dict[Hashable, list[int]]] = {group: {} for group in GROUPS}
+
+        self.update_all(entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, entry_id: int):
+        return entry_id in self.entries
+
+    def _apply(self, record: RunningEntry, sign: int):
+        self.count += sign
+        self.start_sum += sign * record.start
+        for aggregates, key in zip(self.groups.values(), record[2:]):
+            aggregate = aggregates.get(key, None)
+            if aggregate is None:
+                aggregate = aggregates[key] = [0, 0]
+            aggregate[0] += sign
+            aggregate[1] += sign * record.start
+            if not aggregate[0]:
+                del aggregates[key]
+
+    def update(self, entry: 'TimeEntry') -> bool:
+        """
+        Track the entry if it is running, otherwise stop tracking it. Returns whether it is now tracked.
+        """
+        self.remove(entry.id)
+        if not entry.running or entry.server_deleted_at is not None:
+            return False
+        record = RunningEntry(
+            entry.id, int(entry.start.timestamp()), entry.user_id, entry.project_id, entry.workspace_id
+        )
+        self.entries[entry.id] = record
+        self._apply(record, 1)
+        return True
+
+    def update_all(self, entries: Iterable['TimeEntry']):
+        for entry in entries:
+            self.update(entry)
+
+    def remove(self, entry_id: int) -> Optional[RunningEntry]:
+        record = self.entries.pop(entry_id, None)
+        if record is not None:
+            self._apply(record, -1)
+        return record
+
+    def apply_events(self, events: list['StateEvent']):
+        """
+        Update from a batch of state events, for use as a `TrackState.subscribe` callback.
+        """
+        for event in events:
+            if event.collection != 'time_entries':
+                continue
+            if event.kind == DELETED:
+                self.remove(event.id)
+            else:
+                self.update(event.model)
+
+    # Reporting
+
+    def total(self, now: Optional[int] = None) -> int:
+        """
+        Combined duration of every running entry.
+        """
+        if now is None:
+            now = epoch_now()
+        return self.count * now - self.start_sum
+
+    def group_total(self, group: str, key, now: Optional[int] = None) -> int:
+        """
+        Combined duration of the running entries of one user, project or workspace.
+        """
+        aggregate = self.groups[group].get(key, None)
+        if aggregate is None:
+            return 0
+        if now is None:
+            now = epoch_now()
+        return aggregate[0] * now - aggregate[1]
+
+    def totals(self, group: str, now: Optional[int] = None) -> dict:
+        """
+        Map of key -> combined running duration for every key of a group with running entries,
+        e.g. `totals('project')`. Entries without a project are keyed by None.
+        """
+        if now is None:
+            now = epoch_now()
+        return {key: count * now - start_sum for key, (count, start_sum) in self.groups[group].items()}
+
+    def durations(self, now: Optional[int] = None) -> dict[int, int]:
+        """
+        Map of entry id -> current duration of every running entry.
+        """
+        if now is None:
+            now = epoch_now()
+        return {eid: now - record.start for eid, record in self.entries.items()}
@@ -0,0 +1,315 @@
+"""
+Incremental description index for timer autocompletion.
+
+Past (description, project) pairs are indexed per workspace by the words of the description.
+Each pair carries a frecency score, the sum over its uses of `2 ** (start / half_life)`,
+so recent and frequent pairs rank first while the relative order of pairs never depends on the current time.
+Scores are kept as base 2 logarithms, since the sums themselves overflow floats for short half lives or late starts.
+
+Suggestions match every word of the query as a word prefix, case insensitively.
+The best pairs for each queried prefix are cached and kept up to date as entries are added,
+so repeated keystroke queries only examine a handful of candidates.
+"""
+import bisect
+import heapq
+import math
+import re
+from typing import NamedTuple, Optional
+
+
+WORD = re.compile(r'\w+')
+
+# Prefix sets at most this large are ranked directly rather than through the cache
+BRUTE_FORCE_LIMIT = 256
+
+# Number of ranked pairs cached for each queried prefix
+CACHE_SIZE = 64
+
+# Removing a use leaving less than this fraction of a score recomputes it from the remaining uses,
+# since subtracting nearly equal sums loses the smaller uses to rounding
+CANCELLATION_LIMIT = 2.0 ** -20
+
+
+def tokenise(text: Optional[str]) -> list[str]:
+    return WORD.findall(text.lower()) if text else []
+
+
+def _log2_add(a: float, b: float) -> float:
+    """
+    `log2(2 ** a + 2 ** b)` without overflow.
+    """
+    if a < b:
+        a, b = b, a
+    if b == -math.inf:
+        return a
+    return a + math.log1p(2.0 ** (b - a)) / math.log(2)
+
+
+def _log2_sum(values) -> float:
+    """
+    `log2(sum(2 ** value for value in values))` without overflow, -inf for no values.
+    """
+    values = list(values)
+    if not values:
+        return -math.inf
+    top = max(values)
+    return top + math.log2(math.fsum(2.0 ** (value - top) for value in values))
+
+
+class Suggestion(NamedTuple):
+    description: str
+    project_id: Optional[int]
+
+    # Tags of the most recent use
+    tag_ids: list[int]
+
+    # Number of entries with this description and project
+    count: int
+
+    # Start of the most recent use, as a unix timestamp
+    last_used: float
+
+    # Id of the most recent entry
+    entry_id: int
+
+
+class _Pair:
+    __slots__ = (
+        'key', 'description', 'project_id', 'words', 'count', 'score', 'uses', 'last_used', 'entry_id', 'tag_ids'
+    )
+
+    def __init__(self, key, words):
+        self.key = key
+        self.description, self.project_id = key
+        self.words = words
+        self.count = 0
+
+        # Base 2 logarithm of the frecency score
+        self.score = -math.inf
+
+        # Map of entry_id -> (log2 weight, start timestamp, tag ids) of each use
+        self.uses = {}
+        self.last_used = float('-inf')
+        self.entry_id = None
+        self.tag_ids = []
+
+    def suggestion(self) -> Suggestion:
+        return Suggestion(
+            self.description, self.project_id, list(self.tag_ids),
+            self.count, self.last_used, self.entry_id
+        )
+
+
+def _score(pair: _Pair):
+    return pair.score
+
+
+def _prefixes(words):
+    return {word[:end] for word in words for end in range(1, len(word) + 1)}
+
+
+class _WorkspaceIndex:
+    def __init__(self):
+        # Map of (description, project_id) -> _Pair
+        self.pairs: dict[tuple, _Pair] = {}
+
+        # Map of word -> set of pair keys containing it
+        self.words: dict[str, set] = {}
+
+        # Sorted vocabulary, for prefix ranges
+        self.vocabulary: list[str] = []
+
+        # Map of prefix -> set of pair keys with a word starting with it, for queried prefixes
+        self.prefix_keys: dict[str, set] = {}
+
+        # Map of prefix -> pairs ranked by descending score, '' for all pairs
+        self.cache: dict[str, list[_Pair]] = {}
+
+    def keys(self, prefix: str) -> set:
+        """
+        Keys of the pairs with a word starting with `prefix`. Do not modify the returned set.
+        """
+        keys = self.prefix_keys.get(prefix, None)
+        if keys is None:
+            vocab = self.vocabulary
+            start = bisect.bisect_left(vocab, prefix)
+            end = bisect.bisect_left(vocab, prefix + '\U0010ffff', start)
+            keys = set().union(*(self.words[word] for word in vocab[start:end]))
+            self.prefix_keys[prefix] = keys
+        return keys
+
+    def ranked(self, prefix: str) -> list[_Pair]:
+        ranked = self.cache.get(prefix, None)
+        if ranked is None:
+            pairs = self.pairs
+            candidates = pairs.values() if not prefix else (pairs[key] for key in self.keys(prefix))
+            ranked = self.cache[prefix] = heapq.nlargest(CACHE_SIZE, candidates, key=_score)
+        return ranked
+
+    def _cached_prefixes(self, pair: _Pair):
+        cache = self.cache
+        if not cache:
+            return []
+        prefixes = [prefix for prefix in _prefixes(pair.words) if prefix in cache]
+        if '' in cache:
+            prefixes.append('')
+        return prefixes
+
+    def increased(self, pair: _Pair):
+        """
+        Update the cached rankings after the score of a pair increased.
+        """
+        for prefix in self._cached_prefixes(pair):
+            ranked = self.cache[prefix]
+            if pair in ranked:
+                ranked.sort(key=_score, reverse=True)
+            elif len(ranked) < CACHE_SIZE or pair.score > ranked[-1].score:
+                if len(ranked) >= CACHE_SIZE:
+                    ranked.pop()
+                ranked.append(pair)
+                ranked.sort(key=_score, reverse=True)
+
+    def decreased(self, pair: _Pair):
+        """
+        Drop cached rankings holding a pair whose score decreased, since another pair may now rank above it.
+        """
+        for prefix in self._cached_prefixes(pair):
+            if pair in self.cache[prefix]:
+                del self.cache[prefix]
+
+    def add_pair(self, pair: _Pair):
+        self.pairs[pair.key] = pair
+        for word in pair.words:
+            keys = self.words.get(word, None)
+            if keys is None:
+                keys = self.words[word] = set()
+                bisect.insort(self.vocabulary, word)
+            keys.add(pair.key)
+        if self.prefix_keys:
+            for prefix in _prefixes(pair.words):
+                keys = self.prefix_keys.get(prefix, None)
+                if keys is not None:
+                    keys.add(pair.key)
+
+    def remove_pair(self, pair: _Pair):
+        del self.pairs[pair.key]
+        for word in pair.words:
+            keys = self.words[word]
+            keys.discard(pair.key)
+            if not keys:
+                del self.words[word]
+                i = bisect.bisect_left(self.vocabulary, word)
+                del self.vocabulary[i]
+        if self.prefix_keys:
+            for prefix in _prefixes(pair.words):
+                keys = self.prefix_keys.get(prefix, None)
+                if keys is not None:
+                    keys.discard(pair.key)
+
+
+class DescriptionIndex:
+    """
+    Per workspace autocomplete index over time entry descriptions.
+
+    Maintained incrementally through `add` and `remove`,
+    with `add` also handling updates to an already indexed entry.
+    """
+
+    def __init__(self, half_life: float = 30 * 24 * 3600):
+        self.half_life = half_life
+        self.workspaces: dict[int, _WorkspaceIndex] = {}
+
+        # Map of entry_id -> (workspace_id, pair key, log2 weight)
+        self.entries: dict[int, tuple[int, tuple, float]] = {}
+
+    def weight(self, timestamp: float) -> float:
+        """
+        Base 2 logarithm of the frecency weight of a use starting at `timestamp`.
+        """
+        return timestamp / self.half_life
+
+    def add(self, entry):
+        if entry.id in self.entries:
+            self.remove(entry.id)
+        description = entry.description
+        if not description:
+            return
+
+        workspace = self.workspaces.get(entry.workspace_id, None)
+        if workspace is None:
+            workspace = self.workspaces[entry.workspace_id] = _WorkspaceIndex()
+
+        key = (description, entry.project_id)
+        pair = workspace.pairs.get(key, None)
+        if pair is None:
+            pair = _Pair(key, tuple(set(tokenise(description))))
+            workspace.add_pair(pair)
+
+        timestamp = entry.start.timestamp()
+        weight = self.weight(timestamp)
+        pair.count += 1
+        pair.score = _log2_add(pair.score, weight)
+        pair.uses[entry.id] = (weight, timestamp, entry.tag_ids)
+        if timestamp >= pair.last_used:
+            pair.last_used = timestamp
+            pair.entry_id = entry.id
+            pair.tag_ids = entry.tag_ids
+        self.entries[entry.id] = (entry.workspace_id, key, weight)
+        workspace.increased(pair)
+
+    def remove(self, entry_id: int):
+        indexed = self.entries.pop(entry_id, None)
+        if indexed is None:
+            return
+        wid, key, weight = indexed
+        workspace = self.workspaces[wid]
+        pair = workspace.pairs[key]
+        pair.count -= 1
+        del pair.uses[entry_id]
+        remaining = 1.0 - 2.0 ** (weight - pair.score)
+        if remaining < CANCELLATION_LIMIT:
+            pair.score = _log2_sum(use[0] for use in pair.uses.values())
+        else:
+            pair.score += math.log2(remaining)
+        workspace.decreased(pair)
+        if pair.count <= 0:
+            workspace.remove_pair(pair)
+        elif pair.entry_id == entry_id:
+            # Most recent use is gone, fall back to the latest remaining one
+            pair.entry_id, (_, pair.last_used, pair.tag_ids) = max(pair.uses.items(), key=lambda item: item[1][1])
+
+    def suggest(self, workspace_id: int, text: str = '', limit: int = 10) -> list[Suggestion]:
+        """
+        Suggest past (description, project) pairs in a workspace matching the typed text,
+        best first.
+        """
+        workspace = self.workspaces.get(workspace_id, None)
+        if workspace is None:
+            return []
+        prefixes = set(tokenise(text))
+        if not prefixes:
+            if limit <= CACHE_SIZE:
+                best = workspace.ranked('')[:limit]
+            else:
+                # The cached ranking only holds the best CACHE_SIZE pairs
+                best = heapq.nlargest(limit, workspace.pairs.values(), key=_score)
+            return [pair.suggestion() for pair in best]
+
+        # Intersect the pair sets of every prefix, most selective first
+        sets = sorted(((workspace.keys(prefix), prefix) for prefix in prefixes), key=lambda item: len(item[0]))
+        keys, driver = sets[0]
+        if len(sets) > 1:
+            keys = keys.intersection(*(other for other, _ in sets[1:]))
+        if not keys:
+            return []
+
+        best = None
+        if len(keys) > BRUTE_FORCE_LIMIT and limit <= CACHE_SIZE:
+            # Most matches are usually among the best pairs for the most selective prefix
+            best = [pair for pair in workspace.ranked(driver) if pair.key in keys][:limit]
+            if len(best) < limit:
+                best = None
+        if best is None:
+            pairs = workspace.pairs
+            best = heapq.nlargest(limit, (pairs[key] for key in keys), key=_score)
+        return [pair.suggestion() for pair in best]
@@ -0,0 +1,344 @@
+"""
+Server side of the track daemon, see `daemon` for the protocol and command line.
+
+Kept apart from `daemon`, which holds the blocking `DaemonClient`,
+so that client commands do not import asyncio or the rest of the library.
+"""
+import asyncio
+import datetime as dt
+import json
+import logging
+import os
+import socket
+import stat
+from typing import Optional, TYPE_CHECKING
+
+from .daemon import default_socket_path
+from .errors import DaemonError, TogglException
+from .lib import utc_now
+
+if TYPE_CHECKING:
+    from .client import TrackClient
+    from .models import TimeEntry
+
+logger = logging.getLogger(__name__)
+
+# Longest wait in seconds between retries of a failing background refresh or sync
+MAX_BACKOFF = 15 * 60
+
+
+def backoff(interval: float, failures: int) -> float:
+    """
+    Wait before the next run of a periodic task after `failures` consecutive failures.
+    """
+    if not failures:
+        return interval
+    return max(interval, min(interval * 2 ** failures, MAX_BACKOFF))
+
+
+class TrackDaemon:
+    """
+    Serves the state of a logged in `TrackClient` over a Unix socket.
+
+    The running entry is refreshed from the API every `refresh_interval` seconds,
+    and a full sync is run every `sync_interval` seconds if given.
+    Both keep running through failures, backing off while they persist.
+    With `snapshot_path`, the state is also published there after every sync for other processes to map,
+    see `snapshot.SnapshotReader`.
+    """
+
+    def __init__(self, client: 'TrackClient', path: Optional[str] = None,
+                 refresh_interval: float = 60, sync_interval: Optional[float] = None,
+                 snapshot_path: Optional[str] = None):
+        self.client = client
+        self.path = path or default_socket_path()
+        self.refresh_interval = refresh_interval
+        self.sync_interval = sync_interval
+        self.snapshot_path = snapshot_path
+
+        self.current: Optional['TimeEntry'] = None
+
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks: list[asyncio.Task] = []
+
+        # Whether the socket file at `path` is ours to remove
+        self._bound = False
+
+        # Serialises snapshot publishing, so each snapshot gets the next generation and replaces the last
+        self._snapshot_lock = asyncio.Lock()
+
+        self.commands = {
+            'ping': self.cmd_ping,
+            'current': self.cmd_current,
+            'start': self.cmd_start,
+            'stop': self.cmd_stop,
+            'continue': self.cmd_continue,
+            'suggest': self.cmd_suggest,
+            'entry': self.cmd_entry,
+            'projects': self.cmd_projects,
+            'tags': self.cmd_tags,
+            'workspaces': self.cmd_workspaces,
+            'sync': self.cmd_sync,
+        }
+
+    async def start(self, sync=True):
+        """
+        Sync the client state and start listening on the socket.
+        Pass `sync=False` if the client state and `current` were already loaded, e.g. by `TrackClient.login`.
+        """
+        if sync:
+            await self.client.sync()
+            await self.refresh_current()
+        await self.publish_snapshot()
+
+        self._server = await asyncio.start_unix_server(self._handle, sock=self._bind())
+
+        self._tasks.append(asyncio.create_task(self._refresh_loop()))
+        if self.sync_interval:
+            self._tasks.append(asyncio.create_task(self._sync_loop()))
+        logger.info("Track daemon listening on %s", self.path)
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._bound:
+            self._bound = False
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+        await self.client.close()
+
+    def _bind(self) -> socket.socket:
+        """
+        Bind the listening socket, readable and writable by the current user only from the start.
+
+        A socket file left by a daemon which exited without cleaning up is replaced,
+        but raises `DaemonError` if a daemon is still listening on it or the path is not a socket.
+        """
+        try:
+            mode = os.stat(self.path).st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):
+                raise DaemonError(f"Daemon socket path {self.path} exists and is not a socket.")
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            probe.settimeout(1)
+            try:
+                probe.connect(self.path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Stale socket, nothing is listening on it
+                try:
+                    os.unlink(self.path)
+                except FileNotFoundError:
+                    pass
+            except OSError as e:
+                raise DaemonError(f"Could not check the daemon socket at {self.path}: {e}") from None
+            else:
+                raise DaemonError(f"A track daemon is already listening on {self.path}.")
+            finally:
+                probe.close()
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # The socket file is created by bind, so restrict the umask rather than chmod it afterwards
+        umask = os.umask(0o177)
+        try:
+            sock.bind(self.path)
+        except OSError as e:
+            sock.close()
+            raise DaemonError(f"Could not bind the daemon socket at {self.path}: {e}") from None
+        finally:
+            os.umask(umask)
+        self._bound = True
+        return sock
+
+    # Background refreshing
+
+    async def publish_snapshot(self):
+        if self.snapshot_path is None:
+            return
+        from .snapshot import snapshot_sections, write_sections
+
+        async with self._snapshot_lock:
+            # Encode on the loop while the state cannot change, then write and fsync off it
+            sections = snapshot_sections(self.client.state)
+            generation = await asyncio.to_thread(write_sections, sections, self.snapshot_path)
+        logger.debug("Published state snapshot %d to %s", generation, self.snapshot_path)
+
+    async def refresh_current(self):
+        self.current = await self.client.fetch_current_entry()
+        return self.current
+
+    async def _periodic(self, interval: float, step, failure: str):
+        """
+        Run `step` every `interval` seconds until cancelled.
+        Failures are logged and back off exponentially, up to `MAX_BACKOFF` or the interval if longer.
+        """
+        failures = 0
+        while True:
+            await asyncio.sleep(backoff(interval, failures))
+            try:
+                await step()
+            except Exception:
+                failures += 1
+                logger.exception("%s Retrying in %.1f seconds.", failure, backoff(interval, failures))
+            else:
+                failures = 0
+
+    async def _refresh_loop(self):
+        await self._periodic(self.refresh_interval, self.refresh_current, "Failed to refresh the current entry.")
+
+    async def _sync(self):
+        await self.client.sync()
+        await self.refresh_current()
+        await self.publish_snapshot()
+
+    async def _sync_loop(self):
+        await self._periodic(self.sync_interval, self._sync, "Failed to sync daemon state.")
+
+    # Connection handling
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                response = await self.dispatch(line)
+                writer.write(json.dumps(response, separators=(',', ':')).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, line: bytes) -> dict:
+        try:
+            request = json.loads(line)
+            op = request.pop('op')
+            command = self.commands[op]
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return {'ok': False, 'error': "Malformed request.", 'type': 'ValueError'}
+
+        try:
+            data = await command(**request)
+        except (TogglException, ValueError, TypeError) as e:
+            return {'ok': False, 'error': str(e), 'type': type(e).__name__}
+        except Exception as e:
+            logger.exception("Unhandled error in daemon command %r", op)
+            return {'ok': False, 'error': str(e), 'type': type(e).__name__}
+        return {'ok': True, 'data': data}
+
+    # Commands
+
+    @staticmethod
+    def _dump(model):
+        return model.to_data() if model is not None else None
+
+    async def cmd_ping(self):
+        return 'pong'
+
+    async def cmd_current(self, refresh=False):
+        entry = await self.refresh_current() if refresh else self.current
+        if entry is not None and entry.stop is not None:
+            entry = self.current = None
+        return self._dump(entry)
+
+    async def cmd_start(self, description, workspace_id=None, project_id=None, tag_ids=None, start=None):
+        if workspace_id is None:
+            workspace_id = self.client.profile.default_workspace_id
+        start = dt.datetime.fromisoformat(start) if start else utc_now()
+        self.current = await self.client.start_entry(
+            workspace_id, description, start,
+            project_id=project_id, tag_ids=tag_ids or []
+        )
+        return self._dump(self.current)
+
+    async def cmd_stop(self):
+        entry = self.current
+        if entry is None or entry.stop is not None:
+            entry = await self.refresh_current()
+        if entry is None:
+            raise ValueError("No running time entry to stop.")
+        stopped = await entry.stop_entry()
+        self.current = None
+        return self._dump(stopped)
+
+    async def cmd_continue(self, id=None):
+        if id is None:
+            entries = self.client.state.time_entries.values()
+            entry = max((e for e in entries if not e.running), key=lambda e: e.start, default=None)
+        else:
+            entry = self.client.state.get_entry(id)
+        if entry is None:
+            raise ValueError("No time entry to continue.")
+        self.current = await entry.continue_entry()
+        return self._dump(self.current)
+
+    async def cmd_suggest(self, text='', workspace_id=None, limit=10):
+        if workspace_id is None:
+            workspace_id = self.client.profile.default_workspace_id
+        suggestions = self.client.state.suggest_descriptions(workspace_id, text, limit)
+        return [suggestion._asdict() for suggestion in suggestions]
+
+    async def cmd_entry(self, id):
+        return self._dump(self.client.state.get_entry(id))
+
+    async def cmd_projects(self, workspace_id=None):
+        if workspace_id is None:
+            projects = self.client.state.projects.values()
+        else:
+            projects = self.client.state.get_workspace_projects(workspace_id)
+        return [project.to_data() for project in projects]
+
+    async def cmd_tags(self, workspace_id=None):
+        if workspace_id is None:
+            tags = self.client.state.tags.values()
+        else:
+            tags = self.client.state.get_workspace_tags(workspace_id)
+        return [tag.to_data() for tag in tags]
+
+    async def cmd_workspaces(self):
+        return [workspace.to_data() for workspace in self.client.state.workspaces.values()]
+
+    async def cmd_sync(self):
+        await self.client.sync()
+        await self.refresh_current()
+        await self.publish_snapshot()
+        return {
+            'workspaces': len(self.client.state.workspaces),
+            'projects': len(self.client.state.projects),
+            'time_entries': len(self.client.state.time_entries),
+        }
+
+
+async def serve(args):
+    from .client import TrackClient
+
+    apikey = os.environ.get('TOGGL_API_KEY')
+    if not apikey:
+        raise SystemExit("Set TOGGL_API_KEY to run the track daemon.")
+
+    client = TrackClient()
+    result = await client.login(APIKey=apikey, sync=True, current=True)
+    daemon = TrackDaemon(
+        client, args.socket,
+        refresh_interval=args.refresh_interval, sync_interval=args.sync_interval,
+        snapshot_path=args.snapshot
+    )
+    daemon.current = result.current_entry
+    try:
+        await daemon.start(sync=False)
+        await daemon.serve_forever()
+    finally:
+        await daemon.close()
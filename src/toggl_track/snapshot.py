@@ -0,0 +1,518 @@
+"""
+Versioned binary snapshots of a `TrackState`, shared read-only between processes through a memory mapped file.
+
+One process syncs and calls `write_snapshot` after each sync,
+which writes the new snapshot beside the old one and atomically renames it into place.
+Async writers encode the state with `snapshot_sections` on the event loop
+and run the blocking file write and fsync of `write_sections` in a thread.
+Other processes read it through a `SnapshotReader`, which maps the file read-only
+and swaps to the new mapping when it sees a new file, so every process shares the same pages.
+
+Time entries are stored as fixed width records sorted by id, with their strings interned in a shared table,
+alongside prebuilt start time, running, project, workspace and tag indexes of record positions.
+Lookups bisect these arrays in place, and only the entries returned are built into models.
+The much smaller workspace, project, client and tag collections are stored as JSON and decoded on first use.
+
+Example:
+    # Syncing process
+    await client.sync()
+    sections = snapshot_sections(client.state)
+    await asyncio.to_thread(write_sections, sections, '/run/toggl/state.snap')
+
+    # Worker processes
+    reader = SnapshotReader('/run/toggl/state.snap')
+    entry = reader.current().entry(entry_id)
+
+Timestamps are restored in UTC, and models built from a snapshot have no state.
+"""
+import bisect
+import datetime as dt
+import json
+import mmap
+import os
+import stat
+import struct
+import tempfile
+import time
+from array import array
+from functools import cached_property
+from typing import TYPE_CHECKING, Iterator, Optional
+
+from .errors import SnapshotError
+from .models import Client, Project, Tag, TimeEntry, Workspace
+
+if TYPE_CHECKING:
+    from .http import TrackHTTPClient
+    from .state import TrackState
+
+
+MAGIC = b'TTSNAP\x00\x00'
+FORMAT_VERSION = 2
+
+# Magic, format version, section count, generation, creation unix time
+HEADER = struct.Struct('<8sIIQd')
+
+# Section name, offset, length
+SECTION = struct.Struct('<4sQQ')
+
+# id, workspace_id, project_id, user_id, start, stop, at, server_deleted_at, duration,
+# description, permissions, tag id offset, tag id count, tag name offset, tag name count, billable
+ENTRY = struct.Struct('<9q6IB7x')
+
+# Sentinel for a missing timestamp or id
+MISSING = -2 ** 63
+
+# Sentinel string id for None
+NO_STRING = 2 ** 32 - 1
+
+# Encoding of optional booleans
+BOOLS = {False: 0, True: 1, None: 2}
+
+EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+MICROSECOND = dt.timedelta(microseconds=1)
+
+# Map of JSON section key -> model class
+MODEL_CLASSES = {
+    'workspaces': Workspace,
+    'clients': Client,
+    'tags': Tag,
+    'projects': Project,
+}
+
+
+def _micros(ts: Optional[dt.datetime]) -> int:
+    if ts is None:
+        return MISSING
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=dt.timezone.utc)
+    return (ts - EPOCH) // MICROSECOND
+
+
+def _timestamp(micros: int) -> Optional[dt.datetime]:
+    if micros == MISSING:
+        return None
+    return EPOCH + dt.timedelta(microseconds=micros)
+
+
+# TimeEntry fields in the order `Snapshot.entry_at` builds them
+ENTRY_FIELDS = (
+    'state', 'at', 'billable', 'description', 'duration', 'id', 'user_id', 'permissions', 'project_id',
+    'start', 'stop', 'tag_ids', 'tags', 'server_deleted_at', 'workspace_id',
+)
+
+
+def _build(cls, names, values):
+    # Values were validated when first loaded, so bypass the attrs initialiser
+    model = object.__new__(cls)
+    setattr = object.__setattr__
+    for name, value in zip(names, values):
+        setattr(model, name, value)
+    return model
+
+
+def _json_default(value):
+    if isinstance(value, dt.datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialise {type(value).__name__} in a snapshot.")
+
+
+def read_generation(path) -> Optional[int]:
+    """
+    Generation of the snapshot at `path`, or None if there is no valid snapshot there.
+    """
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(header) < HEADER.size:
+        return None
+    magic, version, _, generation, _ = HEADER.unpack(header)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return None
+    return generation
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids: dict[str, int] = {}
+        self.blob = bytearray()
+        self.offsets = array('I', [0])
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        sid = self.ids.get(value, None)
+        if sid is None:
+            sid = self.ids[value] = len(self.offsets) - 1
+            self.blob += value.encode('utf-8')
+            self.offsets.append(len(self.blob))
+        return sid
+
+
+def _index(keys_and_positions) -> tuple[array, array]:
+    pairs = sorted(keys_and_positions)
+    return array('q', (key for key, _ in pairs)), array('I', (pos for _, pos in pairs))
+
+
+def write_snapshot(state: 'TrackState', path, generation: Optional[int] = None) -> int:
+    """
+    Write a snapshot of `state` to `path`, atomically replacing any previous snapshot.
+
+    The generation defaults to one more than that of the snapshot being replaced.
+    Returns the generation written.
+    """
+    return write_sections(snapshot_sections(state), path, generation)
+
+
+def snapshot_sections(state: 'TrackState') -> dict[bytes, bytes]:
+    """
+    Encode `state` into snapshot sections, for `write_sections`.
+
+    This reads the state, so it must run on the state's event loop,
+    while the file writing of `write_sections` can run in a thread.
+    """
+    strings = _StringTable()
+    entries = sorted(state.time_entries.values(), key=lambda entry: entry.id)
+    records = bytearray(ENTRY.size * len(entries))
+    tag_ids = array('q')
+    tag_names = array('I')
+    starts = []
+    running = array('I')
+    by_project = []
+    by_workspace = []
+    by_tag = []
+    for pos, entry in enumerate(entries):
+        start = _micros(entry.start)
+        ENTRY.pack_into(
+            records, pos * ENTRY.size,
+            entry.id, entry.workspace_id,
+            entry.project_id if entry.project_id is not None else MISSING,
+            entry.user_id if entry.user_id is not None else MISSING,
+            start, _micros(entry.stop), _micros(entry.at), _micros(entry.server_deleted_at), entry.duration,
+            strings.intern(entry.description), strings.intern(entry.permissions),
+            len(tag_ids), len(entry.tag_ids), len(tag_names), len(entry.tags),
+            BOOLS[entry.billable],
+        )
+        tag_ids.extend(entry.tag_ids)
+        tag_names.extend(strings.intern(name) for name in entry.tags)
+        starts.append((start, entry.id, pos))
+        if entry.running:
+            running.append(pos)
+        if entry.project_id is not None:
+            by_project.append((entry.project_id, pos))
+        by_workspace.append((entry.workspace_id, pos))
+        by_tag.extend((tid, pos) for tid in entry.tag_ids)
+    starts.sort()
+
+    collections = {
+        key: [model.to_data() for model in getattr(state, key).values()]
+        for key in MODEL_CLASSES
+    }
+    project_keys, project_positions = _index(by_project)
+    workspace_keys, workspace_positions = _index(by_workspace)
+    tag_keys, tag_positions = _index(by_tag)
+
+    return {
+        b'STRS': bytes(strings.blob),
+        b'SOFF': strings.offsets.tobytes(),
+        b'EIDS': array('q', (entry.id for entry in entries)).tobytes(),
+        b'ENTR': bytes(records),
+        b'ETAG': tag_ids.tobytes(),
+        b'ETGN': tag_names.tobytes(),
+        b'ESTK': array('q', (start for start, _, _ in starts)).tobytes(),
+        b'ESTP': array('I', (pos for _, _, pos in starts)).tobytes(),
+        b'ERUN': running.tobytes(),
+        b'PKEY': project_keys.tobytes(),
+        b'PPOS': project_positions.tobytes(),
+        b'WKEY': workspace_keys.tobytes(),
+        b'WPOS': workspace_positions.tobytes(),
+        b'TKEY': tag_keys.tobytes(),
+        b'TPOS': tag_positions.tobytes(),
+        b'MODL': json.dumps(collections, default=_json_default).encode('utf-8'),
+    }
+
+
+def write_sections(sections: dict[bytes, bytes], path, generation: Optional[int] = None) -> int:
+    """
+    Write encoded snapshot sections to `path`, atomically replacing any previous snapshot.
+    See `write_snapshot` for the generation.
+
+    Each call writes its own temporary file, but concurrent writers to one path
+    must still be serialised by the caller for generations to increase, e.g. as `TrackDaemon` does.
+    A new snapshot file is readable by its owner only, and replacements keep the mode of the file they replace.
+    """
+    if generation is None:
+        generation = (read_generation(path) or 0) + 1
+
+    # Lay out the sections after the header and section table, each aligned to 8 bytes
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = []
+    for name, data in sections.items():
+        offset += -offset % 8
+        table.append((name, offset, len(data)))
+        offset += len(data)
+
+    # A unique temporary file, so concurrent writers never write into each other's file
+    directory, name = os.path.split(os.fspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{name}.", suffix='.tmp', dir=directory or '.')
+    try:
+        with open(fd, 'wb') as f:
+            try:
+                # mkstemp files are private, keep the mode of the snapshot being replaced
+                os.fchmod(fd, stat.S_IMODE(os.stat(path).st_mode))
+            except FileNotFoundError:
+                pass
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(sections), generation, time.time()))
+            for entry in table:
+                f.write(SECTION.pack(*entry))
+            for (name, offset, _), data in zip(table, sections.values()):
+                f.write(b'\x00' * (offset - f.tell()))
+                f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return generation
+
+
+class Snapshot:
+    """
+    Read-only view of a snapshot file, mapped into memory.
+
+    The mapping stays valid after the file is replaced, until the snapshot is closed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            # Identifies the file, since a new snapshot is always a new inode
+            self.key = (st.st_dev, st.st_ino, st.st_mtime_ns)
+            if st.st_size < HEADER.size:
+                raise SnapshotError(f"{path} is too short to be a snapshot.")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(self._map)
+        # Every view of the mapping, released on close
+        self._views = [view]
+        magic, version, count, self.generation, self.created = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            self.close()
+            raise SnapshotError(f"{path} is not a snapshot.")
+        if version != FORMAT_VERSION:
+            self.close()
+            raise SnapshotError(f"{path} has snapshot format {version}, expected {FORMAT_VERSION}.")
+
+        self._sections = {}
+        for i in range(count):
+            name, offset, length = SECTION.unpack_from(view, HEADER.size + i * SECTION.size)
+            self._sections[name] = view[offset:offset + length]
+            self._views.append(self._sections[name])
+
+        try:
+            self._strings = self._sections[b'STRS']
+            self._string_offsets = self._array(b'SOFF', 'I')
+            self._ids = self._array(b'EIDS', 'q')
+            self._records = self._sections[b'ENTR']
+            self._tag_ids = self._array(b'ETAG', 'q')
+            self._tag_names = self._array(b'ETGN', 'I')
+            self._start_keys = self._array(b'ESTK', 'q')
+            self._start_positions = self._array(b'ESTP', 'I')
+            self._running = self._array(b'ERUN', 'I')
+            self._indexes = {
+                'project': (self._array(b'PKEY', 'q'), self._array(b'PPOS', 'I')),
+                'workspace': (self._array(b'WKEY', 'q'), self._array(b'WPOS', 'I')),
+                'tag': (self._array(b'TKEY', 'q'), self._array(b'TPOS', 'I')),
+            }
+        except KeyError as e:
+            self.close()
+            raise SnapshotError(f"{path} is missing the {e.args[0]!r} section.") from None
+
+    def _array(self, name: bytes, fmt: str) -> memoryview:
+        view = self._sections[name].cast(fmt)
+        self._views.append(view)
+        return view
+
+    def close(self):
+        """
+        Release the mapping. Models built from the snapshot remain usable, but views returned by it do not.
+        """
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def string(self, sid: int) -> Optional[str]:
+        if sid == NO_STRING:
+            return None
+        offsets = self._string_offsets
+        return str(self._strings[offsets[sid]:offsets[sid + 1]], 'utf-8')
+
+    # Time entries
+
+    def entry_ids(self) -> memoryview:
+        """
+        Sorted ids of every time entry, as a read-only view of the mapping.
+        """
+        return self._ids
+
+    def position(self, eid: int) -> Optional[int]:
+        ids = self._ids
+        pos = bisect.bisect_left(ids, eid)
+        if pos < len(ids) and ids[pos] == eid:
+            return pos
+        return None
+
+    def entry_at(self, pos: int) -> TimeEntry:
+        (eid, wid, pid, uid, start, stop, at, deleted, duration,
+         description, permissions, tag_offset, tag_count, name_offset, name_count, billable) = ENTRY.unpack_from(
+            self._records, pos * ENTRY.size
+        )
+        string = self.string
+        return _build(TimeEntry, ENTRY_FIELDS, (
+            None,
+            _timestamp(at),
+            None if billable == BOOLS[None] else bool(billable),
+            string(description),
+            duration,
+            eid,
+            None if uid == MISSING else uid,
+            string(permissions),
+            None if pid == MISSING else pid,
+            _timestamp(start),
+            _timestamp(stop),
+            self._tag_ids[tag_offset:tag_offset + tag_count].tolist(),
+            [string(sid) for sid in self._tag_names[name_offset:name_offset + name_count]],
+            _timestamp(deleted),
+            wid,
+        ))
+
+    def entry(self, eid: int) -> Optional[TimeEntry]:
+        pos = self.position(eid)
+        return self.entry_at(pos) if pos is not None else None
+
+    def entries_between(self, start: Optional[dt.datetime] = None,
+                        end: Optional[dt.datetime] = None) -> Iterator[TimeEntry]:
+        """
+        Entries starting in [start, end), in increasing start order.
+        """
+        keys = self._start_keys
+        lo = bisect.bisect_left(keys, _micros(start)) if start is not None else 0
+        hi = bisect.bisect_left(keys, _micros(end)) if end is not None else len(keys)
+        for pos in self._start_positions[lo:hi]:
+            yield self.entry_at(pos)
+
+    def running_entries(self) -> list[TimeEntry]:
+        return [self.entry_at(pos) for pos in self._running]
+
+    def _lookup(self, index: str, key: int) -> list[TimeEntry]:
+        keys, positions = self._indexes[index]
+        lo = bisect.bisect_left(keys, key)
+        hi = bisect.bisect_right(keys, key, lo)
+        return [self.entry_at(pos) for pos in positions[lo:hi]]
+
+    def project_entries(self, pid: int) -> list[TimeEntry]:
+        return self._lookup('project', pid)
+
+    def workspace_entries(self, wid: int) -> list[TimeEntry]:
+        return self._lookup('workspace', wid)
+
+    def tag_entries(self, tid: int) -> list[TimeEntry]:
+        return self._lookup('tag', tid)
+
+    # Other collections
+
+    @cached_property
+    def _models(self) -> dict[str, dict]:
+        data = json.loads(bytes(self._sections[b'MODL']))
+        return {
+            key: {model.id: model for model in map(cls.from_data, data.get(key, ()))}
+            for key, cls in MODEL_CLASSES.items()
+        }
+
+    @property
+    def workspaces(self) -> dict[int, Workspace]:
+        return self._models['workspaces']
+
+    @property
+    def projects(self) -> dict[int, Project]:
+        return self._models['projects']
+
+    @property
+    def clients(self) -> dict[int, Client]:
+        return self._models['clients']
+
+    @property
+    def tags(self) -> dict[int, Tag]:
+        return self._models['tags']
+
+    def to_state(self, http: Optional['TrackHTTPClient'] = None) -> 'TrackState':
+        """
+        Copy the whole snapshot into a new `TrackState`, e.g. to run structured queries over it.
+        """
+        from .state import TrackState
+
+        state = TrackState(http)
+        with state.muted():
+            for key in MODEL_CLASSES:
+                for model in getattr(self, key).values():
+                    model.state = state
+                    getattr(state, state.collection_stores[key])(model)
+            for pos in range(len(self)):
+                entry = self.entry_at(pos)
+                entry.state = state
+                state._store_entry(entry)
+        self.__dict__.pop('_models', None)
+        return state
+
+
+class SnapshotReader:
+    """
+    Follows the snapshot at a path, swapping to each new snapshot as it is written.
+
+    Callers should fetch `current()` once per unit of work,
+    so everything they read comes from a single consistent snapshot.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._snapshot: Optional[Snapshot] = None
+
+    def current(self) -> Snapshot:
+        """
+        The latest snapshot, mapping it if it changed since the last call.
+
+        Raises `FileNotFoundError` if no snapshot has been written yet.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                # Keep serving the last snapshot if the file is briefly missing
+                return snapshot
+            if (st.st_dev, st.st_ino, st.st_mtime_ns) == snapshot.key:
+                return snapshot
+        # The previous mapping is released once no caller holds it
+        self._snapshot = Snapshot(self.path)
+        return self._snapshot
+
+    def close(self):
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
@@ -1,10 +1,24 @@
+import asyncio
+import bisect
+import datetime as dt
+import time
 from collections import defaultdict
-from typing import TYPE_CHECKING, NamedTuple
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterable, NamedTuple, Optional
 
-from .http import TrackHTTPClient
+from .changes import TOMBSTONES
+from .events import CREATED, DELETED, UPDATED, EventBus, Subscription
+from .metrics import TrackMetrics
+from .query import Query
+from .running import RunningTotals
+from .search import DescriptionIndex, Suggestion
+from .stream import ITEM
 
 from .models import Workspace, Project, TimeEntry, Client, Tag
 
+if TYPE_CHECKING:
+    from .http import TrackHTTPClient
+
 
 class WorkspaceChildren(NamedTuple):
     projects: set[int]
@@ -18,8 +32,13 @@ class TrackState:
     Holds the state of a Toggl Track client session.
     """
 
-    def __init__(self, http: TrackHTTPClient):
+    def __init__(self, http: Optional['TrackHTTPClient'], events: Optional[EventBus] = None):
         self.http = http
+        self.metrics: TrackMetrics = http.metrics if http is not None else TrackMetrics()
+
+        # Change notifications, may be shared between successive states of a client
+        self.events: EventBus = events or EventBus()
+        self._muted = 0
 
         # Map of worspace_id -> Workspace
         self.workspaces = {}
@@ -36,8 +55,59 @@ class TrackState:
         # Map of tag_id -> Tag
         self.tags = {}
 
+        # Map of organization_id -> map of organization user id -> user payload
+        self.organization_users = defaultdict(dict)
+
         self.workspace_children = defaultdict(lambda: WorkspaceChildren(set(), set(), set(), set()))
 
+        # Secondary time entry indexes, used by the query planner
+        # Map of project_id -> set of entry ids
+        self.project_entries = defaultdict(set)
+
+        # Map of tag_id -> set of entry ids
+        self.tag_entries = defaultdict(set)
+
+        # Set of running entry ids
+        self.running_entries = set()
+
+        # Sorted list of (start, entry_id), built on first use and then maintained incrementally
+        self._start_index: Optional[list[tuple[dt.datetime, int]]] = None
+
+        # Autocomplete index over entry descriptions, built on first use and then maintained incrementally
+        self._description_index: Optional[DescriptionIndex] = None
+
+        # Aggregates of the running entries, built on first use and then maintained incrementally
+        self._running_totals: Optional[RunningTotals] = None
+
+    # Change notifications
+
+    def subscribe(self, callback, **filters) -> Subscription:
+        """
+        Subscribe to changes in this state, see `EventBus` and `Subscription` for the filters.
+        """
+        return self.events.subscribe(callback, **filters)
+
+    @contextmanager
+    def muted(self):
+        """
+        Suppress change events from this state within the block, e.g. while bulk loading a fresh state.
+        """
+        self._muted += 1
+        try:
+            yield self
+        finally:
+            self._muted -= 1
+
+    def _notify(self, collection, model, existed):
+        if self._muted or not self.events.active:
+            return
+        tomb = TOMBSTONES.get(collection, None)
+        if tomb is not None and getattr(model, tomb) is not None:
+            kind = DELETED
+        else:
+            kind = UPDATED if existed else CREATED
+        self.events.publish(kind, collection, model)
+
     # Access methods for session state
 
     def get_workspace(self, wid: int):
@@ -79,61 +149,279 @@ class TrackState:
     def get_tag(self, tid: int):
         return self.tags.get(tid, None)
 
+    # Querying
+
+    def query(self, model) -> Query:
+        """
+        Start a structured query over a model class or collection name, see `Query`.
+        """
+        return Query(self, model)
+
+    def entries_by_start(self) -> list[tuple[dt.datetime, int]]:
+        """
+        Sorted (start, entry_id) pairs for every time entry.
+
+        Do not modify the returned list, it is maintained as entries are loaded.
+        """
+        if self._start_index is None:
+            self._start_index = sorted((entry.start, eid) for eid, entry in self.time_entries.items())
+        return self._start_index
+
+    def description_index(self) -> DescriptionIndex:
+        if self._description_index is None:
+            index = DescriptionIndex()
+            for entry in self.time_entries.values():
+                index.add(entry)
+            self._description_index = index
+        return self._description_index
+
+    def suggest_descriptions(self, wid: int, text: str = '', limit: int = 10) -> list[Suggestion]:
+        """
+        Suggest past descriptions and projects in a workspace for a new timer, see `DescriptionIndex.suggest`.
+        """
+        return self.description_index().suggest(wid, text, limit)
+
+    def running_totals(self) -> RunningTotals:
+        """
+        Live duration totals of the running entries per user, project and workspace, see `RunningTotals`.
+        """
+        if self._running_totals is None:
+            self._running_totals = RunningTotals(self.time_entries[eid] for eid in self.running_entries)
+        return self._running_totals
+
+    def _index_entry(self, entry: TimeEntry):
+        eid = entry.id
+        if entry.project_id is not None:
+            self.project_entries[entry.project_id].add(eid)
+        for tid in entry.tag_ids:
+            self.tag_entries[tid].add(eid)
+        if entry.running:
+            self.running_entries.add(eid)
+        index = self._start_index
+        if index is not None:
+            key = (entry.start, eid)
+            if not index or index[-1] < key:
+                index.append(key)
+            else:
+                bisect.insort(index, key)
+        if self._description_index is not None:
+            self._description_index.add(entry)
+        if self._running_totals is not None and entry.running:
+            self._running_totals.update(entry)
+
+    def _unindex_entry(self, entry: TimeEntry):
+        eid = entry.id
+        if entry.project_id is not None:
+            self.project_entries[entry.project_id].discard(eid)
+        for tid in entry.tag_ids:
+            self.tag_entries[tid].discard(eid)
+        self.running_entries.discard(eid)
+        index = self._start_index
+        if index is not None:
+            key = (entry.start, eid)
+            i = bisect.bisect_left(index, key)
+            if i < len(index) and index[i] == key:
+                del index[i]
+        if self._description_index is not None:
+            self._description_index.remove(eid)
+        if self._running_totals is not None:
+            self._running_totals.remove(eid)
+
     # Data loading from HTTP and webhook payloads
 
+    # Map of payload collection key -> loader method name, in load order
+    collection_loaders = {
+        'workspaces': 'add_workspace_data',
+        'clients': 'add_client_data',
+        'tags': 'add_tag_data',
+        'projects': 'add_project_data',
+        'time_entries': 'add_entry_data',
+    }
+
     def recursive_load_data(self, payload):
         # TODO: This is nonsense, fix
-        # Also logging
-        for wspace_data in payload.get('workspaces', []) or []:
-            self.add_workspace_data(wspace_data)
-
-        # Extract clients
-        for client_data in payload.get('clients', []) or []:
-            self.add_client_data(client_data)
-
-        # Extract tags
-        for tag_data in payload.get('tags', []) or []:
-            if not isinstance(tag_data, str):
-                self.add_tag_data(tag_data)
-
-        # Extract projects
-        for project_data in payload.get('projects', []) or []:
-            self.add_project_data(project_data)
-
-        # Extract time entries
-        for entry_data in payload.get('time_entries', []) or []:
-            self.add_entry_data(entry_data)
+        for key in self.collection_loaders:
+            self.load_collection(key, payload.get(key, None))
+
+    def load_collection(self, key, items):
+        """
+        Load each item of a payload collection, reporting the load time to the metrics hook.
+        """
+        if not items:
+            return
+        loader = getattr(self, self.collection_loaders[key])
+        start = time.perf_counter()
+        count = 0
+        for item in items:
+            # Tags may be given as plain names, which we cannot load
+            if not isinstance(item, str):
+                loader(item)
+                count += 1
+        if count:
+            self.metrics.on_state_load(key, count, time.perf_counter() - start)
+
+    def load_organization_users(self, organization_id: int, users):
+        """
+        Store a page of organization users, as returned by `TrackHTTPClient.get_organization_users`.
+        They are kept as payloads, since no other model refers to them.
+        """
+        if not users:
+            return
+        start = time.perf_counter()
+        stored = self.organization_users[organization_id]
+        for user in users:
+            stored[user['id']] = user
+        self.metrics.on_state_load('organization_users', len(users), time.perf_counter() - start)
+
+    async def load_stream(self, events) -> dict:
+        """
+        Load models from an asynchronous stream of `StreamEvent`s, as produced by `TrackHTTPClient.stream`.
+
+        Each array item is loaded as soon as it arrives, so the full payload is never held in memory.
+        Returns a dict of the remaining top level values, e.g. the profile fields of a `/me` response.
+        """
+        loaders = {key: getattr(self, name) for key, name in self.collection_loaders.items()}
+        values = {}
+        counts = defaultdict(int)
+        times = defaultdict(float)
+
+        async for event in events:
+            if event.kind == ITEM:
+                loader = loaders.get(event.key, None)
+                if loader is not None and not isinstance(event.value, str):
+                    start = time.perf_counter()
+                    loader(event.value)
+                    times[event.key] += time.perf_counter() - start
+                    counts[event.key] += 1
+            else:
+                values[event.key] = event.value
+
+        for key, count in counts.items():
+            self.metrics.on_state_load(key, count, times[key])
+        return values
 
     def add_workspace_data(self, payload):
         wspace = Workspace.from_data(payload, state=self)
-        self.workspaces[wspace.id] = wspace
+        self._store_workspace(wspace)
         self.recursive_load_data(payload)
+        return wspace
 
     def add_project_data(self, payload):
         project = Project.from_data(payload, state=self)
-        self.projects[project.id] = project
-        self.workspace_children[project.workspace_id].projects.add(project.id)
+        self._store_project(project)
         self.recursive_load_data(payload)
         return project
 
     def add_entry_data(self, payload):
         entry = TimeEntry.from_data(payload, state=self)
-        self.time_entries[entry.id] = entry
-        self.workspace_children[entry.workspace_id].entries.add(entry.id)
+        self._store_entry(entry)
         self.recursive_load_data(payload)
         return entry
 
     def add_client_data(self, payload):
         client = Client.from_data(payload, state=self)
-        self.clients[client.id] = client
-        self.workspace_children[client.workspace_id].clients.add(client.id)
+        self._store_client(client)
         self.recursive_load_data(payload)
         return client
 
     def add_tag_data(self, payload):
-        print(payload)
         tag = Tag.from_data(payload, state=self)
-        self.tags[tag.id] = tag
-        self.workspace_children[tag.workspace_id].tags.add(tag.id)
+        self._store_tag(tag)
         # Tags are the only model where we are sure we will not get other models embedded
         return tag
+
+    # Map of collection -> method storing an already built model, in load order
+    collection_stores = {
+        'workspaces': '_store_workspace',
+        'clients': '_store_client',
+        'tags': '_store_tag',
+        'projects': '_store_project',
+        'time_entries': '_store_entry',
+    }
+
+    async def adopt_models(self, built: dict[str, Iterable], batch_size: int = 500):
+        """
+        Store models built elsewhere without a state, e.g. by `offload.build_models` in a worker pool.
+
+        Yields to the event loop every `batch_size` models, so adopting a large payload does not block it.
+        """
+        count = 0
+        for key, method in self.collection_stores.items():
+            models = built.get(key, None)
+            if models is None:
+                continue
+            store = getattr(self, method)
+            loaded = 0
+            start = time.perf_counter()
+            elapsed = 0.0
+            for model in models:
+                model.state = self
+                store(model)
+                loaded += 1
+                count += 1
+                if count % batch_size == 0:
+                    elapsed += time.perf_counter() - start
+                    await asyncio.sleep(0)
+                    start = time.perf_counter()
+            elapsed += time.perf_counter() - start
+            if loaded:
+                self.metrics.on_state_load(key, loaded, elapsed)
+
+    def _store_workspace(self, wspace: Workspace):
+        existed = wspace.id in self.workspaces
+        self.workspaces[wspace.id] = wspace
+        self._notify('workspaces', wspace, existed)
+
+    def _store_project(self, project: Project):
+        existed = project.id in self.projects
+        self.projects[project.id] = project
+        self._notify('projects', project, existed)
+        self.workspace_children[project.workspace_id].projects.add(project.id)
+
+    def _store_entry(self, entry: TimeEntry):
+        previous = self.time_entries.get(entry.id, None)
+        existed = previous is not None
+        if existed:
+            self._unindex_entry(previous)
+        self.time_entries[entry.id] = entry
+        self._index_entry(entry)
+        self._notify('time_entries', entry, existed)
+        self.workspace_children[entry.workspace_id].entries.add(entry.id)
+
+    def _store_client(self, client: Client):
+        existed = client.id in self.clients
+        self.clients[client.id] = client
+        self._notify('clients', client, existed)
+        self.workspace_children[client.workspace_id].clients.add(client.id)
+
+    def _store_tag(self, tag: Tag):
+        existed = tag.id in self.tags
+        self.tags[tag.id] = tag
+        self._notify('tags', tag, existed)
+        self.workspace_children[tag.workspace_id].tags.add(tag.id)
+
+    def remove_model(self, collection: str, model_id: int):
+        """
+        Remove a model from the state, e.g. after it was deleted on the server.
+
+        Returns the removed model, or None if it was not present.
+        """
+        model = getattr(self, collection).pop(model_id, None)
+        if model is None:
+            return None
+        if collection == 'time_entries':
+            self._unindex_entry(model)
+        wid = model.id if collection == 'workspaces' else model.workspace_id
+        children = self.workspace_children.get(wid, None)
+        if children is not None:
+            child_set = {
+                'projects': children.projects,
+                'time_entries': children.entries,
+                'clients': children.clients,
+                'tags': children.tags,
+            }.get(collection, None)
+            if child_set is not None:
+                child_set.discard(model_id)
+        if not self._muted and self.events.active:
+            self.events.publish(DELETED, collection, model)
+        return model
@@ -0,0 +1,193 @@
+"""
+Incremental decoding of large JSON response bodies.
+
+The API returns related data as a single object whose values are mostly large arrays,
+e.g. `{"id": ..., "projects": [...], "time_entries": [...]}`.
+`JSONStreamDecoder` parses such a document chunk by chunk,
+emitting each top level scalar and each array item as soon as it is complete,
+so only a single record needs to be held in memory at once.
+"""
+import codecs
+import json
+import re
+from typing import Any, NamedTuple, Optional
+
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Characters which may continue a number
+NUMBER_TAIL = re.compile(r'[0-9.eE+-]*')
+
+# Event kinds
+VALUE = 'value'
+ITEM = 'item'
+
+
+class StreamEvent(NamedTuple):
+    # Either VALUE for a complete top level value, or ITEM for an item of a top level array
+    kind: str
+
+    # Top level key the value belongs to, or None if the document itself is an array
+    key: Optional[str]
+
+    value: Any
+
+
+class JSONStreamDecoder:
+    """
+    Push parser for a JSON object or array, one nesting level deep.
+
+    Feed it raw bytes with `feed`, which returns the events completed by that chunk,
+    then call `close` once the body is exhausted.
+    """
+
+    # Parser states
+    _START = 0
+    _KEY = 1
+    _COLON = 2
+    _VALUE = 3
+    _OBJECT_SEP = 4
+    _ITEM = 5
+    _ITEM_SEP = 6
+    _DONE = 7
+
+    def __init__(self, encoding='utf-8'):
+        self._text = codecs.getincrementaldecoder(encoding)()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._state = self._START
+        self._key: Optional[str] = None
+
+        # Whether the document is a top level array rather than an object
+        self._array_document = False
+
+        # Whether the current array is the first item after its opening bracket
+        self._first = True
+
+    def feed(self, data: bytes) -> list[StreamEvent]:
+        self._buffer += self._text.decode(data)
+        return self._parse(final=False)
+
+    def close(self) -> list[StreamEvent]:
+        self._buffer += self._text.decode(b'', final=True)
+        events = self._parse(final=True)
+        if self._state != self._DONE:
+            raise ValueError("Unexpected end of JSON stream.")
+        if self._buffer.strip():
+            raise ValueError("Extra data after the end of the JSON stream.")
+        return events
+
+    def _decode(self, pos, final):
+        """
+        Decode a single complete value at `pos`.
+
+        Returns None if the buffer does not yet hold the whole value.
+        A value which ends exactly at the end of the buffer may be a truncated number,
+        so it is only accepted once the stream is final.
+        So may a number followed by a partial fraction or exponent, e.g. `-0.` or `1e+`,
+        which decodes as the shorter number.
+        """
+        buffer = self._buffer
+        try:
+            value, end = self._decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return None
+        if not final:
+            if end == len(buffer):
+                return None
+            if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and NUMBER_TAIL.match(buffer, end).end() == len(buffer)):
+                return None
+        return value, end
+
+    def _parse(self, final) -> list[StreamEvent]:
+        events = []
+        buffer = self._buffer
+        pos = 0
+        length = len(buffer)
+
+        while True:
+            pos = WHITESPACE.match(buffer, pos).end()
+            if pos >= length or self._state == self._DONE:
+                break
+            char = buffer[pos]
+            state = self._state
+
+            if state == self._START:
+                if char == '{':
+                    self._state = self._KEY
+                    self._first = True
+                elif char == '[':
+                    self._array_document = True
+                    self._key = None
+                    self._state = self._ITEM
+                    self._first = True
+                else:
+                    raise ValueError(f"Expected a JSON object or array, got {char!r}.")
+                pos += 1
+            elif state == self._KEY:
+                if char == '}' and self._first:
+                    self._state = self._DONE
+                    pos += 1
+                    continue
+                decoded = self._decode(pos, final)
+                if decoded is None:
+                    break
+                self._key, pos = decoded
+                if not isinstance(self._key, str):
+                    raise ValueError("Expected a string key in the JSON stream.")
+                self._state = self._COLON
+            elif state == self._COLON:
+                if char != ':':
+                    raise ValueError(f"Expected ':' in the JSON stream, got {char!r}.")
+                self._state = self._VALUE
+                pos += 1
+            elif state == self._VALUE:
+                if char == '[':
+                    self._state = self._ITEM
+                    self._first = True
+                    pos += 1
+                    continue
+                decoded = self._decode(pos, final)
+                if decoded is None:
+                    break
+                value, pos = decoded
+                events.append(StreamEvent(VALUE, self._key, value))
+                self._state = self._OBJECT_SEP
+            elif state == self._OBJECT_SEP:
+                if char == ',':
+                    self._state = self._KEY
+                    self._first = False
+                elif char == '}':
+                    self._state = self._DONE
+                else:
+                    raise ValueError(f"Expected ',' or '}}' in the JSON stream, got {char!r}.")
+                pos += 1
+            elif state == self._ITEM:
+                if char == ']' and self._first:
+                    self._end_array()
+                    pos += 1
+                    continue
+                decoded = self._decode(pos, final)
+                if decoded is None:
+                    break
+                value, pos = decoded
+                events.append(StreamEvent(ITEM, self._key, value))
+                self._state = self._ITEM_SEP
+            elif state == self._ITEM_SEP:
+                if char == ',':
+                    self._state = self._ITEM
+                    self._first = False
+                elif char == ']':
+                    self._end_array()
+                else:
+                    raise ValueError(f"Expected ',' or ']' in the JSON stream, got {char!r}.")
+                pos += 1
+
+        self._buffer = buffer[pos:]
+        return events
+
+    def _end_array(self):
+        self._state = self._DONE if self._array_document else self._OBJECT_SEP
@@ -0,0 +1,359 @@
+"""
+Benchmark suite for model construction, state loading and the HTTP request path.
+
+Run from the repository root with e.g.
+    python -m tests.toggl_track.bench --sizes 1000 10000 --output bench.json
+and compare against an earlier run with
+    python -m tests.toggl_track.bench --compare bench.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from .context import toggl_track
+from .payloads import related_data
+from .fakeapi import FakeTrackAPI
+
+from toggl_track.client import TrackClient
+from toggl_track.http import TrackHTTPClient
+from toggl_track.state import TrackState
+from toggl_track.models import TimeEntry
+from toggl_track.snapshot import Snapshot, snapshot_sections, write_snapshot
+
+
+def measure(func, repeat):
+    """
+    Time `repeat` calls of the given zero-argument callable.
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def ameasure(coro_func, repeat):
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        await coro_func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarise(timings, items):
+    best = min(timings)
+    return {
+        'items': items,
+        'repeat': len(timings),
+        'best': best,
+        'median': statistics.median(timings),
+        'per_item_us': best / items * 1e6 if items else None,
+    }
+
+
+def bench_from_data(payload, repeat):
+    entries = payload['time_entries']
+
+    def run():
+        for data in entries:
+            TimeEntry.from_data(data)
+
+    return summarise(measure(run, repeat), len(entries))
+
+
+def bench_recursive_load(payload, repeat):
+    items = sum(len(payload[key]) for key in ('workspaces', 'clients', 'tags', 'projects', 'time_entries'))
+
+    def run():
+        TrackState(None).recursive_load_data(payload)
+
+    return summarise(measure(run, repeat), items)
+
+
+SUGGEST_QUERIES = ('', 'r', 're', 'rev', 'review d', 'sprint retro api', 'zz')
+
+
+def bench_suggest(payload, repeat):
+    """
+    Benchmark building the description index, then keystroke suggestions against it.
+    """
+    state = TrackState(None)
+    state.recursive_load_data(payload)
+    wids = list(state.workspaces)
+
+    def build():
+        state._description_index = None
+        state.description_index()
+
+    results = {'suggest_build': summarise(measure(build, repeat), len(state.time_entries))}
+
+    def run():
+        for wid in wids:
+            for text in SUGGEST_QUERIES:
+                state.suggest_descriptions(wid, text)
+
+    queries = len(wids) * len(SUGGEST_QUERIES)
+    results['suggest'] = summarise(measure(run, max(repeat * 20, 50)), queries)
+    return results
+
+
+def bench_running(size, repeat):
+    """
+    Benchmark live running totals per project, summing `actual_duration` against `RunningTotals`.
+    """
+    state = TrackState(None)
+    state.recursive_load_data(related_data(entries=size, running=size // 2))
+    entries = [state.time_entries[eid] for eid in state.running_entries]
+
+    def naive():
+        totals = {}
+        for entry in entries:
+            totals[entry.project_id] = totals.get(entry.project_id, 0) + entry.actual_duration
+
+    totals = state.running_totals()
+    return {
+        'running_naive': summarise(measure(naive, repeat), len(entries)),
+        'running_totals': summarise(measure(lambda: totals.totals('project'), repeat), len(entries)),
+    }
+
+
+def bench_snapshot(payload, repeat):
+    """
+    Benchmark writing and encoding a state snapshot, mapping it, and looking up entries in it.
+    """
+    state = TrackState(None)
+    state.recursive_load_data(payload)
+    ids = list(state.time_entries)[:1000]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state.snap')
+        results = {'snapshot_write': summarise(measure(lambda: write_snapshot(state, path), repeat), len(state.time_entries))}
+        # The part a daemon runs on its event loop, before writing the file in a thread
+        results['snapshot_encode'] = summarise(measure(lambda: snapshot_sections(state), repeat), len(state.time_entries))
+        results['snapshot_open'] = summarise(measure(lambda: Snapshot(path).close(), repeat), None)
+
+        with Snapshot(path) as snapshot:
+            def run():
+                for eid in ids:
+                    snapshot.entry(eid)
+
+            results['snapshot_entry'] = summarise(measure(run, repeat), len(ids))
+    return results
+
+
+async def bench_http(size, repeat):
+    """
+    Benchmark `TrackClient.sync` and the bare `TrackHTTPClient.request` overhead against a local server.
+    """
+    results = {}
+    async with FakeTrackAPI(entries=size) as server:
+        client = TrackClient(http=TrackHTTPClient(base_url=server.base_url, request_interval=0))
+        await client.login(APIKey='benchmark')
+
+        results['sync'] = summarise(
+            await ameasure(client.sync, repeat),
+            size
+        )
+        results['sync_stream'] = summarise(
+            await ameasure(lambda: client.sync(stream=True), repeat),
+            size
+        )
+
+        # Small requests to measure per-request overhead rather than parsing
+        small_repeat = max(repeat * 20, 50)
+        results['request'] = summarise(
+            await ameasure(client.http.get_my_profile, small_repeat),
+            1
+        )
+        await client.close()
+    return results
+
+
+async def loop_lag(coro_func, interval=0.001):
+    """
+    Run a coroutine while measuring how late a periodic ticker wakes up, as (elapsed, max lag, mean lag).
+    """
+    lags = []
+    loop = asyncio.get_running_loop()
+
+    async def tick():
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            lags.append(loop.time() - expected)
+
+    ticker = asyncio.create_task(tick())
+    await asyncio.sleep(interval * 2)
+    start = time.perf_counter()
+    await coro_func()
+    elapsed = time.perf_counter() - start
+    # Let the ticker observe any block at the very end of the coroutine
+    await asyncio.sleep(interval * 2)
+    ticker.cancel()
+    return elapsed, max(lags, default=0.0), statistics.fmean(lags) if lags else 0.0
+
+
+async def bench_offload(size, repeat):
+    """
+    Compare event loop lag during `TrackClient.sync` with decoding on the loop, in a thread pool and in a process pool.
+    """
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    results = {}
+    executors = {'sync_inline': None, 'sync_thread': ThreadPoolExecutor(1), 'sync_process': ProcessPoolExecutor(1)}
+    async with FakeTrackAPI(entries=size) as server:
+        for name, executor in executors.items():
+            http = TrackHTTPClient(base_url=server.base_url, request_interval=0, executor=executor)
+            client = TrackClient(http=http, executor=executor)
+            await client.login(APIKey='benchmark')
+            # Warm up the pool and the server's cached body
+            await client.sync()
+            runs = [await loop_lag(client.sync) for _ in range(repeat)]
+            result = summarise([elapsed for elapsed, _, _ in runs], size)
+            result['max_lag_ms'] = min(lag for _, lag, _ in runs) * 1e3
+            result['mean_lag_ms'] = min(mean for _, _, mean in runs) * 1e3
+            results[name] = result
+            await client.close()
+            if executor is not None:
+                executor.shutdown()
+    return results
+
+
+IMPORT_TARGETS = {
+    'package': "import toggl_track",
+    'client': "from toggl_track import TrackClient",
+    'models': "from toggl_track import TimeEntry",
+}
+
+IMPORT_SCRIPT = """
+import sys, time, json
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'aiohttp': 'aiohttp' in sys.modules}}))
+"""
+
+
+def bench_import(repeat):
+    """
+    Time cold imports of the package in fresh interpreters.
+
+    Importing the package or the client must not pull in aiohttp,
+    since that is deferred until a session is opened.
+    """
+    results = {}
+    for name, statement in IMPORT_TARGETS.items():
+        timings = []
+        for _ in range(max(repeat, 5)):
+            output = subprocess.check_output(
+                [sys.executable, '-c', IMPORT_SCRIPT.format(statement=statement)], text=True
+            )
+            report = json.loads(output)
+            if report['aiohttp']:
+                print(f"WARNING: '{statement}' imported aiohttp eagerly.")
+            timings.append(report['elapsed'])
+        results[f'import[{name}]'] = summarise(timings, 1)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, repeat, cases):
+    results = {}
+    if 'import' in cases:
+        results.update(bench_import(repeat))
+        print_results(results)
+    for size in sizes:
+        payload = related_data(entries=size)
+        if 'from_data' in cases:
+            results[f'from_data[{size}]'] = bench_from_data(payload, repeat)
+        if 'recursive_load' in cases:
+            results[f'recursive_load[{size}]'] = bench_recursive_load(payload, repeat)
+        if 'suggest' in cases:
+            for name, result in bench_suggest(payload, repeat).items():
+                results[f'{name}[{size}]'] = result
+        if 'running' in cases:
+            for name, result in bench_running(size, repeat).items():
+                results[f'{name}[{size}]'] = result
+        if 'snapshot' in cases:
+            for name, result in bench_snapshot(payload, repeat).items():
+                results[f'{name}[{size}]'] = result
+        if 'http' in cases:
+            for name, result in asyncio.run(bench_http(size, repeat)).items():
+                results[f'{name}[{size}]'] = result
+        if 'offload' in cases:
+            for name, result in asyncio.run(bench_offload(size, repeat)).items():
+                results[f'{name}[{size}]'] = result
+        print_results({key: value for key, value in results.items() if key.endswith(f'[{size}]')})
+    return results
+
+
+def print_results(results, baseline=None):
+    for name, result in results.items():
+        line = f"{name:<28} best {result['best'] * 1e3:10.3f} ms   median {result['median'] * 1e3:10.3f} ms"
+        if result['per_item_us'] is not None:
+            line += f"   {result['per_item_us']:9.2f} us/item"
+        if 'max_lag_ms' in result:
+            line += f"   loop lag max {result['max_lag_ms']:8.2f} ms mean {result['mean_lag_ms']:6.2f} ms"
+        if baseline and name in baseline:
+            change = result['best'] / baseline[name]['best'] - 1
+            line += f"   {change:+7.1%} vs baseline"
+        print(line)
+
+
+CASES = ('import', 'from_data', 'recursive_load', 'suggest', 'running', 'snapshot', 'http', 'offload')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES))
+    parser.add_argument('--output', help="Write the results as JSON to this path.")
+    parser.add_argument('--compare', help="JSON results from an earlier run to compare against.")
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.repeat, args.cases)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nCompared to {args.compare} (revision {baseline['meta'].get('revision')}):")
+        print_results(results, baseline['results'])
+
+    if args.output:
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'repeat': args.repeat,
+            },
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+import asyncio
+import collections
+import datetime as dt
+import logging
+import os
+import tempfile
+
+from .context import toggl_track
+from .fakeapi import FakeTrackAPI
+
+from toggl_track.bulk import ImportCheckpoint, entry_payload, import_time_entries, record_key
+from toggl_track.http import TrackHTTPClient
+
+
+START = dt.datetime(2023, 3, 1, 9, tzinfo=dt.timezone.utc)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def make_records(api: FakeTrackAPI, count: int) -> list[dict]:
+    wid = api.generator.workspace_ids[0]
+    return [
+        {
+            'key': f'row-{i}',
+            'workspace_id': wid,
+            'description': f'imported {i}',
+            'start': (START + dt.timedelta(hours=i)).isoformat(),
+            'duration': 1800,
+        }
+        for i in range(count)
+    ]
+
+
+def imported_counts(api: FakeTrackAPI) -> collections.Counter:
+    """
+    Number of entries on the server for each imported description.
+    """
+    return collections.Counter(
+        entry['description'] for entry in api.entries.values()
+        if (entry['description'] or '').startswith('imported ')
+    )
+
+
+def assert_imported_once(api: FakeTrackAPI, records: list[dict]):
+    counts = imported_counts(api)
+    assert sorted(counts) == sorted(record['description'] for record in records), counts
+    assert set(counts.values()) == {1}, counts
+
+
+async def connect(api: FakeTrackAPI) -> TrackHTTPClient:
+    http = TrackHTTPClient(base_url=api.base_url, request_interval=0, max_retries=0)
+    await http.login(APIKey='bulk-checks')
+    return http
+
+
+async def test_import(directory):
+    logging.info("Testing a complete import with a checkpoint.")
+    async with FakeTrackAPI(entries=10) as api:
+        http = await connect(api)
+        records = make_records(api, 40)
+        path = os.path.join(directory, 'complete.jsonl')
+
+        stats = await import_time_entries(http, records + records[:5], checkpoint=path, concurrency=4)
+        assert (stats.created, stats.skipped, stats.reconciled, stats.failed) == (40, 5, 0, 0), stats
+        assert_imported_once(api, records)
+
+        # Running it again only skips
+        stats = await import_time_entries(http, records, checkpoint=path)
+        assert (stats.created, stats.skipped, stats.reconciled) == (0, 40, 0), stats
+        assert_imported_once(api, records)
+        await http.close()
+
+
+async def test_resume(directory):
+    logging.info("Testing an interrupted import resumes without duplicates.")
+    async with FakeTrackAPI(entries=10, latency=0.01) as api:
+        http = await connect(api)
+        records = make_records(api, 60)
+        path = os.path.join(directory, 'resume.jsonl')
+
+        def interrupted(count):
+            yield from records[:count]
+            raise Interrupted
+
+        try:
+            await import_time_entries(http, interrupted(25), checkpoint=path, concurrency=4)
+        except Interrupted:
+            pass
+        else:
+            raise AssertionError("Import was not interrupted")
+
+        checkpoint = ImportCheckpoint(path)
+        done, pending = dict(checkpoint.done), dict(checkpoint.pending)
+        checkpoint.close()
+        created_before = sum(imported_counts(api).values())
+        assert 0 < len(done) <= 25 and len(done) + len(pending) <= 25, (len(done), len(pending))
+        # Every entry on the server is either done or still pending in the checkpoint
+        assert len(done) <= created_before <= len(done) + len(pending)
+
+        stats = await import_time_entries(http, records, checkpoint=path, concurrency=4)
+        assert stats.skipped == len(done), stats
+        assert stats.reconciled == created_before - len(done), stats
+        assert stats.created == len(records) - created_before, stats
+        assert stats.failed == 0, stats
+        logging.info("Resumed after %d done and %d pending records: %s", len(done), len(pending), stats)
+        assert_imported_once(api, records)
+
+        checkpoint = ImportCheckpoint(path)
+        assert not checkpoint.pending and len(checkpoint.done) == len(records)
+        assert set(checkpoint.done.values()) <= set(api.entries)
+        checkpoint.close()
+        await http.close()
+
+
+async def test_reconcile(directory):
+    logging.info("Testing reconcile matches entries created before a crash.")
+    async with FakeTrackAPI(entries=10) as api:
+        http = await connect(api)
+        records = make_records(api, 30)
+        path = os.path.join(directory, 'reconcile.jsonl')
+
+        # A crash after sending the first ten records, before their responses were logged
+        checkpoint = ImportCheckpoint(path)
+        created = {}
+        for record in records[:10]:
+            payload = entry_payload(record)
+            key = record_key(record, payload)
+            checkpoint.mark_pending(key, payload)
+            created[key] = (await http.create_time_entry(**payload))['id']
+        # And one sent record the server never received
+        payload = entry_payload(records[10])
+        checkpoint.mark_pending(record_key(records[10], payload), payload)
+        checkpoint.close()
+
+        stats = await import_time_entries(http, records, checkpoint=path)
+        assert (stats.created, stats.skipped, stats.reconciled, stats.failed) == (20, 10, 10, 0), stats
+        assert_imported_once(api, records)
+
+        checkpoint = ImportCheckpoint(path)
+        for key, entry_id in created.items():
+            assert checkpoint.done[key] == entry_id
+        checkpoint.close()
+        await http.close()
+
+
+async def test_errors(directory):
+    logging.info("Testing client errors fail records and server errors leave them pending.")
+    for status, pending in ((400, False), (503, True)):
+        async with FakeTrackAPI(entries=10) as api:
+            http = await connect(api)
+            records = make_records(api, 8)
+            path = os.path.join(directory, f'errors-{status}.jsonl')
+
+            api.error_rate, api.error_status = 1.0, status
+            stats = await import_time_entries(http, records, checkpoint=path)
+            assert (stats.created, stats.failed, len(stats.errors)) == (0, 8, 8), stats
+
+            checkpoint = ImportCheckpoint(path)
+            assert len(checkpoint.pending) == (8 if pending else 0), status
+            assert not checkpoint.done
+            checkpoint.close()
+
+            api.error_rate = 0.0
+            stats = await import_time_entries(http, records, checkpoint=path)
+            assert (stats.created, stats.reconciled, stats.failed) == (8, 0, 0), stats
+            assert_imported_once(api, records)
+            await http.close()
+
+
+async def main():
+    logging.info("Starting Tests")
+    with tempfile.TemporaryDirectory() as directory:
+        await test_import(directory)
+        await test_resume(directory)
+        await test_reconcile(directory)
+        await test_errors(directory)
+    logging.info("Tests Complete")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+
+from .context import toggl_track
+from .fakeapi import FakeTrackAPI
+
+from toggl_track.errors import DeadlineExceeded
+from toggl_track.http import Route, TrackHTTPClient
+from toggl_track.lib import INTERACTIVE, deadline, expiry
+from toggl_track.metrics import TrackMetrics
+
+
+class Recorder(TrackMetrics):
+    def __init__(self):
+        self.records = []
+
+    def on_request(self, record):
+        self.records.append(record)
+
+
+def server_requests(api: FakeTrackAPI, route='GET /api/v9/me/tags') -> int:
+    return sum(count for (key, _), count in api.counts.items() if key == route)
+
+
+async def expect_deadline(request, stage: str, within: float) -> DeadlineExceeded:
+    """
+    Await `request`, which must raise `DeadlineExceeded` at `stage` after roughly `within` seconds.
+    """
+    start = time.perf_counter()
+    try:
+        await request
+    except DeadlineExceeded as e:
+        elapsed = time.perf_counter() - start
+        assert e.stage == stage, e
+        assert isinstance(e, TimeoutError)
+        assert within * 0.8 <= elapsed < within + 0.3, elapsed
+        return e
+    raise AssertionError(f"No DeadlineExceeded while {stage}")
+
+
+async def test_nesting():
+    logging.info("Testing nested deadlines.")
+    assert expiry() is None
+    with deadline(1.0) as outer:
+        assert expiry() == outer
+        # Inner deadlines can only shorten the enclosing one
+        with deadline(5.0) as inner:
+            assert inner == outer
+        with deadline(0.1) as inner:
+            assert inner < outer and expiry() == inner
+        with deadline(None) as inner:
+            assert inner == outer
+        assert expiry(0.1) < outer
+        assert expiry(10) == outer
+
+        # Tasks created within the block inherit the deadline
+        assert await asyncio.create_task(asyncio.sleep(0, expiry())) == outer
+    assert expiry() is None
+    assert await asyncio.create_task(asyncio.sleep(0, expiry())) is None
+
+
+async def test_lock_wait():
+    logging.info("Testing DeadlineExceeded while waiting on the rate limiter.")
+    async with FakeTrackAPI(entries=10) as api:
+        recorder = Recorder()
+        http = TrackHTTPClient(base_url=api.base_url, request_interval=0.6, max_retries=0, metrics=recorder)
+        await http.login(APIKey='deadline-checks')
+        await http.get_my_tags()
+        sent = server_requests(api)
+
+        # The lock is held for the request interval after every request
+        assert http._lock.locked()
+        with deadline(0.15):
+            await expect_deadline(http.get_my_tags(), "waiting on the rate limiter", 0.15)
+        record = recorder.records[-1]
+        assert record.error == DeadlineExceeded.__name__ and record.status is None, record
+
+        # Including for requests started in tasks created within the block
+        with deadline(0.15):
+            task = asyncio.create_task(http.get_my_tags(), name='child')
+        await expect_deadline(task, "waiting on the rate limiter", 0.15)
+
+        # Interactive requests jump the queue, but are still bound by their deadline
+        with deadline(0.1):
+            interactive = http.request(Route('GET', 'me/tags'), priority=INTERACTIVE)
+            await expect_deadline(interactive, "waiting on the rate limiter", 0.1)
+
+        # Expired waiters leave the lock queue and nothing was sent
+        assert http._lock.waiting() == 0
+        assert server_requests(api) == sent
+
+        # The client timeout applies to every request in the same way
+        await asyncio.sleep(0.6)
+        http.timeout = 0.1
+        await http.get_my_tags()
+        await expect_deadline(http.get_my_tags(), "waiting on the rate limiter", 0.1)
+        http.timeout = None
+
+        # Once the interval passed the lock is free again
+        await asyncio.sleep(0.6)
+        assert not http._lock.locked()
+        with deadline(0.5):
+            await http.get_my_tags()
+        await http.close()
+
+
+async def test_response_wait():
+    logging.info("Testing DeadlineExceeded while waiting on the response.")
+    async with FakeTrackAPI(entries=10, tail_rate=1.0, tail_latency=1.0) as api:
+        http = TrackHTTPClient(base_url=api.base_url, request_interval=0, max_retries=0, breaker_threshold=1)
+        api.tail_rate = 0.0
+        await http.login(APIKey='deadline-checks')
+
+        api.tail_rate = 1.0
+        with deadline(0.2):
+            await expect_deadline(http.get_my_tags(), "waiting on the response", 0.2)
+        # Our own deadline says nothing about the API, so the breaker stays closed
+        breaker = http.breakers[('GET', 'me/tags')]
+        assert breaker.state == 'closed' and breaker.failures == 0
+        await http.close()
+
+
+async def main():
+    logging.info("Starting Tests")
+    await test_nesting()
+    await test_lock_wait()
+    await test_response_wait()
+    logging.info("Tests Complete")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,392 @@
+"""
+Local stand-in for the v9 Toggl Track API, for load testing the HTTP client.
+
+Only the routes used by the library are served.
+Latency, rate limit quotas and error injection are configurable,
+and the dataset is built with the synthetic payload generator.
+
+Run standalone with e.g.
+    python -m tests.toggl_track.fakeapi --port 8080 --entries 100000 --latency 0.05
+"""
+import argparse
+import asyncio
+import datetime as dt
+import json
+import math
+import random
+import time
+from collections import defaultdict
+
+from aiohttp import web
+
+from .payloads import PayloadGenerator
+
+
+API_PATH = '/api/v9/'
+
+
+class FakeTrackAPI:
+    """
+    In-memory fake of the Toggl Track API.
+
+    Parameters
+    ----------
+    entries: int
+        Number of time entries in the generated dataset.
+    latency: float
+        Base latency in seconds added to every response.
+    jitter: float
+        Maximum extra random latency in seconds.
+    quota: int | None
+        Number of requests allowed per `quota_window` seconds for each credential.
+        Requests over the quota receive a 429 with a `Retry-After` header.
+    error_rate: float
+        Proportion of requests answered with `error_status` instead of the real response.
+    tail_rate: float
+        Proportion of requests delayed by an extra `tail_latency` seconds, e.g. a stalled connection.
+    """
+    def __init__(self, entries=1000, seed=0,
+                 latency=0.0, jitter=0.0,
+                 quota=None, quota_window=1.0,
+                 error_rate=0.0, error_status=500, organization_users=120,
+                 tail_rate=0.0, tail_latency=1.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.quota = quota
+        self.quota_window = quota_window
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+        self.rng = random.Random(seed)
+        self.organization_users = organization_users
+        self.generator = PayloadGenerator(entries=entries, seed=seed)
+        self.data = self.generator.related_data()
+        self.entries = {entry['id']: entry for entry in self.data['time_entries']}
+        self.next_entry_id = max(self.entries, default=3000000000) + 1
+        self.current_id = next(
+            (eid for eid, entry in reversed(self.entries.items()) if entry['stop'] is None), None
+        )
+
+        # Encoded /me?with_related_data response, invalidated on writes
+        self._related_body = None
+
+        # Map of credential -> (window start, requests in window)
+        self._windows = defaultdict(lambda: (0.0, 0))
+
+        # Request counters, keyed by (route, status)
+        self.counts = defaultdict(int)
+
+        self.runner = None
+        self.base_url = None
+
+    # Server lifecycle
+
+    def make_app(self):
+        app = web.Application(middlewares=[self.middleware])
+        route = API_PATH
+        app.router.add_get(route + 'me', self.get_me)
+        app.router.add_get(route + 'me/projects', self.get_projects)
+        app.router.add_get(route + 'me/projects/paginated', self.get_projects_paginated)
+        app.router.add_get(route + 'me/organizations', self.get_organizations)
+        app.router.add_get(route + 'organizations/{organization_id}/users', self.get_organization_users)
+        app.router.add_get(route + 'me/tags', self.get_tags)
+        app.router.add_get(route + 'me/workspaces', self.get_workspaces)
+        app.router.add_get(route + 'me/time_entries', self.get_entries)
+        app.router.add_get(route + 'me/time_entries/current', self.get_current)
+        app.router.add_get(route + 'me/preferences', self.get_preferences)
+        app.router.add_get(route + 'workspaces/{workspace_id}', self.get_workspace)
+        app.router.add_get(route + 'workspaces/{workspace_id}/clients', self.get_workspace_clients)
+        app.router.add_get(route + 'workspaces/{workspace_id}/projects', self.get_workspace_projects)
+        app.router.add_get(route + 'workspaces/{workspace_id}/tags', self.get_workspace_tags)
+        app.router.add_post(route + 'workspaces/{workspace_id}/time_entries', self.create_entry)
+        app.router.add_patch(route + 'workspaces/{workspace_id}/time_entries/{entry_id}/stop', self.stop_entry)
+        return app
+
+    async def start(self, host='127.0.0.1', port=0):
+        self.runner = web.AppRunner(self.make_app(), access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        host, port = self.runner.addresses[0][:2]
+        self.base_url = f"http://{host}:{port}{API_PATH}"
+        return self.base_url
+
+    async def close(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    # Request handling
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+        key = f"{request.method} {route}"
+
+        credential = request.headers.get('Authorization')
+        if not credential or not credential.startswith('Basic '):
+            self.counts[(key, 403)] += 1
+            return web.Response(status=403, text="Incorrect username and/or password")
+
+        if self.quota is not None:
+            now = time.monotonic()
+            start, count = self._windows[credential]
+            if now - start >= self.quota_window:
+                start, count = now, 0
+            if count >= self.quota:
+                retry_after = max(1, math.ceil(self.quota_window - (now - start)))
+                self.counts[(key, 429)] += 1
+                return web.Response(
+                    status=429, text="Too Many Requests",
+                    headers={'Retry-After': str(retry_after)}
+                )
+            self._windows[credential] = (start, count + 1)
+
+        delay = self.latency + (self.rng.random() * self.jitter if self.jitter else 0)
+        if self.tail_rate and self.rng.random() < self.tail_rate:
+            delay += self.tail_latency
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.counts[(key, self.error_status)] += 1
+            return web.Response(status=self.error_status, text="Injected error")
+
+        response = await handler(request)
+        self.counts[(key, response.status)] += 1
+        return response
+
+    @staticmethod
+    def _json(data):
+        return web.Response(body=json.dumps(data).encode(), content_type='application/json')
+
+    async def get_me(self, request):
+        if request.query.get('with_related_data') == 'true':
+            if self._related_body is None:
+                self.data['time_entries'] = list(self.entries.values())
+                self._related_body = json.dumps(self.data).encode()
+            return web.Response(body=self._related_body, content_type='application/json')
+        return self._json(self.generator.profile())
+
+    async def get_projects(self, request):
+        return self._json(self.data['projects'])
+
+    async def get_projects_paginated(self, request):
+        start = int(request.query.get('start_project_id', 0))
+        per_page = int(request.query.get('per_page', 201))
+        projects = [project for project in self.data['projects'] if project['id'] >= start]
+        projects.sort(key=lambda project: project['id'])
+        return self._json(projects[:per_page])
+
+    def organization(self):
+        return {
+            'admin': True,
+            'at': self.generator.profile()['at'],
+            'created_at': self.generator.profile()['created_at'],
+            'id': 9000000 + self.generator.seed,
+            'max_workspaces': 20,
+            'name': f"Organization {self.generator.seed}",
+            'owner': True,
+            'pricing_plan_id': 0,
+            'server_deleted_at': None,
+            'user_count': self.organization_users,
+        }
+
+    async def get_organizations(self, request):
+        return self._json([self.organization()])
+
+    async def get_organization_users(self, request):
+        if int(request.match_info['organization_id']) != self.organization()['id']:
+            return web.Response(status=403, text="User does not have access to this resource.")
+        users = [
+            {
+                'id': 2000000 + i,
+                'user_id': self.generator.user_id + i,
+                'name': f"User {i}",
+                'email': f"user{i}@example.com",
+                'admin': i == 0,
+                'owner': i == 0,
+                'inactive': False,
+                'joined': True,
+                'workspaces': [{'workspace_id': wid, 'admin': i == 0} for wid in self.generator.workspace_ids],
+            }
+            for i in range(self.organization_users)
+        ]
+        return self._json(self._page(request, users, 50))
+
+    async def get_tags(self, request):
+        return self._json(self.data['tags'])
+
+    async def get_workspaces(self, request):
+        return self._json(self.data['workspaces'])
+
+    async def get_entries(self, request):
+        start_date = request.query.get('start_date')
+        end_date = request.query.get('end_date')
+        if start_date is None and end_date is None:
+            # The real API defaults to roughly the last nine days, here the most recent entries stand in
+            return self._json(list(self.entries.values())[-1000:])
+
+        # Both dates are isoformat timestamps in UTC, so they compare as strings, newest first like the API
+        entries = [
+            entry for entry in reversed(self.entries.values())
+            if (start_date is None or entry['start'] >= start_date)
+            and (end_date is None or entry['start'] < end_date)
+        ]
+        return self._json(entries)
+
+    def _workspace_items(self, request, key):
+        wid = int(request.match_info['workspace_id'])
+        if wid not in self.generator.workspace_ids:
+            raise web.HTTPForbidden(text="User does not have access to this resource.")
+        field = 'wid' if key == 'clients' else 'workspace_id'
+        return [item for item in self.data[key] if item[field] == wid]
+
+    @staticmethod
+    def _page(request, items, default_per_page):
+        page = int(request.query.get('page', 1))
+        per_page = int(request.query.get('per_page', default_per_page))
+        return items[(page - 1) * per_page:page * per_page]
+
+    async def get_workspace(self, request):
+        wid = int(request.match_info['workspace_id'])
+        for workspace in self.data['workspaces']:
+            if workspace['id'] == wid:
+                return self._json(workspace)
+        return web.Response(status=403, text="User does not have access to this resource.")
+
+    async def get_workspace_clients(self, request):
+        return self._json(self._workspace_items(request, 'clients'))
+
+    async def get_workspace_projects(self, request):
+        return self._json(self._page(request, self._workspace_items(request, 'projects'), 151))
+
+    async def get_workspace_tags(self, request):
+        items = self._workspace_items(request, 'tags')
+        if 'page' in request.query or 'per_page' in request.query:
+            items = self._page(request, items, 200)
+        return self._json(items)
+
+    async def get_current(self, request):
+        entry = self.entries.get(self.current_id) if self.current_id is not None else None
+        return self._json(entry)
+
+    async def get_preferences(self, request):
+        return self._json({
+            'BeginningOfWeek': 1,
+            'date_format': 'YYYY-MM-DD',
+            'timeofday_format': 'H:mm',
+            'duration_format': 'improved',
+            'pg_time_zone_name': 'UTC',
+        })
+
+    async def create_entry(self, request):
+        wid = int(request.match_info['workspace_id'])
+        try:
+            payload = await request.json()
+            start = dt.datetime.fromisoformat(payload['start'])
+        except (ValueError, KeyError):
+            return web.Response(status=400, text="Invalid time entry")
+
+        now = dt.datetime.now(dt.timezone.utc)
+        duration = payload.get('duration', -1)
+        running = duration < 0
+        entry_id = self.next_entry_id
+        self.next_entry_id += 1
+        entry = {
+            'at': now.isoformat(),
+            'billable': payload.get('billable', False),
+            'description': payload.get('description'),
+            'duration': -int(start.timestamp()) if running else duration,
+            'duronly': True,
+            'id': entry_id,
+            'permissions': None,
+            'pid': payload.get('project_id'),
+            'project_id': payload.get('project_id'),
+            'server_deleted_at': None,
+            'start': start.isoformat(),
+            'stop': None if running else (start + dt.timedelta(seconds=duration)).isoformat(),
+            'tag_ids': payload.get('tag_ids') or [],
+            'tags': payload.get('tags') or [],
+            'task_id': None,
+            'tid': None,
+            'uid': self.generator.user_id,
+            'user_id': self.generator.user_id,
+            'wid': wid,
+            'workspace_id': wid,
+        }
+        if running:
+            # Only one running entry at a time
+            if self.current_id is not None:
+                self._stop(self.entries[self.current_id], now)
+            self.current_id = entry_id
+        self.entries[entry_id] = entry
+        self._related_body = None
+        return self._json(entry)
+
+    async def stop_entry(self, request):
+        entry = self.entries.get(int(request.match_info['entry_id']))
+        if entry is None or entry['workspace_id'] != int(request.match_info['workspace_id']):
+            return web.Response(status=404, text="Time entry not found")
+        if entry['stop'] is not None:
+            return web.Response(status=409, text="Time entry already stopped")
+        self._stop(entry, dt.datetime.now(dt.timezone.utc))
+        if self.current_id == entry['id']:
+            self.current_id = None
+        self._related_body = None
+        return self._json(entry)
+
+    @staticmethod
+    def _stop(entry, now):
+        start = dt.datetime.fromisoformat(entry['start'])
+        entry['stop'] = now.isoformat()
+        entry['duration'] = int((now - start).total_seconds())
+        entry['at'] = now.isoformat()
+
+
+async def serve(args):
+    api = FakeTrackAPI(
+        entries=args.entries, seed=args.seed,
+        latency=args.latency, jitter=args.jitter,
+        quota=args.quota, quota_window=args.quota_window,
+        error_rate=args.error_rate,
+        tail_rate=args.tail_rate, tail_latency=args.tail_latency,
+    )
+    url = await api.start(args.host, args.port)
+    print(f"Serving fake Toggl Track API at {url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await api.close()
+
+
+def add_server_arguments(parser):
+    parser.add_argument('--entries', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.0, help="Base response latency in seconds.")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Maximum extra random latency in seconds.")
+    parser.add_argument('--quota', type=int, default=None, help="Requests allowed per quota window per credential.")
+    parser.add_argument('--quota-window', type=float, default=1.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--tail-rate', type=float, default=0.0, help="Proportion of requests given tail latency.")
+    parser.add_argument('--tail-latency', type=float, default=1.0)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    add_server_arguments(parser)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,189 @@
+"""
+Load driver for `TrackClient` and `TrackHTTPClient` against the fake Toggl Track API.
+
+Each simulated user owns a `TrackClient` with its own credentials
+and repeatedly runs a weighted mix of operations for the given duration.
+Throughput and p50/p99 latency are reported per operation.
+
+Run from the repository root with e.g.
+    python -m tests.toggl_track.load --users 50 --duration 30 --latency 0.05 --quota 2
+or against an already running server with `--url`.
+"""
+import argparse
+import asyncio
+import collections
+import random
+import time
+
+from .context import toggl_track
+from .fakeapi import FakeTrackAPI, add_server_arguments
+
+from toggl_track.client import TrackClient
+from toggl_track.errors import HTTPException, TogglException
+from toggl_track.http import TrackHTTPClient
+from toggl_track.lib import utc_now
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.Counter()
+
+    def record(self, op, seconds):
+        self.latencies[op].append(seconds)
+
+    def error(self, op, exc):
+        if isinstance(exc, HTTPException):
+            name = f"{type(exc).__name__}({exc.response.status})"
+        else:
+            name = type(exc).__name__
+        self.errors[(op, name)] += 1
+
+    def report(self, elapsed):
+        total = sum(len(values) for values in self.latencies.values())
+        print(f"{total} operations in {elapsed:.2f}s: {total / elapsed:.1f} ops/s")
+        print(f"{'operation':<12} {'count':>8} {'ops/s':>9} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+        rows = list(self.latencies.items())
+        rows.append(('all', [value for values in self.latencies.values() for value in values]))
+        for op, values in rows:
+            values = sorted(values)
+            print(
+                f"{op:<12} {len(values):>8} {len(values) / elapsed:>9.1f} "
+                f"{percentile(values, 0.5) * 1e3:>10.2f} {percentile(values, 0.99) * 1e3:>10.2f} "
+                f"{(values[-1] if values else float('nan')) * 1e3:>10.2f}"
+            )
+        if self.errors:
+            print("Errors:")
+            for (op, name), count in sorted(self.errors.items()):
+                print(f"    {op:<12} {name:<32} {count}")
+
+
+class SimulatedUser:
+    def __init__(self, index, base_url, request_interval, max_retries, rng, backfill=0):
+        self.index = index
+        self.rng = rng
+        self.backfill = backfill
+        self.client = TrackClient(
+            http=TrackHTTPClient(base_url=base_url, request_interval=request_interval, max_retries=max_retries)
+        )
+        self.operations = {
+            'current': (self.current, 60),
+            'start': (self.start, 10),
+            'stop': (self.stop, 10),
+            'projects': (self.projects, 15),
+            'sync': (self.sync, 5),
+        }
+
+    async def current(self):
+        await self.client.fetch_current_entry()
+
+    async def start(self):
+        await self.client.start_entry(
+            self.client.profile.default_workspace_id,
+            f"load test {self.rng.randrange(1000)}",
+            utc_now(),
+        )
+
+    async def stop(self):
+        entry = await self.client.fetch_current_entry()
+        if entry is not None and entry.stop is None:
+            await entry.stop_entry()
+
+    async def projects(self):
+        await self.client.http.get_my_projects()
+
+    async def sync(self):
+        await self.client.sync()
+
+    async def backfill_history(self, deadline, stats):
+        """
+        Background history fetches competing with the operations for the rate limit lock.
+        """
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                await self.client.http.get_my_time_entries()
+            except TogglException as e:
+                stats.error('backfill', e)
+            else:
+                stats.record('backfill', time.perf_counter() - start)
+
+    async def run(self, deadline, stats):
+        await self.client.login(APIKey=f"load-test-user-{self.index}")
+        names = list(self.operations)
+        weights = [self.operations[name][1] for name in names]
+        backfills = [asyncio.create_task(self.backfill_history(deadline, stats)) for _ in range(self.backfill)]
+        try:
+            while time.monotonic() < deadline:
+                op = self.rng.choices(names, weights)[0]
+                start = time.perf_counter()
+                try:
+                    await self.operations[op][0]()
+                except TogglException as e:
+                    stats.error(op, e)
+                else:
+                    stats.record(op, time.perf_counter() - start)
+            await asyncio.gather(*backfills)
+        finally:
+            for task in backfills:
+                task.cancel()
+            await self.client.close()
+
+
+async def drive(args):
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server = FakeTrackAPI(
+            entries=args.entries, seed=args.seed,
+            latency=args.latency, jitter=args.jitter,
+            quota=args.quota, quota_window=args.quota_window,
+            error_rate=args.error_rate,
+            tail_rate=args.tail_rate, tail_latency=args.tail_latency,
+        )
+        base_url = await server.start()
+
+    stats = LoadStats()
+    rng = random.Random(args.seed)
+    users = [
+        SimulatedUser(i, base_url, args.request_interval, args.max_retries, random.Random(rng.random()), args.backfill)
+        for i in range(args.users)
+    ]
+    start = time.monotonic()
+    try:
+        await asyncio.gather(*(user.run(start + args.duration, stats) for user in users))
+    finally:
+        elapsed = time.monotonic() - start
+        if server is not None:
+            await server.close()
+
+    stats.report(elapsed)
+    if server is not None:
+        print("Server responses:")
+        for (route, status), count in sorted(server.counts.items()):
+            print(f"    {route:<60} {status} {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default=None, help="Base url of a running server, e.g. http://127.0.0.1:8080/api/v9/")
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--request-interval', type=float, default=1.0,
+                        help="Client side rate limit interval in seconds.")
+    parser.add_argument('--max-retries', type=int, default=3)
+    parser.add_argument('--backfill', type=int, default=0,
+                        help="Concurrent background history fetches per user.")
+    add_server_arguments(parser)
+    asyncio.run(drive(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
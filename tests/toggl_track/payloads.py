@@ -0,0 +1,233 @@
+"""
+Deterministic generator for synthetic Toggl Track payloads.
+
+The generated data mirrors the shape of the v9 API responses,
+including the extra fields we do not model,
+so that parsing costs are representative of real accounts.
+"""
+import datetime as dt
+import random
+
+
+EPOCH = dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc)
+
+COLOURS = [
+    '#0b83d9', '#9e5bd9', '#d94182', '#e36a00', '#bf7000',
+    '#2da608', '#06a893', '#c9806b', '#465bb3', '#990099',
+]
+
+WORDS = [
+    'review', 'planning', 'design', 'meeting', 'standup', 'deploy', 'support',
+    'research', 'bugfix', 'refactor', 'docs', 'testing', 'billing', 'client',
+    'call', 'email', 'sprint', 'retro', 'backend', 'frontend', 'api', 'sync',
+]
+
+
+def _ts(seconds: int) -> str:
+    return (EPOCH + dt.timedelta(seconds=seconds)).isoformat()
+
+
+class PayloadGenerator:
+    """
+    Builds realistic `/me?with_related_data=true` payloads.
+
+    The same seed and sizes always produce identical payloads.
+    """
+
+    def __init__(self, entries=1000, seed=0, workspaces=None, projects=None, clients=None, tags=None, running=1):
+        self.entries = entries
+        self.seed = seed
+        self.workspaces = workspaces or max(1, min(5, entries // 20000 + 1))
+        self.projects = projects or max(5, min(5000, entries // 20))
+        self.clients = clients or max(2, self.projects // 10)
+        self.tags = tags or max(5, min(500, entries // 200))
+        self.running = running
+
+        self.user_id = 1000000 + seed
+        self.workspace_ids = [5000000 + i for i in range(self.workspaces)]
+
+    def _workspace_for(self, i):
+        return self.workspace_ids[i % self.workspaces]
+
+    def profile(self):
+        return {
+            'api_token': 'f' * 32,
+            'at': _ts(86400 * 400),
+            'beginning_of_week': 1,
+            'country_id': 13,
+            'created_at': _ts(0),
+            'default_workspace_id': self.workspace_ids[0],
+            'email': f'user{self.seed}@example.com',
+            'fullname': f'Synthetic User {self.seed}',
+            'has_password': True,
+            'id': self.user_id,
+            'image_url': 'https://assets.track.toggl.com/images/profile.png',
+            'intercom_hash': 'a' * 64,
+            'openid_email': None,
+            'openid_enabled': False,
+            'timezone': 'Europe/London',
+            'updated_at': _ts(86400 * 400),
+        }
+
+    def workspace_data(self):
+        return [
+            {
+                'admin': i == 0,
+                'api_token': 'e' * 32,
+                'at': _ts(86400 * i),
+                'business_ws': False,
+                'csv_upload': None,
+                'default_currency': 'USD',
+                'default_hourly_rate': None,
+                'ical_enabled': True,
+                'ical_url': f'/ical/workspace_user/{wid}',
+                'id': wid,
+                'logo_url': 'https://assets.track.toggl.com/images/workspace.jpg',
+                'name': f'Workspace {i}',
+                'only_admins_may_create_projects': False,
+                'only_admins_may_create_tags': False,
+                'only_admins_see_billable_rates': False,
+                'only_admins_see_team_dashboard': False,
+                'organization_id': 9000000 + self.seed,
+                'premium': False,
+                'profile': 0,
+                'projects_billable_by_default': True,
+                'rate_last_updated': None,
+                'reports_collapse': True,
+                'role': 'admin',
+                'rounding': 1,
+                'rounding_minutes': 0,
+                'server_deleted_at': None,
+                'subscription': None,
+                'suspended_at': None,
+            }
+            for i, wid in enumerate(self.workspace_ids)
+        ]
+
+    def client_data(self):
+        return [
+            {
+                'archived': i % 17 == 0,
+                'at': _ts(3600 * i),
+                'creator_id': self.user_id,
+                'id': 6000000 + i,
+                'name': f'Client {i}',
+                'server_deleted_at': None,
+                'wid': self._workspace_for(i),
+            }
+            for i in range(self.clients)
+        ]
+
+    def tag_data(self):
+        return [
+            {
+                'at': _ts(1800 * i),
+                'creator_id': self.user_id,
+                'deleted_at': None,
+                'id': 7000000 + i,
+                'integration_ext_id': None,
+                'integration_ext_type': None,
+                'name': f'{WORDS[i % len(WORDS)]}-{i}',
+                'workspace_id': self._workspace_for(i),
+            }
+            for i in range(self.tags)
+        ]
+
+    def project_data(self):
+        rng = random.Random(self.seed * 7919 + 1)
+        projects = []
+        for i in range(self.projects):
+            wid = self._workspace_for(i)
+            client = i % self.clients
+            projects.append({
+                'active': i % 11 != 0,
+                'actual_hours': rng.randint(0, 400),
+                'actual_seconds': rng.randint(0, 400 * 3600),
+                'at': _ts(7200 * i),
+                'auto_estimates': None,
+                'billable': None,
+                'cid': 6000000 + client if self._workspace_for(client) == wid else None,
+                'client_id': 6000000 + client if self._workspace_for(client) == wid else None,
+                'color': COLOURS[i % len(COLOURS)],
+                'created_at': _ts(3600 * i),
+                'currency': None,
+                'current_period': None,
+                'end_date': None,
+                'estimated_hours': None,
+                'estimated_seconds': None,
+                'fixed_fee': None,
+                'id': 8000000 + i,
+                'is_private': i % 3 == 0,
+                'name': f'Project {WORDS[i % len(WORDS)]} {i}',
+                'permissions': None,
+                'rate': None,
+                'rate_last_updated': None,
+                'recurring': False,
+                'recurring_parameters': None,
+                'server_deleted_at': None,
+                'start_date': _ts(3600 * i),
+                'status': 'active' if i % 11 else 'archived',
+                'template': None,
+                'template_id': None,
+                'wid': wid,
+                'workspace_id': wid,
+            })
+        return projects
+
+    def time_entry_data(self):
+        rng = random.Random(self.seed * 104729 + 3)
+        entries = []
+        clock = 86400 * 30
+        for i in range(self.entries):
+            pindex = rng.randrange(self.projects)
+            wid = self._workspace_for(pindex)
+            pid = 8000000 + pindex if rng.random() < 0.85 else None
+            ntags = rng.choice((0, 0, 1, 1, 2, 3))
+            tindices = sorted({rng.randrange(self.tags) for _ in range(ntags)})
+            duration = rng.randint(60, 4 * 3600)
+            clock += rng.randint(0, 3600)
+            running = i >= self.entries - self.running
+            description = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+            entries.append({
+                'at': _ts(clock + duration),
+                'billable': rng.random() < 0.3,
+                'description': description,
+                'duration': -(clock) if running else duration,
+                'duronly': True,
+                'id': 3000000000 + i,
+                'permissions': None,
+                'pid': pid,
+                'project_id': pid,
+                'server_deleted_at': None,
+                'start': _ts(clock),
+                'stop': None if running else _ts(clock + duration),
+                'tag_ids': [7000000 + t for t in tindices],
+                'tags': [f'{WORDS[t % len(WORDS)]}-{t}' for t in tindices],
+                'task_id': None,
+                'tid': None,
+                'uid': self.user_id,
+                'user_id': self.user_id,
+                'wid': wid,
+                'workspace_id': wid,
+            })
+            clock += duration
+        return entries
+
+    def related_data(self):
+        """
+        A full `/me?with_related_data=true` response.
+        """
+        payload = self.profile()
+        payload['workspaces'] = self.workspace_data()
+        payload['clients'] = self.client_data()
+        payload['tags'] = self.tag_data()
+        payload['projects'] = self.project_data()
+        payload['time_entries'] = self.time_entry_data()
+        return payload
+
+
+def related_data(entries=1000, seed=0, **kwargs):
+    """
+    Shortcut for a full related-data payload with the given number of time entries.
+    """
+    return PayloadGenerator(entries=entries, seed=seed, **kwargs).related_data()
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+
+from .context import toggl_track
+
+from toggl_track.lib import BACKGROUND, INTERACTIVE
+from toggl_track.priority import PriorityLock
+
+
+async def settle():
+    # Let every runnable task take its next step
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class Waiters:
+    """
+    Tasks queued on a held lock, recording the order they are granted it in.
+    """
+
+    def __init__(self, lock: PriorityLock):
+        self.lock = lock
+        self.granted: list[str] = []
+        self.tasks: dict[str, asyncio.Task] = {}
+
+    async def _acquire(self, name, priority):
+        await self.lock.acquire(priority)
+        self.granted.append(name)
+
+    async def add(self, name, priority):
+        self.tasks[name] = asyncio.create_task(self._acquire(name, priority))
+        await settle()
+
+    async def drain(self) -> list[str]:
+        """
+        Release the lock once for every grant until no task is left waiting.
+        """
+        while self.lock.waiting():
+            self.lock.release()
+            await settle()
+        self.lock.release()
+        await settle()
+        return self.granted
+
+
+async def test_uncontended():
+    logging.info("Testing uncontended PriorityLock use.")
+    lock = PriorityLock()
+    assert not lock.locked()
+    assert await lock.acquire(INTERACTIVE)
+    assert lock.locked() and lock.waiting() == 0
+    lock.release()
+    assert not lock.locked()
+    try:
+        lock.release()
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("Released an unlocked PriorityLock")
+
+
+async def test_priority_order():
+    logging.info("Testing PriorityLock grants by priority, then arrival.")
+    lock = PriorityLock()
+    await lock.acquire()
+    waiters = Waiters(lock)
+    for name, priority in (('b1', BACKGROUND), ('b2', BACKGROUND), ('i1', INTERACTIVE),
+                           ('b3', BACKGROUND), ('i2', INTERACTIVE)):
+        await waiters.add(name, priority)
+    assert lock.waiting() == 5
+    assert lock.waiting(INTERACTIVE) == 2 and lock.waiting(BACKGROUND) == 3
+    assert waiters.granted == []
+    assert await waiters.drain() == ['i1', 'i2', 'b1', 'b2', 'b3']
+    assert not lock.locked() and lock.waiting() == 0
+
+
+async def test_starvation():
+    logging.info("Testing PriorityLock starvation limit.")
+    lock = PriorityLock(starvation_limit=2)
+    await lock.acquire()
+    waiters = Waiters(lock)
+    await waiters.add('b1', BACKGROUND)
+    await waiters.add('b2', BACKGROUND)
+    for i in range(1, 7):
+        await waiters.add(f'i{i}', INTERACTIVE)
+    assert await waiters.drain() == ['i1', 'i2', 'b1', 'i3', 'i4', 'b2', 'i5', 'i6']
+
+    # Grants with only one lane waiting do not count towards the limit
+    await lock.acquire()
+    waiters = Waiters(lock)
+    for i in range(1, 4):
+        await waiters.add(f'i{i}', INTERACTIVE)
+    lock.release()
+    await settle()
+    lock.release()
+    await settle()
+    await waiters.add('b1', BACKGROUND)
+    assert await waiters.drain() == ['i1', 'i2', 'i3', 'b1']
+
+    # Three lanes, the lowest is served once the limit is reached
+    lock = PriorityLock(priorities=(0, 1, 2), starvation_limit=1)
+    await lock.acquire()
+    waiters = Waiters(lock)
+    for name, priority in (('c1', 2), ('b1', 1), ('a1', 0), ('a2', 0), ('a3', 0)):
+        await waiters.add(name, priority)
+    assert await waiters.drain() == ['a1', 'c1', 'a2', 'b1', 'a3']
+
+
+async def test_cancellation():
+    logging.info("Testing PriorityLock waiter cancellation.")
+    lock = PriorityLock()
+    await lock.acquire()
+    waiters = Waiters(lock)
+    for name in ('b1', 'b2', 'b3'):
+        await waiters.add(name, BACKGROUND)
+
+    # A cancelled waiter leaves its lane
+    waiters.tasks['b2'].cancel()
+    await settle()
+    assert waiters.tasks['b2'].cancelled()
+    assert lock.waiting() == 2
+
+    # A waiter cancelled after being handed the lock passes it on
+    lock.release()
+    assert waiters.granted == []
+    waiters.tasks['b1'].cancel()
+    await settle()
+    assert waiters.tasks['b1'].cancelled()
+    assert waiters.granted == ['b3']
+    assert lock.locked() and lock.waiting() == 0
+
+    lock.release()
+    assert not lock.locked()
+
+    # Cancelling every waiter leaves the lock free for the next acquire
+    await lock.acquire()
+    waiters = Waiters(lock)
+    for name in ('i1', 'b1'):
+        await waiters.add(name, INTERACTIVE if name.startswith('i') else BACKGROUND)
+    for task in waiters.tasks.values():
+        task.cancel()
+    await settle()
+    lock.release()
+    assert not lock.locked() and lock.waiting() == 0
+    assert await asyncio.wait_for(lock.acquire(), 1)
+    lock.release()
+
+
+async def test_handoff():
+    logging.info("Testing PriorityLock hands off to waiters before new arrivals.")
+    lock = PriorityLock()
+    await lock.acquire()
+    waiters = Waiters(lock)
+    await waiters.add('b1', BACKGROUND)
+    lock.release()
+    # The lock is still held on behalf of b1, so a later interactive request queues behind it
+    assert lock.locked()
+    await waiters.add('i1', INTERACTIVE)
+    assert await waiters.drain() == ['b1', 'i1']
+
+
+async def test_timeout():
+    logging.info("Testing PriorityLock acquire timeouts.")
+    lock = PriorityLock()
+    await lock.acquire()
+    try:
+        await asyncio.wait_for(lock.acquire(INTERACTIVE), 0.01)
+    except asyncio.TimeoutError:
+        pass
+    else:
+        raise AssertionError("Acquired a held PriorityLock")
+    assert lock.waiting() == 0
+    lock.release()
+    assert not lock.locked()
+
+
+async def main():
+    logging.info("Starting Tests")
+    await test_uncontended()
+    await test_priority_order()
+    await test_starvation()
+    await test_cancellation()
+    await test_handoff()
+    await test_timeout()
+    logging.info("Tests Complete")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
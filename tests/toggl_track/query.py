@@ -0,0 +1,142 @@
+import datetime as dt
+import logging
+
+from .context import toggl_track
+from .payloads import EPOCH, PayloadGenerator
+
+from toggl_track.models import Project, TimeEntry
+from toggl_track.state import TrackState
+
+
+def build_state() -> TrackState:
+    generator = PayloadGenerator(entries=2000, seed=3, workspaces=2, projects=40, tags=12, running=2)
+    payload = generator.related_data()
+    # Entries sharing a start, to check ties are broken by id in both directions
+    template = payload['time_entries'][100]
+    for i in range(5):
+        payload['time_entries'].append(dict(template, id=3900000000 - i, description=f"tie {i}"))
+    state = TrackState(None)
+    state.recursive_load_data(payload)
+    return state
+
+
+def reference(state: TrackState, predicate, descending=False) -> list[int]:
+    entries = [entry for entry in state.time_entries.values() if predicate(entry)]
+    entries.sort(key=lambda entry: (entry.start, entry.id), reverse=descending)
+    return [entry.id for entry in entries]
+
+
+def ids(query) -> list[int]:
+    return [entry.id for entry in query]
+
+
+def test_plan_choice(state: TrackState):
+    logging.info("Testing query plan choice.")
+    entries = state.query(TimeEntry)
+    entry = next(iter(state.time_entries.values()))
+    pid = next(pid for pid, eids in state.project_entries.items() if eids)
+    tid = next(tid for tid, eids in state.tag_entries.items() if eids)
+    recent = max(entry.start for entry in state.time_entries.values()) - dt.timedelta(days=1)
+
+    cases = [
+        (entries, "full scan"),
+        (entries.where(id=entry.id), "id lookup"),
+        (entries.where(id__in=[entry.id, -1]), "id lookup"),
+        (entries.where(project_id=pid), "project_id index"),
+        (entries.where(project_id__in=[pid, -1]), "project_id index"),
+        (entries.where(tag_ids__contains=tid), "tag_ids index"),
+        (entries.where(running=True), "running entries index"),
+        (entries.where(start__gte=recent), "start index"),
+        (entries.where(start__gt=recent, description__icontains='a'), "start index"),
+        (entries.order_by('-start').limit(10), "start index"),
+        (entries.order_by('start'), "start index"),
+        (entries.where(running=True, start__gte=EPOCH), "running entries index"),
+        (entries.where(description='docs'), "full scan"),
+        (state.query(Project).where(workspace_id=entry.workspace_id), "workspace_id index"),
+    ]
+    for query, expected in cases:
+        explanation = query.explain()
+        assert explanation.startswith(expected), (expected, explanation)
+
+    # Ordering by anything but start has to sort the candidates
+    assert entries.order_by('description').explain().endswith("then sort")
+    assert entries.where(project_id=pid).order_by('-start').explain().endswith("then sort")
+    assert not entries.order_by('-start').explain().endswith("then sort")
+
+
+def test_results(state: TrackState):
+    logging.info("Testing query results against a full scan.")
+    entries = state.query(TimeEntry)
+    pid = max(state.project_entries, key=lambda pid: len(state.project_entries[pid]))
+    tid = max(state.tag_entries, key=lambda tid: len(state.tag_entries[tid]))
+    starts = sorted(entry.start for entry in state.time_entries.values())
+    lower, upper = starts[len(starts) // 4], starts[len(starts) // 2]
+    tie = state.time_entries[3900000000].start
+
+    cases = [
+        (entries, lambda e: True),
+        (entries.where(project_id=pid), lambda e: e.project_id == pid),
+        (entries.where(tag_ids__contains=tid), lambda e: tid in e.tag_ids),
+        (entries.where(running=True), lambda e: e.running),
+        (entries.where(project_id__isnull=True), lambda e: e.project_id is None),
+        (entries.where(start__gte=lower, start__lt=upper), lambda e: lower <= e.start < upper),
+        (entries.where(start__gt=lower, start__lte=upper), lambda e: lower < e.start <= upper),
+        (entries.where(start=tie), lambda e: e.start == tie),
+        (entries.where(start__gt=tie, start__lt=tie), lambda e: False),
+        (entries.where(start__gte=upper, start__lte=lower), lambda e: False),
+        (entries.where(start__gte=lower, project_id=pid), lambda e: e.start >= lower and e.project_id == pid),
+    ]
+    for query, predicate in cases:
+        assert sorted(ids(query)) == sorted(reference(state, predicate)), query.explain()
+        for descending in (False, True):
+            ordered = query.order_by('-start' if descending else 'start')
+            expected = reference(state, predicate, descending)
+            assert ids(ordered) == expected, ordered.explain()
+            assert ids(ordered.limit(7)) == expected[:7], ordered.explain()
+            assert ids(ordered.offset(5).limit(3)) == expected[5:8], ordered.explain()
+            assert ordered.count() == len(expected)
+            assert (ordered.first() and ordered.first().id) == (expected[0] if expected else None)
+
+
+def test_multiple_ordering(state: TrackState):
+    logging.info("Testing ordering by several fields.")
+    result = state.query(TimeEntry).order_by('project_id', '-duration').all()
+    keys = [(entry.project_id is None, entry.project_id or 0, -entry.duration) for entry in result]
+    assert keys == sorted(keys)
+
+
+def test_updates_during_iteration():
+    logging.info("Testing start index scans while entries are loaded and removed.")
+    for descending in (False, True):
+        state = build_state()
+        query = state.query(TimeEntry).order_by('-start' if descending else 'start')
+        expected = ids(query)
+        template = state.time_entries[expected[0]].to_data()
+        # Far behind the scan, so the entries are never reached
+        behind = EPOCH + dt.timedelta(days=36500 if descending else -3650)
+
+        seen = []
+        for n, entry in enumerate(query):
+            seen.append(entry.id)
+            if n % 7 == 0:
+                state.add_entry_data(dict(template, id=4000000000 + n, start=behind.isoformat()))
+            if n % 11 == 0 and n + 1 < len(expected):
+                # Remove the next entry and add it back, so it is seen once at its unchanged start
+                following = state.time_entries[expected[n + 1]]
+                state.remove_model('time_entries', following.id)
+                state.add_entry_data(following.to_data())
+        assert seen == expected, descending
+
+
+def main():
+    logging.info("Starting Tests")
+    state = build_state()
+    test_plan_choice(state)
+    test_results(state)
+    test_multiple_ordering(state)
+    test_updates_during_iteration()
+    logging.info("Tests Complete")
+
+
+if __name__ == '__main__':
+    main()
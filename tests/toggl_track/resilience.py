@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import time
+
+from .context import toggl_track
+from .fakeapi import FakeTrackAPI
+
+from toggl_track.errors import CircuitOpen, HTTPException, NotFound
+from toggl_track.http import TrackHTTPClient
+from toggl_track.metrics import TrackMetrics
+from toggl_track.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, hedged
+
+
+TAGS_ROUTE = ('GET', 'me/tags')
+
+
+class Recorder(TrackMetrics):
+    def __init__(self):
+        self.hedges = []
+        self.circuits = []
+
+    def on_hedge(self, method, route, delay, hedge_won):
+        self.hedges.append((method, route, hedge_won))
+
+    def on_circuit(self, method, route, state):
+        self.circuits.append(state)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class ScriptedRandom:
+    """
+    Stands in for the fake API's random source, returning the given values in turn and then 1.0.
+    """
+
+    def __init__(self, *values):
+        self.values = iter(values)
+
+    def random(self):
+        return next(self.values, 1.0)
+
+
+def server_requests(api: FakeTrackAPI, route='GET /api/v9/me/tags') -> int:
+    return sum(count for (key, _), count in api.counts.items() if key == route)
+
+
+async def connect(api: FakeTrackAPI, **kwargs) -> TrackHTTPClient:
+    http = TrackHTTPClient(base_url=api.base_url, request_interval=0, max_retries=0, **kwargs)
+    await http.login(APIKey='resilience-checks')
+    return http
+
+
+async def test_breaker_states():
+    logging.info("Testing CircuitBreaker state transitions.")
+    clock = Clock()
+    states = []
+    breaker = CircuitBreaker(threshold=3, reset_timeout=10, on_change=states.append, clock=clock)
+
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    # A success resets the consecutive failure count
+    breaker.record_success()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+    assert breaker.retry_in() == 10
+
+    # One trial request once the reset timeout passed, which reopens the circuit on failure
+    clock.now += 10
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.retry_in() == 10
+
+    # A released trial lets the next request try instead
+    clock.now += 10
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == HALF_OPEN and breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+    assert states == [OPEN, HALF_OPEN, OPEN, HALF_OPEN, CLOSED], states
+
+
+async def test_breaker_requests():
+    logging.info("Testing circuit breakers on requests to the fake API.")
+    async with FakeTrackAPI(entries=10) as api:
+        recorder = Recorder()
+        http = await connect(api, metrics=recorder, breaker_threshold=3, breaker_reset=0.2)
+
+        # Client errors mean the API is up, so never open the circuit
+        api.error_rate, api.error_status = 1.0, 404
+        for _ in range(5):
+            try:
+                await http.get_my_tags()
+            except NotFound:
+                pass
+        assert http.breakers[TAGS_ROUTE].state == CLOSED
+
+        api.error_status = 503
+        for _ in range(3):
+            try:
+                await http.get_my_tags()
+            except HTTPException as e:
+                assert e.response.status == 503
+        assert http.breakers[TAGS_ROUTE].state == OPEN
+
+        # Open circuits fail without sending anything
+        sent = server_requests(api)
+        try:
+            await http.get_my_tags()
+        except CircuitOpen as e:
+            assert 0 < e.retry_in <= 0.2
+        else:
+            raise AssertionError("Request sent through an open circuit")
+        assert server_requests(api) == sent
+
+        # A failed trial opens the circuit again
+        await asyncio.sleep(0.25)
+        try:
+            await http.get_my_tags()
+        except HTTPException:
+            pass
+        assert http.breakers[TAGS_ROUTE].state == OPEN
+
+        # A successful trial closes it
+        api.error_rate = 0.0
+        await asyncio.sleep(0.25)
+        await http.get_my_tags()
+        assert http.breakers[TAGS_ROUTE].state == CLOSED
+        await http.get_my_tags()
+        assert recorder.circuits == [OPEN, HALF_OPEN, OPEN, HALF_OPEN, CLOSED], recorder.circuits
+        await http.close()
+
+
+async def test_hedge_cancels_loser():
+    logging.info("Testing hedged attempts cancel or release the losing attempt.")
+    cancelled = []
+    released = []
+
+    # A stalled first attempt is cancelled once the hedge answers
+    async def send_stalled(calls=iter(('first', 'hedge'))):
+        name = next(calls)
+        try:
+            await asyncio.sleep(10 if name == 'first' else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(name)
+            raise
+        return name
+
+    result = await hedged(send_stalled, 0.02, release=released.append)
+    assert result == ('hedge', True, True), result
+    await asyncio.sleep(0)
+    assert cancelled == ['first'] and released == []
+
+    # A fast first attempt is never hedged
+    async def send_fast():
+        return 'first'
+
+    assert await hedged(send_fast, 0.02, release=released.append) == ('first', False, False)
+
+    # When both attempts answer together, the first wins and the hedge's result is released
+    gate = asyncio.Event()
+
+    async def send_gated(calls=iter(('first', 'hedge'))):
+        name = next(calls)
+        await gate.wait()
+        return name
+
+    async def open_gate():
+        await asyncio.sleep(0.05)
+        gate.set()
+
+    opener = asyncio.create_task(open_gate())
+    result = await hedged(send_gated, 0.02, release=released.append)
+    await opener
+    assert result == ('first', True, False), result
+    assert released == ['hedge'], released
+
+    # Failures of both attempts raise the last error
+    async def send_failing(calls=iter((0.05, 0.0))):
+        await asyncio.sleep(next(calls))
+        raise ValueError("failed")
+
+    try:
+        await hedged(send_failing, 0.02)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Failed hedged attempts did not raise")
+
+
+async def test_hedge_requests():
+    logging.info("Testing request hedging against the fake API's tail latency.")
+    async with FakeTrackAPI(entries=10, latency=0.01, tail_latency=2.0) as api:
+        recorder = Recorder()
+        http = await connect(api, metrics=recorder, hedge=['me/tags'])
+
+        # Nothing is hedged until the route has enough latency samples
+        for _ in range(25):
+            await http.get_my_tags()
+        assert recorder.hedges == []
+        delay = http.latencies[TAGS_ROUTE].quantile(http.hedge_quantile)
+        assert delay is not None and delay < 0.5, delay
+
+        # Stall the first attempt only, the hedge answers at the usual latency
+        api.tail_rate = 0.5
+        api.rng = ScriptedRandom(0.0, 1.0)
+        start = time.perf_counter()
+        tags = await http.get_my_tags()
+        elapsed = time.perf_counter() - start
+        assert tags == api.data['tags']
+        assert elapsed < 1.0, elapsed
+        assert recorder.hedges == [(*TAGS_ROUTE, True)], recorder.hedges
+
+        # Routes which are not hedged wait out the tail
+        api.rng = ScriptedRandom(0.0)
+        start = time.perf_counter()
+        await http.get_my_workspaces()
+        assert time.perf_counter() - start >= 2.0
+        assert len(recorder.hedges) == 1
+        await http.close()
+
+
+async def main():
+    logging.info("Starting Tests")
+    await test_breaker_states()
+    await test_breaker_requests()
+    await test_hedge_cancels_loser()
+    await test_hedge_requests()
+    logging.info("Tests Complete")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+import json
+import logging
+
+from .context import toggl_track
+
+from toggl_track.stream import ITEM, VALUE, JSONStreamDecoder, StreamEvent
+
+
+DOCUMENTS = [
+    # Strings with escapes and multibyte UTF-8, split inside the string and inside a character
+    {'id': 1, 'fullname': 'Zoë "Zed" Ångström \\ 東京 🎉', 'tags': ['naïve', 'é́', '😀']},
+    # Numbers which are valid prefixes of longer numbers
+    {'count': 12345, 'ratio': -0.000125, 'big': 1.5e300, 'items': [0, -1, 10, 2.5e-3, 123456789012345678901234567890]},
+    # Literals, nesting below the top level, and empty containers
+    {'ok': True, 'no': False, 'none': None, 'nested': {'a': [1, {'b': []}]}, 'empty': {}, 'projects': [{}, []]},
+    {'time_entries': [], 'workspaces': [], 'id': 7},
+    {},
+    [],
+    [1, 'two', {'three': [3]}, [], None],
+]
+
+
+def expected_events(document) -> list[StreamEvent]:
+    if isinstance(document, list):
+        return [StreamEvent(ITEM, None, item) for item in document]
+    events = []
+    for key, value in document.items():
+        if isinstance(value, list):
+            events.extend(StreamEvent(ITEM, key, item) for item in value)
+        else:
+            events.append(StreamEvent(VALUE, key, value))
+    return events
+
+
+def decode(chunks) -> list[StreamEvent]:
+    decoder = JSONStreamDecoder()
+    events = []
+    for chunk in chunks:
+        events.extend(decoder.feed(chunk))
+    events.extend(decoder.close())
+    return events
+
+
+def test_chunk_boundaries():
+    logging.info("Testing JSONStreamDecoder at every chunk boundary.")
+    for document in DOCUMENTS:
+        expected = expected_events(document)
+        for separators in ((',', ':'), (', ', ': ')):
+            body = json.dumps(document, ensure_ascii=False, separators=separators).encode('utf-8')
+            assert decode([body]) == expected, body
+            assert decode([body[i:i + 1] for i in range(len(body))]) == expected, body
+            for i in range(len(body) + 1):
+                assert decode([body[:i], body[i:]]) == expected, (body, i)
+            for i in range(0, len(body), 3):
+                assert decode([body[:i], b'', body[i:i + 2], body[i + 2:]]) == expected, (body, i)
+
+
+def test_whitespace():
+    logging.info("Testing JSONStreamDecoder with surrounding whitespace.")
+    body = b' \n{ "a" :\t[ 1 ,2 ] ,\r\n "b" : "c" }\n '
+    expected = [StreamEvent(ITEM, 'a', 1), StreamEvent(ITEM, 'a', 2), StreamEvent(VALUE, 'b', 'c')]
+    for i in range(len(body) + 1):
+        assert decode([body[:i], body[i:]]) == expected, i
+
+
+MALFORMED = [
+    b'',
+    b'   ',
+    b'1',
+    b'"text"',
+    b'{',
+    b'[',
+    b'{"a": 1',
+    b'{"a": [1, 2',
+    b'{"a": [1, 2,',
+    b'{"a": "unterminated',
+    b'{"a" 1}',
+    b'{"a": 1 "b": 2}',
+    b'{"a": 1,}',
+    b'{1: 2}',
+    b'[1 2]',
+    b'[1,]',
+    b'{"a": [1 2]}',
+    b'{"a": tru}',
+    b'{"a": 1}}',
+    b'{"a": 1} {"b": 2}',
+    b'[] x',
+    b'{"a": "\xff"}',
+    b'{"a": "\xc3"}',
+]
+
+
+def test_malformed():
+    logging.info("Testing JSONStreamDecoder with malformed input.")
+    for body in MALFORMED:
+        for chunks in ([body], [body[i:i + 1] for i in range(len(body))]):
+            try:
+                decode(chunks)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f"Decoded malformed body {body!r}")
+
+
+def main():
+    logging.info("Starting Tests")
+    test_chunk_boundaries()
+    test_whitespace()
+    test_malformed()
+    logging.info("Tests Complete")
+
+
+if __name__ == '__main__':
+    main()